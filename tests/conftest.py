@@ -0,0 +1,71 @@
+import io
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from waybackpy.transport import Transport
+
+# Called with the response, its URL already set to the requested URL, and
+# the keyword arguments of the request. It can change the status code, the
+# headers and the URL of the response and returns its body.
+Responder = Callable[[requests.Response, Dict[str, Any]], bytes]
+
+
+class FakeTransport(Transport):
+    """
+    Transport answering the requests without the network, shared by the
+    tests.
+
+    Every response has the status code, the headers and the body given to
+    the constructor unless a responder builds it. The body is streamed from
+    the raw attribute like a real response. If error is given every request
+    raises it.
+    """
+
+    def __init__(
+        self,
+        body: bytes = b"",
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        responder: Optional[Responder] = None,
+        error: Optional[Exception] = None,
+    ) -> None:
+        super().__init__()
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.responder = responder
+        self.error = error
+        self.requested: List[str] = []
+        self.request_kwargs: List[Dict[str, Any]] = []
+        self.responses: List[requests.Response] = []
+        self.lock = threading.Lock()
+
+    @property
+    def queries(self) -> List[Dict[str, str]]:
+        """
+        The query parameters of the requested URLs.
+        """
+        return [dict(parse_qsl(urlsplit(url).query)) for url in self.requested]
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        with self.lock:
+            self.requested.append(url)
+            self.request_kwargs.append(kwargs)
+        if self.error is not None:
+            raise self.error
+
+        response = requests.Response()
+        response.url = url
+        response.status_code = self.status_code
+        response.headers.update(self.headers)
+        body = self.body
+        if self.responder is not None:
+            body = self.responder(response, kwargs)
+        response.raw = io.BytesIO(body)
+
+        with self.lock:
+            self.responses.append(response)
+        return response
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from typing import Dict, Generator, List
+
+import pytest
+
+from waybackpy.async_cdx_api import AsyncWaybackMachineCDXServerAPI
+from waybackpy.cdx_snapshot import CDXSnapshot
+
+PAGE = (
+    "com,example)/ 20020120142510 http://example.com:80/ text/html 200 "
+    "HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA 1792\n"
+    "com,example)/ 20020328012821 http://www.example.com:80/ text/html 200 "
+    "HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA 1792"
+)
+
+
+def test_async_snapshots() -> None:
+    loop_thread_ids: List[int] = []
+
+    def fake_cdx_api_manager(
+        payload: Dict[str, str], headers: Dict[str, str]
+    ) -> Generator[str, None, None]:
+        loop_thread_ids.append(threading.get_ident())
+        yield PAGE
+        yield PAGE
+
+    async def collect(url: str) -> List[CDXSnapshot]:
+        api = AsyncWaybackMachineCDXServerAPI(url, start_timestamp="2002")
+        api.cdx_api.cdx_api_manager = fake_cdx_api_manager  # type: ignore
+        assert api.start_timestamp == "2002"
+        return [snapshot async for snapshot in api.snapshots()]
+
+    async def main() -> List[List[CDXSnapshot]]:
+        return await asyncio.gather(*(collect(f"example{i}.com") for i in range(5)))
+
+    results = asyncio.run(main())
+    assert len(results) == 5
+    for snapshots in results:
+        assert [snapshot.timestamp for snapshot in snapshots] == [
+            "20020120142510",
+            "20020328012821",
+        ] * 2
+    # the blocking page requests never ran on the event loop thread
+    assert threading.get_ident() not in loop_thread_ids
+
+
+def test_async_snapshots_cancelled() -> None:
+    started = threading.Event()
+    release = threading.Event()
+    closed = threading.Event()
+
+    def slow_cdx_api_manager(
+        payload: Dict[str, str], headers: Dict[str, str]
+    ) -> Generator[str, None, None]:
+        try:
+            started.set()
+            release.wait(5)
+            yield PAGE
+        finally:
+            closed.set()
+
+    async def consume() -> None:
+        api = AsyncWaybackMachineCDXServerAPI("example.com")
+        api.cdx_api.cdx_api_manager = slow_cdx_api_manager  # type: ignore
+        async for _ in api.snapshots():
+            pass
+
+    async def main() -> None:
+        task = asyncio.ensure_future(consume())
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        # Cancelled while the worker is inside next() of the generator.
+        task.cancel()
+        await asyncio.sleep(0.05)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert closed.wait(5)
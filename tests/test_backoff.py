@@ -0,0 +1,84 @@
+import time
+from email.utils import formatdate
+from typing import Dict, Optional
+
+import pytest
+import requests
+
+from waybackpy.backoff import (
+    BackoffPolicy,
+    ExponentialBackoff,
+    get_default_backoff_policy,
+    retry_after_seconds,
+)
+from waybackpy.save_api import WaybackMachineSaveAPI
+
+
+def response(
+    status_code: int, headers: Optional[Dict[str, str]] = None
+) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp.headers.update(headers or {})
+    return resp
+
+
+def test_retry_after_seconds() -> None:
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds(response(200)) is None
+    assert retry_after_seconds(response(429, {"Retry-After": "120"})) == 120
+    assert retry_after_seconds(response(429, {"Retry-After": "soon"})) is None
+
+    date = formatdate(time.time() + 60, usegmt=True)
+    seconds = retry_after_seconds(response(503, {"Retry-After": date}))
+    assert seconds is not None and 55 <= seconds <= 60
+
+    past = formatdate(time.time() - 60, usegmt=True)
+    assert retry_after_seconds(response(503, {"Retry-After": past})) == 0
+
+
+def test_exponential_backoff_delays() -> None:
+    policy = ExponentialBackoff(base_delay=1, factor=2, max_delay=5, jitter=0)
+    assert [policy.delay(tries, response(200)) for tries in range(1, 6)] == [
+        1,
+        2,
+        4,
+        5,
+        5,
+    ]
+    assert policy.delay(1, response(429)) == 300
+    assert policy.delay(1, response(509)) == 60
+    assert policy.delay(1, response(429, {"Retry-After": "7"})) == 7
+
+    jittered = ExponentialBackoff(base_delay=1, jitter=0.5)
+    assert all(1 <= jittered.delay(1, None) <= 1.5 for _ in range(20))
+
+    with pytest.raises(ValueError):
+        ExponentialBackoff(factor=0.5)
+
+    with pytest.raises(TypeError):
+        BackoffPolicy()  # type: ignore[abstract]
+
+
+def test_refusal_pauses_all_savers() -> None:
+    policy = ExponentialBackoff(base_delay=10, jitter=0, rate_limit_delay=0.2)
+    # An ordinary retry only delays the saver that failed.
+    assert policy.backoff(1, response(200)) == 10
+    assert policy.wait() == 0
+
+    # A 429 delays every saver sharing the policy.
+    assert policy.backoff(1, response(429)) == pytest.approx(0.2)
+    started = time.monotonic()
+    assert policy.wait() > 0
+    assert time.monotonic() - started >= 0.15
+
+
+def test_save_api_uses_backoff_policy() -> None:
+    policy = ExponentialBackoff()
+    assert get_default_backoff_policy() is get_default_backoff_policy()
+    assert WaybackMachineSaveAPI("https://example.com").backoff is (
+        get_default_backoff_policy()
+    )
+    assert WaybackMachineSaveAPI("https://example.com", backoff=policy).backoff is (
+        policy
+    )
@@ -0,0 +1,119 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+from urllib.parse import parse_qs
+
+import pytest
+import requests
+from click.testing import CliRunner
+
+import waybackpy.bulk_availability
+from tests.conftest import FakeTransport
+from waybackpy.bulk_availability import AvailabilityResult, lookup_batch, lookup_many
+from waybackpy.cli import main
+from waybackpy.exceptions import InvalidJSONInAvailabilityAPIResponse
+
+
+def batch_queries(kwargs: Dict[str, Any]) -> List[Dict[str, List[str]]]:
+    return [parse_qs(line) for line in kwargs["data"].split("\n")]
+
+
+def answer_batch(response: requests.Response, kwargs: Dict[str, Any]) -> bytes:
+    """
+    Answers the batch like the availability API, the URLs ending with "new"
+    are not archived.
+    """
+    results = []
+    for query in batch_queries(kwargs):
+        url_ = query["url"][0]
+        snapshots = {}
+        if not url_.endswith("new"):
+            snapshots["closest"] = {
+                "status": "200",
+                "available": True,
+                "url": f"http://web.archive.org/web/20150101000000/{url_}",
+                "timestamp": "20150101000000",
+            }
+        results.append({"url": url_, "archived_snapshots": snapshots})
+    return json.dumps({"results": results}).encode()
+
+
+def requested_timestamps(transport: FakeTransport) -> List[str]:
+    return [
+        query.get("timestamp", [""])[0]
+        for kwargs in transport.request_kwargs
+        for query in batch_queries(kwargs)
+    ]
+
+
+def test_lookup_many_in_batches() -> None:
+    transport = FakeTransport(responder=answer_batch)
+    urls = [f"https://example.com/{i}" for i in range(7)] + ["https://example.com/new"]
+    results = list(
+        lookup_many(urls, timestamp="2015", batch_size=3, transport=transport)
+    )
+
+    batch_sizes = [len(batch_queries(kwargs)) for kwargs in transport.request_kwargs]
+    assert sorted(batch_sizes) == [2, 3, 3]
+    assert set(requested_timestamps(transport)) == {"2015"}
+    by_url = {result.url: result for result in results}
+    assert sorted(by_url) == sorted(urls)
+    assert by_url["https://example.com/0"].archive_url == (
+        "https://web.archive.org/web/20150101000000/https://example.com/0"
+    )
+    assert by_url["https://example.com/0"].status == "200"
+    assert not by_url["https://example.com/new"].archived
+    assert by_url["https://example.com/new"].error is None
+
+    with pytest.raises(ValueError):
+        list(lookup_many(urls, batch_size=0))
+
+
+def test_lookup_batch_errors() -> None:
+    results = lookup_batch(
+        ["https://example.com/a", "https://example.com/b"],
+        transport=FakeTransport(b"<html>Bad gateway</html>"),
+    )
+    assert all(
+        isinstance(result.error, InvalidJSONInAvailabilityAPIResponse)
+        for result in results
+    )
+
+    results = lookup_batch(
+        ["https://example.com/a", "https://example.com/b"],
+        transport=FakeTransport(
+            json.dumps(
+                {
+                    "results": [
+                        {"url": "https://example.com/b", "archived_snapshots": {}}
+                    ]
+                }
+            ).encode()
+        ),
+    )
+    assert results[0].error is not None
+    assert results[1].error is None and not results[1].archived
+
+    assert not AvailabilityResult.from_json("a", {"archived_snapshots": None}).archived
+
+
+def test_cli_availability(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    transport = FakeTransport(responder=answer_batch)
+    monkeypatch.setattr(
+        waybackpy.bulk_availability, "get_default_transport", lambda: transport
+    )
+    input_file = tmp_path / "urls.txt"
+    input_file.write_text("https://example.com/a\nhttps://example.com/new\n")
+
+    result = CliRunner().invoke(
+        main,
+        ["--availability", "--input-file", str(input_file), "--year", "2015"],
+    )
+    assert result.exit_code == 0
+    assert result.stdout.splitlines() == [
+        "https://example.com/a\t"
+        "https://web.archive.org/web/20150101000000/https://example.com/a\t"
+        "20150101000000",
+        "https://example.com/new\tnot archived",
+    ]
+    assert requested_timestamps(transport) == ["2015", "2015"]
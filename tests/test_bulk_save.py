@@ -0,0 +1,141 @@
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pytest
+from click.testing import CliRunner
+
+import waybackpy.bulk_save
+from waybackpy.backoff import BackoffPolicy, ExponentialBackoff
+from waybackpy.bulk_save import save_many
+from waybackpy.cli import main
+from waybackpy.exceptions import TooManyRequestsError, WaybackError
+from waybackpy.transport import Transport
+
+
+class FakeSaveAPI:
+    calls: Dict[str, int] = {}
+    closed: List[str] = []
+    transports: List[Optional[Transport]] = []
+    starts: Dict[str, List[float]] = {}
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def __init__(self, url: str, **kwargs: Any) -> None:
+        self.url = url
+        FakeSaveAPI.transports.append(kwargs["transport"])
+        self.backoff: Optional[BackoffPolicy] = kwargs.get("backoff")
+        self.status_code = 200
+        self.cached_save = False
+
+    def recent_archive_url(self) -> Optional[str]:
+        if self.url.endswith("recent"):
+            return f"https://web.archive.org/web/20220101000000/{self.url}"
+        return None
+
+    def save(self) -> str:
+        with self.lock:
+            FakeSaveAPI.calls[self.url] = FakeSaveAPI.calls.get(self.url, 0) + 1
+            FakeSaveAPI.starts.setdefault(self.url, []).append(time.monotonic())
+            FakeSaveAPI.active += 1
+            FakeSaveAPI.max_active = max(FakeSaveAPI.max_active, FakeSaveAPI.active)
+        try:
+            time.sleep(0.01)
+            # Like save(), a refusal pauses the savers sharing the policy.
+            if self.url.endswith("limited") and FakeSaveAPI.calls[self.url] == 1:
+                self.status_code = 429
+                assert self.backoff is not None
+                self.backoff.pause(0.05)
+                raise TooManyRequestsError("429")
+            if self.url.endswith("sessions") and FakeSaveAPI.calls[self.url] == 1:
+                self.status_code = 509
+                assert self.backoff is not None
+                self.backoff.pause(0.05)
+                raise WaybackError("509")
+            if self.url.endswith("broken"):
+                self.status_code = 523
+                raise WaybackError("broken")
+            return f"https://web.archive.org/web/20220101000000/{self.url}"
+        finally:
+            with self.lock:
+                FakeSaveAPI.active -= 1
+
+    def close(self) -> None:
+        with self.lock:
+            FakeSaveAPI.closed.append(self.url)
+
+
+@pytest.fixture(autouse=True)
+def fake_save_api(monkeypatch: pytest.MonkeyPatch) -> None:
+    FakeSaveAPI.calls = {}
+    FakeSaveAPI.closed = []
+    FakeSaveAPI.transports = []
+    FakeSaveAPI.starts = {}
+    FakeSaveAPI.max_active = 0
+    monkeypatch.setattr(waybackpy.bulk_save, "WaybackMachineSaveAPI", FakeSaveAPI)
+
+
+def test_save_many() -> None:
+    urls = [f"https://example.com/{i}" for i in range(8)]
+    urls += ["https://example.com/limited", "https://example.com/sessions"]
+    urls += ["https://example.com/broken"]
+
+    transport = Transport()
+    policy = ExponentialBackoff()
+    results = list(save_many(urls, max_workers=3, transport=transport, backoff=policy))
+
+    assert sorted(result.url for result in results) == sorted(urls)
+    assert FakeSaveAPI.max_active <= 3
+    by_url = {result.url: result for result in results}
+    assert by_url["https://example.com/limited"].ok
+    assert by_url["https://example.com/limited"].attempts == 2
+    assert by_url["https://example.com/sessions"].archive_url is not None
+    assert not by_url["https://example.com/broken"].ok
+    assert by_url["https://example.com/broken"].attempts == 1
+
+    # The requests are paced by the save bucket of the transport.
+    assert all(used is transport for used in FakeSaveAPI.transports)
+
+    # The refused save is started again after the pause of the policy.
+    first, second = FakeSaveAPI.starts["https://example.com/limited"]
+    assert second - first >= 0.05
+
+    # The responses of the successful saves are closed.
+    assert sorted(FakeSaveAPI.closed) == sorted(
+        result.url for result in results if result.ok
+    )
+
+
+def test_recently_captured_urls_skipped() -> None:
+    urls = ["https://example.com/recent", "https://example.com/1"]
+    results = list(save_many(urls, backoff=ExponentialBackoff(), min_interval=3600))
+    by_url = {result.url: result for result in results}
+
+    assert by_url["https://example.com/recent"].skipped
+    assert by_url["https://example.com/recent"].attempts == 0
+    assert by_url["https://example.com/recent"].cached_save
+    assert "https://example.com/recent" not in FakeSaveAPI.calls
+    assert not by_url["https://example.com/1"].skipped
+    assert FakeSaveAPI.calls["https://example.com/1"] == 1
+
+
+def test_cli_input_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    policy = ExponentialBackoff()
+    monkeypatch.setattr(
+        waybackpy.bulk_save, "get_default_backoff_policy", lambda: policy
+    )
+    input_file = tmp_path / "urls.txt"
+    input_file.write_text(
+        "# urls\nhttps://example.com/a\n\nhttps://example.com/broken\n",
+        encoding="utf-8",
+    )
+    result = CliRunner().invoke(main, ["--save", "--input-file", str(input_file)])
+    assert result.exit_code == 0
+    lines: List[str] = result.stdout.splitlines()
+    assert lines[0] == (
+        "https://example.com/a\t"
+        "https://web.archive.org/web/20220101000000/https://example.com/a\tFalse"
+    )
+    assert "https://example.com/broken: broken" in result.stderr
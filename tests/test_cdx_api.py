@@ -1,10 +1,15 @@
 import random
 import string
+import time
+from typing import Dict, Generator, List, Optional, Tuple
 
 import pytest
 
+import waybackpy.cdx_api
+from tests.conftest import FakeTransport
 from waybackpy.cdx_api import WaybackMachineCDXServerAPI
-from waybackpy.exceptions import NoCDXRecordFound
+from waybackpy.cdx_snapshot import CDX_FIELDS
+from waybackpy.exceptions import NoCDXRecordFound, TooManyRequestsError, WaybackError
 
 
 def rndstr(n: int) -> str:
@@ -212,3 +217,242 @@ def test_after() -> None:
     assert "google" in after.urlkey
     assert after.original.find("google.com") != -1
     assert after.archive_url.find("google.com") != -1
+
+
+def test_paginated_pages_concurrent_order() -> None:
+    class FakePagesCDX(WaybackMachineCDXServerAPI):
+        requested: List[int] = []
+
+        def get_page(
+            self, payload: Dict[str, str], headers: Dict[str, str]
+        ) -> List[str]:
+            page = int(payload["page"])
+            self.requested.append(page)
+            # later pages finish first
+            time.sleep(0.01 * (10 - page % 10))
+            return [] if page >= 12 else [f"page-{page}"]
+
+    cdx = FakePagesCDX(url="example.com", use_pagination=True, max_workers=4)
+    pages = list(cdx.paginated_pages({}, {}, 10))
+    assert pages == [[f"page-{i}"] for i in range(10)]
+
+    # the two blank pages stop condition is still honored, only a bounded
+    # window of pages is requested ahead.
+    cdx.requested.clear()
+    gen = cdx.paginated_pages({}, {}, 1000)
+    for i, text in enumerate(gen):
+        if i > 13:
+            break
+    gen.close()
+    assert max(cdx.requested) < 14 + 2 * cdx.max_workers
+
+    with pytest.raises(ValueError):
+        WaybackMachineCDXServerAPI(url="example.com", max_workers=0)
+
+
+def test_resume_key_pages() -> None:
+    line = (
+        "com,example)/ 2002012014251{} http://example.com:80/ text/html 200 "
+        "HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA 1792"
+    )
+    pages = {
+        None: [line.format(0), line.format(1), "", "key-1"],
+        "key-1": [line.format(2), "", "key-2", ""],
+        "key-2": [line.format(3)],
+    }
+
+    class FakeResumeKeyCDX(WaybackMachineCDXServerAPI):
+        def page_lines(
+            self, payload: Dict[str, str], headers: Dict[str, str]
+        ) -> Generator[str, None, None]:
+            yield from pages[payload.get("resumeKey")]
+
+    cdx = FakeResumeKeyCDX(url="example.com")
+    timestamps = [snapshot.timestamp for snapshot in cdx.snapshots()]
+    assert timestamps == [f"2002012014251{i}" for i in range(4)]
+
+
+def test_fields_projection() -> None:
+    class FakeProjectedCDX(WaybackMachineCDXServerAPI):
+        def cdx_api_manager(
+            self, payload: Dict[str, str], headers: Dict[str, str]
+        ) -> Generator[str, None, None]:
+            assert payload["fl"] == "original,timestamp"
+            yield "http://example.com/ 20020120142510"
+            yield "http://example.com/about 20020328012821"
+
+    cdx = FakeProjectedCDX(url="example.com", fields=["original", "timestamp"])
+    assert list(cdx.raw_lines())[1] == "http://example.com/about 20020328012821"
+    snapshots = list(cdx.snapshots())
+    assert [snapshot.original for snapshot in snapshots] == [
+        "http://example.com/",
+        "http://example.com/about",
+    ]
+    assert snapshots[0].archive_url == (
+        "https://web.archive.org/web/20020120142510/http://example.com/"
+    )
+
+
+def test_window_search() -> None:
+    line = (
+        "com,example)/ {} http://example.com/ text/html 200 "
+        "HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA 1792"
+    )
+    timestamps = ["20020120142510", "20100601000000", "20160731233347"]
+
+    class FakeWindowCDX(WaybackMachineCDXServerAPI):
+        windows: List[Dict[str, str]] = []
+
+        def page_lines(
+            self, payload: Dict[str, str], headers: Dict[str, str]
+        ) -> Generator[str, None, None]:
+            self.windows.append(dict(payload))
+            assert "sort" not in payload
+            lines = [
+                line.format(timestamp)
+                for timestamp in timestamps
+                if payload["from"] <= timestamp <= payload["to"]
+            ]
+            if "fl" in payload:
+                indices = [
+                    CDX_FIELDS.index(field) for field in payload["fl"].split(",")
+                ]
+                lines = [
+                    " ".join(line.split(" ")[index] for index in indices)
+                    for line in lines
+                ]
+            yield from lines[:1] if payload["limit"] == "1" else lines[-1:]
+
+    cdx = FakeWindowCDX(url="example.com")
+    snapshot = cdx.before(wayback_machine_timestamp=20160731233347)
+    assert snapshot.timestamp == "20100601000000"
+    assert cdx.windows[0]["to"] == "20160731233346"
+    assert cdx.windows[0]["from"] == "20160730233347"
+    assert all(window["limit"] == "-1" for window in cdx.windows)
+
+    cdx.windows.clear()
+    snapshot = cdx.after(wayback_machine_timestamp=20100601000000)
+    assert snapshot.timestamp == "20160731233347"
+    assert len(cdx.windows) < 10
+
+    cdx = FakeWindowCDX(url="example.com", end_timestamp="2009")
+    assert cdx.before(year=2020, month=1, day=1, hour=0, minute=0).timestamp == (
+        "20020120142510"
+    )
+    with pytest.raises(NoCDXRecordFound):
+        cdx.after(year=2002, month=6, day=1, hour=0, minute=0)
+
+    # The timestamp is needed to compare the snapshots.
+    cdx = FakeWindowCDX(url="example.com", fields=["original"])
+    snapshot = cdx.before(wayback_machine_timestamp=20160731233347)
+    assert snapshot.timestamp == "20100601000000"
+    assert cdx.windows[-1]["fl"] == "original,timestamp"
+
+    class FakeClosestCDX(WaybackMachineCDXServerAPI):
+        payloads: List[Dict[str, str]] = []
+
+        def page_lines(
+            self, payload: Dict[str, str], headers: Dict[str, str]
+        ) -> Generator[str, None, None]:
+            self.payloads.append(dict(payload))
+            yield from (line.format(timestamp) for timestamp in reversed(timestamps))
+
+    # A wildcard URL is an implicit prefix query, the closest sort is scanned.
+    closest_cdx = FakeClosestCDX(url="example.com/*")
+    snapshot = closest_cdx.before(wayback_machine_timestamp=20160731233347)
+    assert snapshot.timestamp == "20100601000000"
+    assert closest_cdx.payloads[-1]["sort"] == "closest"
+
+
+def test_edge_snapshots() -> None:
+    line = (
+        "com,example)/ {} http://example.com/ text/html 200 "
+        "HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA 1792"
+    )
+
+    class FakeEdgeCDX(WaybackMachineCDXServerAPI):
+        payloads: List[Dict[str, str]] = []
+
+        def page_lines(
+            self, payload: Dict[str, str], headers: Dict[str, str]
+        ) -> Generator[str, None, None]:
+            self.payloads.append(dict(payload))
+            if payload.get("sort") == "closest":
+                yield line.format("20100601000000")
+            elif payload["limit"] == "1":
+                yield line.format("19970101000000")
+            else:
+                yield "<html><body>fastLatest is not supported here</body></html>"
+
+    cdx = FakeEdgeCDX(url="example.com")
+    assert cdx.oldest().timestamp == "19970101000000"
+    assert "sort" not in cdx.payloads[-1]
+
+    # an unsupported fastLatest request falls back to near()
+    assert cdx.newest().timestamp == "20100601000000"
+    assert cdx.payloads[-2]["fastLatest"] == "true"
+    assert cdx.payloads[-1]["sort"] == "closest"
+
+    cdx = FakeEdgeCDX(url="example.com", match_type="prefix")
+    assert cdx.oldest().timestamp == "20100601000000"
+    cdx = FakeEdgeCDX(url="example.com/*")
+    assert cdx.oldest().timestamp == "20100601000000"
+
+    # An error page is not mistaken for a URL without snapshots.
+    error_cdx = WaybackMachineCDXServerAPI(
+        url="example.com", transport=FakeTransport(b"Busy", status_code=503)
+    )
+    with pytest.raises(WaybackError):
+        error_cdx.edge_snapshot(newest=True)
+
+
+def test_record_count(monkeypatch: pytest.MonkeyPatch) -> None:
+    class FakeCountCDX(WaybackMachineCDXServerAPI):
+        payloads: List[Dict[str, str]] = []
+
+        def count_page(
+            self, payload: Dict[str, str], headers: Dict[str, str]
+        ) -> Tuple[int, Optional[str]]:
+            self.payloads.append(dict(payload))
+            assert payload["fl"] == "timestamp"
+            if "page" in payload:
+                return 10 * int(payload["page"]), None
+            if payload.get("resumeKey") == "key-1":
+                return 3, None
+            return 5, "key-1"
+
+    assert FakeCountCDX(url="example.com").count() == 8
+    assert FakeCountCDX.payloads[-1]["resumeKey"] == "key-1"
+
+    monkeypatch.setattr(waybackpy.cdx_api, "get_total_pages", lambda *_, **__: 4)
+    cdx = FakeCountCDX(url="example.com", use_pagination=True, max_workers=3)
+    assert cdx.count() == 60
+
+
+def test_record_count_error_status() -> None:
+    error_page = b"<html>\n<p>Too many requests</p>\n</html>\n"
+
+    # The lines of an error page are not counted as records.
+    cdx = WaybackMachineCDXServerAPI(
+        url="example.com", transport=FakeTransport(error_page, status_code=429)
+    )
+    with pytest.raises(TooManyRequestsError):
+        cdx.count()
+    cdx = WaybackMachineCDXServerAPI(
+        url="example.com", transport=FakeTransport(error_page, status_code=503)
+    )
+    with pytest.raises(WaybackError):
+        cdx.count()
+
+
+def test_gzip_payload() -> None:
+    for gzip, expected in [
+        (None, "false"),
+        (True, "true"),
+        ("true", "true"),
+        (False, "false"),
+        ("false", "false"),
+    ]:
+        payload: Dict[str, str] = {}
+        WaybackMachineCDXServerAPI("example.com", gzip=gzip).add_payload(payload)
+        assert payload["gzip"] == expected
@@ -0,0 +1,61 @@
+from typing import Dict, Generator
+
+import pytest
+
+from waybackpy.cdx_api import WaybackMachineCDXServerAPI
+from waybackpy.cdx_batch import CDXSnapshotBatch
+from waybackpy.exceptions import WaybackError
+
+LINES = [
+    "com,example)/ 20020120142510 http://example.com:80/ text/html 200 "
+    "HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA 1792",
+    "com,example)/ 20020328012821 http://www.example.com:80/ text/html - "
+    "HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA -",
+    "com,example)/robots.txt 20020401000000 http://example.com/robots.txt "
+    "text/plain 404 3I42H3S6NNFQ2MSVX7XZKYAYSCX5QBYJ 250",
+]
+
+
+def test_from_lines() -> None:
+    batch = CDXSnapshotBatch.from_lines(LINES)
+
+    assert len(batch) == 3
+    assert list(batch.timestamp) == [20020120142510, 20020328012821, 20020401000000]
+    assert list(batch.statuscode) == [200, -1, 404]
+    assert list(batch.length) == [1792, -1, 250]
+    assert list(batch.mimetype_codes) == [0, 0, 1]
+    assert batch.mimetype_categories == ["text/html", "text/plain"]
+    assert batch.mimetype == ["text/html", "text/html", "text/plain"]
+    assert batch.urlkey == [line.split(" ")[0] for line in LINES]
+    assert batch.original is not None
+    assert batch.digest is not None
+    assert batch.original[2] == "http://example.com/robots.txt"
+    assert batch.digest[1] == "HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA"
+
+    with pytest.raises(WaybackError):
+        CDXSnapshotBatch.from_lines(["com,example)/ 20020120142510"])
+
+
+def test_snapshot_batches() -> None:
+    class FakeCDX(WaybackMachineCDXServerAPI):
+        def cdx_api_manager(
+            self, payload: Dict[str, str], headers: Dict[str, str]
+        ) -> Generator[str, None, None]:
+            for _ in range(3):
+                yield from LINES
+
+    cdx = FakeCDX(url="example.com")
+    batches = list(cdx.snapshot_batches(batch_size=4))
+    assert [len(batch) for batch in batches] == [4, 4, 1]
+    assert sum(int(batch.length[0]) for batch in batches) == 1792 + 250 - 1
+
+
+def test_from_lines_with_fields() -> None:
+    batch = CDXSnapshotBatch.from_lines(
+        ["20020120142510 text/html", "20020328012821 text/plain"],
+        ["timestamp", "mimetype"],
+    )
+    assert len(batch) == 2
+    assert list(batch.timestamp) == [20020120142510, 20020328012821]
+    assert batch.mimetype == ["text/html", "text/plain"]
+    assert batch.original is None and batch.length is None
@@ -0,0 +1,89 @@
+import time
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from tests.conftest import FakeTransport
+from waybackpy.cdx_api import WaybackMachineCDXServerAPI
+from waybackpy.cdx_cache import (
+    CDXCache,
+    FileSystemCDXCache,
+    MemoryCDXCache,
+    SQLiteCDXCache,
+)
+from waybackpy.exceptions import TooManyRequestsError
+
+PAGE = (
+    b"com,example)/ 20020120142510 http://example.com:80/ text/html 200 "
+    b"HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA 1792\n"
+)
+
+
+def caches(tmp_path: Path) -> List[CDXCache]:
+    return [
+        MemoryCDXCache(max_size=100),
+        FileSystemCDXCache(str(tmp_path / "pages"), max_size=100),
+        SQLiteCDXCache(str(tmp_path / "pages.sqlite"), max_size=100),
+    ]
+
+
+def test_cache_backends(tmp_path: Path) -> None:
+    for cache in caches(tmp_path):
+        assert cache.get("a") is None
+        cache.set("a", b"a" * 40)
+        time.sleep(0.01)
+        cache.set("b", b"b" * 40, ttl=None)
+        assert cache.get("b") == b"b" * 40
+        time.sleep(0.01)
+
+        # "b" is the least recently used entry and gets evicted.
+        cache.get("a")
+        time.sleep(0.01)
+        cache.set("c", b"c" * 30)
+        assert cache.get("b") is None
+        assert cache.get("a") == b"a" * 40
+        assert cache.get("c") == b"c" * 30
+
+        cache.set("e", b"x", ttl=-1)
+        assert cache.get("e") is None
+
+        cache.delete("a")
+        assert cache.get("a") is None
+        cache.clear()
+        assert cache.get("c") is None
+
+
+def test_cached_query(tmp_path: Path) -> None:
+    transport = FakeTransport(PAGE)
+    cache = FileSystemCDXCache(str(tmp_path))
+
+    for _ in range(2):
+        cdx = WaybackMachineCDXServerAPI(
+            "example.com", transport=transport, cache=cache, end_timestamp="2003"
+        )
+        snapshots = list(cdx.snapshots())
+        assert [snapshot.timestamp for snapshot in snapshots] == ["20020120142510"]
+
+    assert len(transport.requested) == 1
+    # a closed time window is cached indefinitely
+    assert cdx.cache_ttl() is None
+    cdx.end_timestamp = None
+    assert cdx.cache_ttl() == cache.default_ttl
+
+    with pytest.raises(ValueError):
+        MemoryCDXCache(max_size=0)
+    with pytest.raises(TypeError):
+        CDXCache()  # type: ignore[abstract]
+
+
+def test_error_page_not_cached() -> None:
+    transport = FakeTransport(b"<html>Too Many Requests</html>", status_code=429)
+    cache = MemoryCDXCache()
+    cdx = WaybackMachineCDXServerAPI(
+        "example.com", transport=transport, cache=cache, end_timestamp="2003"
+    )
+    with pytest.raises(TooManyRequestsError):
+        list(cdx.page_lines({"url": "example.com"}, {}))
+    assert transport.requested
+    assert cache.get(transport.requested[0]) is None
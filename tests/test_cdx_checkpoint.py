@@ -0,0 +1,119 @@
+import json
+from pathlib import Path
+from typing import Dict, Generator, List
+
+import pytest
+
+import waybackpy.cdx_api
+from waybackpy.cdx_api import WaybackMachineCDXServerAPI
+from waybackpy.cdx_checkpoint import CDXCheckpoint
+from waybackpy.exceptions import WaybackError
+
+LINE = (
+    "com,example)/ 200201201425{:02d} http://example.com:80/ text/html 200 "
+    "HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA 1792"
+)
+
+
+class FlakyCDX(WaybackMachineCDXServerAPI):
+    """
+    Serves the pages from memory and fails once after fail_after lines.
+    """
+
+    pages: Dict[str, List[str]] = {}
+    fail_after = -1
+    served = 0
+
+    def page_lines(
+        self, payload: Dict[str, str], headers: Dict[str, str]
+    ) -> Generator[str, None, None]:
+        key = payload.get("page", payload.get("resumeKey", ""))
+        for line in self.pages[key]:
+            if FlakyCDX.served == FlakyCDX.fail_after:
+                FlakyCDX.fail_after = -1
+                raise WaybackError("network blip")
+            if line and not line.startswith("key"):
+                FlakyCDX.served += 1
+            yield line
+
+
+def test_load_and_save(tmp_path: Path) -> None:
+    path = str(tmp_path / "crawl.json")
+    checkpoint = CDXCheckpoint.load(path)
+    assert checkpoint.page == 0 and checkpoint.resume_key is None
+
+    checkpoint.start("https://web.archive.org/cdx/search/cdx?url=example.com")
+    checkpoint.record()
+    checkpoint.next_page(resume_key="key-1")
+    checkpoint.record()
+    checkpoint.save()
+
+    loaded = CDXCheckpoint.load(path)
+    assert loaded.resume_key == "key-1"
+    assert loaded.offset == 1 and loaded.emitted == 2
+    with pytest.raises(WaybackError):
+        loaded.start("https://web.archive.org/cdx/search/cdx?url=example.org")
+
+    Path(path).write_text("{", encoding="utf-8")
+    with pytest.raises(WaybackError):
+        CDXCheckpoint.load(path)
+
+
+def test_resume_key_crawl(tmp_path: Path) -> None:
+    path = str(tmp_path / "crawl.json")
+    FlakyCDX.pages = {
+        "": [LINE.format(0), LINE.format(1), "", "key-1"],
+        "key-1": [LINE.format(2), LINE.format(3), "", "key-2"],
+        "key-2": [LINE.format(4)],
+    }
+    FlakyCDX.served = 0
+    FlakyCDX.fail_after = 3
+
+    timestamps = []
+    with pytest.raises(WaybackError):
+        for snapshot in FlakyCDX(url="example.com", resume_from=path).snapshots():
+            timestamps.append(snapshot.timestamp)
+
+    saved = json.loads(Path(path).read_text(encoding="utf-8"))
+    assert saved["resume_key"] == "key-1" and saved["offset"] == 1
+
+    for snapshot in FlakyCDX(url="example.com", resume_from=path).snapshots():
+        timestamps.append(snapshot.timestamp)
+
+    assert timestamps == [f"200201201425{i:02d}" for i in range(5)]
+    checkpoint = CDXCheckpoint.load(path)
+    assert checkpoint.complete and checkpoint.emitted == 5
+
+    # a complete crawl is not run again
+    assert not list(FlakyCDX(url="example.com", resume_from=path).snapshots())
+
+
+def test_paginated_crawl(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(waybackpy.cdx_api, "get_total_pages", lambda *_, **__: 3)
+    path = str(tmp_path / "crawl.json")
+    FlakyCDX.pages = {
+        "0": [LINE.format(0), LINE.format(1), ""],
+        "1": [LINE.format(2), LINE.format(3), LINE.format(4), ""],
+        "2": [LINE.format(5)],
+    }
+    FlakyCDX.served = 0
+    FlakyCDX.fail_after = 4
+
+    crawl = FlakyCDX(url="example.com", use_pagination=True, resume_from=path)
+    lines = []
+    with pytest.raises(WaybackError):
+        for line in crawl.raw_lines():
+            lines.append(line)
+
+    checkpoint = CDXCheckpoint.load(path)
+    assert checkpoint.page == 1 and checkpoint.offset == 2
+
+    # a consumer stopping early also keeps its position
+    crawl = FlakyCDX(url="example.com", use_pagination=True, resume_from=path)
+    for line in crawl.raw_lines():
+        lines.append(line)
+        break
+
+    crawl = FlakyCDX(url="example.com", use_pagination=True, resume_from=path)
+    lines.extend(crawl.raw_lines())
+    assert lines == [LINE.format(i) for i in range(6)]
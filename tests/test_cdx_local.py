@@ -0,0 +1,45 @@
+import pytest
+
+from waybackpy.cdx_local import CDXLocalQuery, compile_collapse, compile_filter
+from waybackpy.cdx_snapshot import CDXSnapshot
+from waybackpy.exceptions import WaybackError
+
+LINES = [
+    "com,example)/ 20100101000000 http://example.com/ text/html 200 AAAA 100",
+    "com,example)/ 20100101120000 http://example.com/ text/html 200 AAAA 100",
+    "com,example)/ 20100102000000 http://example.com/ text/html 404 BBBB 100",
+    "com,example)/ 20100102000001 http://example.com/ text/html 200 CCCC 100",
+    "com,example)/a 20100102000002 http://example.com/a image/png 200 DDDD 100",
+]
+
+
+def test_compile() -> None:
+    record = LINES[0].split(" ")
+    assert compile_filter("statuscode:200")(record)
+    assert not compile_filter("statuscode:20")(record)
+    assert compile_filter("!mimetype:image/.*")(record)
+    assert compile_collapse("timestamp:8") == (1, 8)
+    assert compile_collapse("digest") == (5, None)
+
+    with pytest.raises(WaybackError):
+        compile_filter("statuscode:200", fields=["original"])
+    with pytest.raises(WaybackError):
+        compile_filter("foo:bar")
+
+
+def test_local_query() -> None:
+    query = CDXLocalQuery(filters=["statuscode:200"], collapses=["timestamp:8"])
+    assert list(query.lines(LINES + [""])) == [LINES[0], LINES[3]]
+
+    query = CDXLocalQuery(collapses=["digest"])
+    snapshots = [CDXSnapshot.from_line(line) for line in LINES]
+    assert [s.timestamp for s in query.snapshots(snapshots)] == [
+        "20100101000000",
+        "20100102000000",
+        "20100102000001",
+        "20100102000002",
+    ]
+
+    query = CDXLocalQuery(filters=["!original:.*/a"], fields=["original", "timestamp"])
+    projected = [" ".join(line.split(" ")[1:3][::-1]) for line in LINES]
+    assert len(list(query.lines(projected))) == 4
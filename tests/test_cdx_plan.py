@@ -0,0 +1,53 @@
+from typing import Any, Dict
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from tests.conftest import FakeTransport
+from waybackpy.cdx_api import WaybackMachineCDXServerAPI
+from waybackpy.cdx_plan import LINES_PER_BLOCK, CDXPagePlan
+
+
+def index_page(response: requests.Response, kwargs: Dict[str, Any]) -> bytes:
+    query = dict(parse_qsl(urlsplit(response.url).query))
+    if "showNumPages" in query:
+        return b"2\n"
+    page = int(query["page"])
+    return (
+        f"com,example)/a{page} 2002012014251{page}\tcdx-0.gz\t0\t100\t1\n"
+        f"com,example)/b{page} 2003012014251{page}\tcdx-0.gz\t100\t100\t2\n"
+    ).encode()
+
+
+def test_plan_pages() -> None:
+    transport = FakeTransport(responder=index_page)
+    cdx = WaybackMachineCDXServerAPI(
+        "example.com",
+        match_type="prefix",
+        start_timestamp="2002",
+        filters=["statuscode:200"],
+        use_pagination=True,
+        page_size=2,
+        transport=transport,
+    )
+
+    plan = cdx.plan_pages()
+    query = transport.queries[0]
+    assert query["matchType"] == "prefix" and query["from"] == "2002"
+    assert query["filter"] == "statuscode:200" and query["pageSize"] == "2"
+    assert "gzip" not in query
+    assert plan.total_pages == 2 and plan.boundaries is None
+    assert plan.estimated_records == 2 * 2 * LINES_PER_BLOCK
+
+    plan = cdx.plan_pages(show_paged_index=True)
+    assert [q["showPagedIndex"] for q in transport.queries[2:]] == ["true"] * 2
+    assert plan.boundaries == [
+        "com,example)/a0 20020120142510",
+        "com,example)/a1 20020120142511",
+    ]
+    assert plan.estimated_blocks == 4
+
+
+def test_plan_estimates() -> None:
+    assert CDXPagePlan(3).estimated_records == 3 * 50 * LINES_PER_BLOCK
+    assert CDXPagePlan(0).estimated_records == 0
@@ -0,0 +1,110 @@
+from datetime import datetime
+from typing import Dict, Generator, List
+
+from waybackpy.cdx_api import WaybackMachineCDXServerAPI
+from waybackpy.cdx_shard import (
+    merge_key,
+    plan_windows,
+    split_window,
+    time_range,
+    timestamp_to_datetime,
+)
+from waybackpy.cdx_snapshot import CDX_FIELDS
+
+RECORDS = sorted(
+    f"com,example)/{path} {year}0{month}01000000 http://example.com/{path} "
+    "text/html 200 HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA 1792"
+    for path in ("a", "b")
+    for year in (2001, 2002, 2010)
+    for month in range(1, 10 if year == 2010 else 3)
+)
+
+
+class FakeShardedCDX(WaybackMachineCDXServerAPI):
+    windows: List[str] = []
+
+    def page_lines(
+        self, payload: Dict[str, str], headers: Dict[str, str]
+    ) -> Generator[str, None, None]:
+        lines = [
+            line
+            for line in RECORDS
+            if payload["from"] <= line.split(" ")[1] <= payload["to"]
+        ]
+        if payload.get("fl") == "timestamp":
+            yield from sorted({line.split(" ")[1][:8] for line in lines})
+            return
+        if "fl" in payload:
+            indices = [CDX_FIELDS.index(field) for field in payload["fl"].split(",")]
+            lines = [
+                " ".join(line.split(" ")[index] for index in indices) for line in lines
+            ]
+
+        self.windows.append(payload["from"])
+        start = int(payload.get("resumeKey", 0))
+        end = start + int(payload["limit"])
+        yield from lines[start:end]
+        if end < len(lines):
+            yield ""
+            yield str(end)
+
+
+def test_time_range() -> None:
+    assert timestamp_to_datetime("2002") == datetime(2002, 1, 1)
+    assert timestamp_to_datetime("200202", end=True) == datetime(
+        2002, 2, 28, 23, 59, 59
+    )
+    start, end = time_range(None, "2003")
+    assert start == datetime(1996, 1, 1) and end == datetime(2003, 12, 31, 23, 59, 59)
+
+
+def test_plan_windows() -> None:
+    window = (datetime(2000, 1, 1), datetime(2009, 12, 31, 23, 59, 59))
+    windows = split_window(window, 3)
+    assert windows[0][0] == window[0] and windows[-1][1] == window[1]
+    assert all(
+        (later[0] - earlier[1]).total_seconds() == 1
+        for earlier, later in zip(windows, windows[1:])
+    )
+
+    # the dense year gets most of the windows, the sparse years are joined.
+    windows = plan_windows(window, 4, {2000: 1, 2001: 1, 2005: 6})
+    assert len(windows) == 4
+    assert sum(1 for start, end in windows if start.year <= 2005 <= end.year) == 3
+    assert windows[0][1].year == 2001 and windows[-1][1] == window[1]
+
+    assert len(plan_windows(window, 4, {})) == 4
+
+
+def test_merge_key() -> None:
+    key = merge_key(["original", "timestamp"])
+    assert key("http://example.com/ 20020120142510") == ("20020120142510",)
+
+
+def test_sharded_query() -> None:
+    cdx = FakeShardedCDX(
+        "example.com",
+        match_type="prefix",
+        start_timestamp="2000",
+        end_timestamp="2010",
+        limit="2",
+        shards=3,
+    )
+    lines = list(cdx.raw_lines())
+    assert lines == RECORDS
+    assert len(set(cdx.windows)) > 1
+
+
+def test_sharded_prefix_query_with_fields() -> None:
+    cdx = FakeShardedCDX(
+        "example.com",
+        match_type="prefix",
+        start_timestamp="2000",
+        end_timestamp="2010",
+        limit="2",
+        shards=3,
+        fields=["timestamp", "original"],
+    )
+    lines = list(cdx.raw_lines())
+    # In the order of the CDX server, the URLs then the timestamps.
+    assert lines == [" ".join(record.split(" ")[1:3]) for record in RECORDS]
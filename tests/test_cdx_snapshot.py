@@ -1,6 +1,9 @@
 from datetime import datetime
 
+import pytest
+
 from waybackpy.cdx_snapshot import CDXSnapshot
+from waybackpy.exceptions import WaybackError
 
 
 def test_CDXSnapshot() -> None:
@@ -42,3 +45,38 @@ def test_CDXSnapshot() -> None:
     assert archive_url == snapshot.archive_url
     assert sample_input == str(snapshot)
     assert sample_input == repr(snapshot)
+
+
+def test_CDXSnapshot_from_line() -> None:
+    sample_input = (
+        "org,archive)/ 20080126045828 http://github.com "
+        "text/html 200 Q4YULN754FHV2U6Q5JUT6Q2P57WEWNNY 1415"
+    )
+    snapshot = CDXSnapshot.from_line(sample_input)
+
+    assert not hasattr(snapshot, "__dict__")
+    assert snapshot.original == "http://github.com"
+    assert snapshot.length == "1415"
+    assert snapshot.datetime_timestamp == datetime(2008, 1, 26, 4, 58, 28)
+    assert (
+        snapshot.archive_url
+        == "https://web.archive.org/web/20080126045828/http://github.com"
+    )
+    assert sample_input == str(snapshot)
+
+    with pytest.raises(WaybackError):
+        CDXSnapshot.from_line("org,archive)/ 20080126045828 http://github.com")
+
+
+def test_CDXSnapshot_from_line_with_fields() -> None:
+    fields = ["timestamp", "original"]
+    snapshot = CDXSnapshot.from_line("20080126045828 http://github.com", fields)
+
+    assert snapshot.timestamp == "20080126045828"
+    assert (
+        snapshot.archive_url
+        == "https://web.archive.org/web/20080126045828/http://github.com"
+    )
+    assert str(snapshot) == "20080126045828 http://github.com"
+    with pytest.raises(AttributeError):
+        _ = snapshot.digest
@@ -0,0 +1,75 @@
+from datetime import datetime
+from typing import Dict, Generator, List
+
+import pytest
+
+from waybackpy.cdx_api import WaybackMachineCDXServerAPI
+from waybackpy.cdx_snapshot import CDXSnapshot
+from waybackpy.cdx_timeline import SnapshotTimeline, to_seconds
+from waybackpy.exceptions import NoCDXRecordFound
+
+LINE = (
+    "com,example)/ {} http://example.com/ text/html 200 "
+    "HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA 1792"
+)
+TIMESTAMPS = ["20100101000000", "20100301000000", "20100110000000"]
+
+
+def snapshots(timestamps: List[str]) -> List[CDXSnapshot]:
+    return [CDXSnapshot.from_line(LINE.format(t)) for t in timestamps]
+
+
+def test_to_seconds() -> None:
+    assert to_seconds("19700101000001") == 1
+    assert to_seconds(datetime(1970, 1, 2)) == 86400
+    assert to_seconds("1970") == 0
+    assert to_seconds("1970", end=True) == 365 * 86400 - 1
+
+
+def test_lookups() -> None:
+    timeline = SnapshotTimeline(snapshots(TIMESTAMPS))
+    assert len(timeline) == 3
+    assert timeline.near("20100104").timestamp == "20100101000000"
+    assert timeline.near("20100107").timestamp == "20100110000000"
+    assert timeline.near(20300101).timestamp == "20100301000000"
+    assert timeline.before("20100110000000").timestamp == "20100101000000"
+    assert timeline.after("20100110000000").timestamp == "20100301000000"
+    assert [s.timestamp for s in timeline.between("201001", "201001")] == [
+        "20100101000000",
+        "20100110000000",
+    ]
+    assert [s.timestamp for s in timeline.near_many(["2009", "20100220"])] == [
+        "20100101000000",
+        "20100301000000",
+    ]
+    assert str(timeline.near("2010")) == LINE.format("20100101000000")
+
+    with pytest.raises(NoCDXRecordFound):
+        timeline.before("2009")
+    with pytest.raises(NoCDXRecordFound):
+        SnapshotTimeline().near("2010")
+
+
+def test_refresh() -> None:
+    class FakeTimelineCDX(WaybackMachineCDXServerAPI):
+        captures = TIMESTAMPS[:]
+
+        def cdx_api_manager(
+            self, payload: Dict[str, str], headers: Dict[str, str]
+        ) -> Generator[str, None, None]:
+            for timestamp in sorted(self.captures):
+                if timestamp >= payload.get("from", ""):
+                    yield LINE.format(timestamp)
+
+    cdx = FakeTimelineCDX(url="example.com")
+    timeline = SnapshotTimeline.from_cdx(cdx)
+    assert timeline.refresh() == 0
+
+    FakeTimelineCDX.captures.append("20100401000000")
+    assert timeline.refresh() == 1
+    assert timeline.near("2011").timestamp == "20100401000000"
+
+    # snapshots older than the timeline are sorted in place
+    timeline.extend(snapshots(["20000101000000"]))
+    assert timeline.near("1999").timestamp == "20000101000000"
+    assert len(timeline) == 5
@@ -1,17 +1,24 @@
-from typing import Any, Dict, List
+import gzip
+import io
+from typing import Any, Dict, List, Optional, Tuple
 
 import pytest
+import requests
 
 from waybackpy.cdx_utils import (
     check_collapses,
+    check_fields,
     check_filters,
     check_match_type,
     check_sort,
+    count_response_lines,
     full_url,
     get_response,
     get_total_pages,
+    iter_response_lines,
+    split_resume_key,
 )
-from waybackpy.exceptions import WaybackError
+from waybackpy.exceptions import BlockedSiteError, WaybackError
 
 
 def test_get_total_pages() -> None:
@@ -111,3 +118,69 @@ def test_check_sort() -> None:
 
     with pytest.raises(WaybackError):
         assert check_sort("random crap")
+
+
+def streamed_response(body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    return response
+
+
+def test_iter_response_lines() -> None:
+    body = b"a b c\r\nd e f\n\nresume-key"
+    lines = list(iter_response_lines(streamed_response(body), chunk_size=3))
+    assert lines == ["a b c", "d e f", "", "resume-key"]
+
+    body = (
+        b"org.archive.util.io.RuntimeIOException: "
+        b"org.archive.wayback.exception.AdministrativeAccessControlException: "
+        b"Blocked Site Error\n"
+    )
+    with pytest.raises(BlockedSiteError):
+        list(iter_response_lines(streamed_response(body)))
+
+
+def test_iter_response_lines_gzip() -> None:
+    body = gzip.compress(b"a b c\nd e ") + gzip.compress(b"f\n\nresume-key\n")
+    lines = list(iter_response_lines(streamed_response(body), chunk_size=7))
+    assert lines == ["a b c", "d e f", "", "resume-key"]
+
+
+def test_split_resume_key() -> None:
+    def split(lines: List[str]) -> Tuple[List[str], Optional[str]]:
+        gen = split_resume_key(lines)
+        data = []
+        while True:
+            try:
+                data.append(next(gen))
+            except StopIteration as stop:
+                return data, stop.value
+
+    assert split(["a", "b", "", "key", ""]) == (["a", "b"], "key")
+    assert split(["a", "b"]) == (["a", "b"], None)
+    assert split(["a", "", "b", "", "key"]) == (["a", "b"], "key")
+    assert split(["", "a"]) == (["a"], None)
+    assert split([]) == ([], None)
+
+
+def test_check_fields() -> None:
+    assert check_fields([])
+    assert check_fields(["original", "timestamp"])
+
+    with pytest.raises(WaybackError):
+        check_fields("original")  # type: ignore[arg-type]
+
+    with pytest.raises(WaybackError):
+        check_fields(["archive_url"])
+
+
+def test_count_response_lines() -> None:
+    def count(body: bytes) -> Tuple[int, Optional[str]]:
+        return count_response_lines(streamed_response(body), chunk_size=4)
+
+    assert count(b"a b c\r\nd e f\n\nresume-key\n") == (2, "resume-key")
+    assert count(b"a b c\nd e f\ng h i") == (3, None)
+    assert count(b"a b c\nd e f\n\n") == (2, None)
+    assert count(b"") == (0, None)
+    assert count(gzip.compress(b"a\nb\n\nkey")) == (2, "key")
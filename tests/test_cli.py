@@ -1,8 +1,19 @@
+import gzip
+import io
+import json
+import sys
+from pathlib import Path
+from typing import Generator
+
+import click
+import pytest
 import requests
 from click.testing import CliRunner
 
 from waybackpy import __version__
-from waybackpy.cli import main
+from waybackpy.cdx_api import WaybackMachineCDXServerAPI
+from waybackpy.cli import compile_cdx_print, main, open_output, save_urls_on_file
+from waybackpy.exceptions import WaybackError
 
 
 def test_oldest() -> None:
@@ -134,3 +145,95 @@ def test_known_url() -> None:
     assert result.exit_code == 0
     assert result.output.count("\n") > 40
     assert result.output.count("akamhy.github.io") > 40
+
+
+def test_compile_cdx_print() -> None:
+    line = (
+        "com,example)/ 20020120142510 http://example.com/ text/html 200 "
+        "HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA 1792"
+    )
+    columns, fields, to_row = compile_cdx_print(["archive-url", "status_code"])
+    assert columns == ["statuscode", "archive_url"]
+    assert fields == ["timestamp", "original", "statuscode"]
+    assert to_row("20020120142510 http://example.com/ 200") == [
+        "200",
+        "https://web.archive.org/web/20020120142510/http://example.com/",
+    ]
+    assert to_row("") is None
+    with pytest.raises(WaybackError):
+        to_row("invalid")
+
+    columns, fields, to_row = compile_cdx_print([])
+    assert fields == [] and to_row(line) == line.split(" ")
+    assert to_row("invalid") is None
+
+
+def test_open_output_text_stdout(monkeypatch: pytest.MonkeyPatch) -> None:
+    stdout = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", stdout)
+    with open_output() as out:
+        out.write("20020120142510 http://example.com/\n")
+    assert stdout.getvalue() == "20020120142510 http://example.com/\n"
+    with pytest.raises(click.ClickException):
+        with open_output(compress=True):
+            pass
+
+
+def test_formatted_cdx_output(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    def raw_lines(self: WaybackMachineCDXServerAPI) -> Generator[str, None, None]:
+        assert self.fields == ["timestamp", "original"]
+        yield "20020120142510 http://example.com/"
+        yield "20020328012821 http://example.com/about"
+
+    monkeypatch.setattr(WaybackMachineCDXServerAPI, "raw_lines", raw_lines)
+    runner = CliRunner()
+    args = ["--url", "example.com", "--cdx", "--cdx-print", "original"]
+    args += ["--cdx-print", "timestamp"]
+
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0
+    assert result.output == (
+        "20020120142510 http://example.com/\n"
+        "20020328012821 http://example.com/about\n"
+    )
+
+    result = runner.invoke(main, args + ["--output-format", "jsonl"])
+    assert json.loads(result.output.splitlines()[1]) == {
+        "timestamp": "20020328012821",
+        "original": "http://example.com/about",
+    }
+
+    output_file = str(tmp_path / "cdx.csv.gz")
+    result = runner.invoke(
+        main, args + ["--output-format", "csv", "--output-file", output_file]
+    )
+    assert result.exit_code == 0
+    with gzip.open(output_file, "rt", encoding="utf-8") as file:
+        assert file.read().splitlines() == [
+            "timestamp,original",
+            "20020120142510,http://example.com/",
+            "20020328012821,http://example.com/about",
+        ]
+
+    result = runner.invoke(main, args + ["--output-format", "tsv", "--output-gzip"])
+    assert (
+        gzip.decompress(result.stdout_bytes)
+        .decode()
+        .startswith("timestamp\toriginal\n")
+    )
+
+
+def test_urls_saved_on_file(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    urls = ["https://example.com/", "https://example.com/about"]
+    save_urls_on_file(url for url in urls)
+
+    (saved,) = tmp_path.glob("example.com-urls-*.txt")
+    assert saved.read_text(encoding="utf-8").splitlines() == urls
+    output = capsys.readouterr().out
+    assert output.startswith("https://example.com/\nhttps://example.com/about\n")
+    assert "2 URLs saved inside" in output
@@ -0,0 +1,140 @@
+import io
+import time
+from pathlib import Path
+from typing import Any, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+
+import waybackpy.rate_limiter
+from waybackpy.cdx_api import WaybackMachineCDXServerAPI
+from waybackpy.rate_limiter import (
+    FileTokenBucket,
+    RateLimiter,
+    TokenBucket,
+    endpoint_of,
+    get_default_rate_limiter,
+)
+from waybackpy.transport import Transport, get_default_transport
+
+
+def test_endpoint_of() -> None:
+    assert endpoint_of("https://web.archive.org/save/https://example.com") == "save"
+    assert endpoint_of("https://web.archive.org/save/status") == "save_status"
+    assert endpoint_of("https://archive.org/wayback/available") == "availability"
+    assert endpoint_of("https://web.archive.org/cdx/search/cdx") == "cdx"
+    assert endpoint_of("https://web.archive.org/web/2020/https://example.com") is None
+    assert endpoint_of("http://127.0.0.1:8000/save/https://example.com") is None
+    assert endpoint_of("https://notarchive.org/cdx/search/cdx") is None
+
+
+def test_token_bucket_reserves_tokens() -> None:
+    bucket = TokenBucket(rate=1, capacity=2)
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    # The bucket is empty, the next callers wait for their refills in order.
+    assert bucket.take() == pytest.approx(1, abs=0.1)
+    assert bucket.take() == pytest.approx(2, abs=0.1)
+
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_file_token_bucket_is_shared(tmp_path: Path) -> None:
+    path = str(tmp_path / "save.bucket")
+    # Two buckets on the same file, like two processes of a host.
+    first = FileTokenBucket(path, rate=1, capacity=1)
+    second = FileTokenBucket(path, rate=1, capacity=1)
+    assert first.take() == 0
+    assert second.take() == pytest.approx(1, abs=0.1)
+    assert first.take() == pytest.approx(2, abs=0.1)
+
+    (tmp_path / "save.bucket").write_text("not json")
+    assert second.take() == 0
+
+
+def test_rate_limiter_budgets(tmp_path: Path) -> None:
+    limiter = RateLimiter({"cdx": (120, 3), "availability": None})
+    assert set(limiter.buckets) == {"save", "save_status", "cdx"}
+    assert limiter.buckets["cdx"].rate == 2
+    assert limiter.buckets["cdx"].capacity == 3
+    limiter.acquire("availability")
+    limiter.acquire(None)
+
+    assert RateLimiter.unlimited().buckets == {}
+
+    shared = RateLimiter(directory=str(tmp_path / "buckets"))
+    assert isinstance(shared.buckets["save"], FileTokenBucket)
+    shared.acquire("save")
+    assert (tmp_path / "buckets" / "waybackpy-save.bucket").exists()
+
+
+class RecordingRateLimiter(RateLimiter):
+    def __init__(self) -> None:
+        super().__init__()
+        self.endpoints: List[Optional[str]] = []
+
+    def acquire(self, endpoint: Optional[str]) -> None:
+        self.endpoints.append(endpoint)
+
+
+def test_transport_consults_rate_limiter(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert get_default_transport().rate_limiter is get_default_rate_limiter()
+
+    def fake_request(*args: Any, **kwargs: Any) -> requests.Response:
+        return requests.Response()
+
+    limiter = RecordingRateLimiter()
+    transport = Transport(rate_limiter=limiter)
+    monkeypatch.setattr(transport.session, "request", fake_request)
+    transport.get("https://web.archive.org/cdx/search/cdx")
+    transport.get("https://web.archive.org/save/https://example.com")
+    transport.post("https://example.com")
+    assert limiter.endpoints == ["cdx", "save", None]
+
+
+def test_file_buckets_without_fcntl(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(waybackpy.rate_limiter, "fcntl", None)
+    with pytest.raises(RuntimeError):
+        FileTokenBucket(str(tmp_path / "save.bucket"), rate=1)
+
+    with pytest.warns(RuntimeWarning):
+        limiter = RateLimiter(directory=str(tmp_path / "buckets"))
+    assert type(limiter.buckets["save"]) is TokenBucket
+
+
+def test_cdx_pages_not_throttled_by_default(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert "cdx" not in get_default_rate_limiter().buckets
+
+    def fake_request(method: str, url: str, **kwargs: Any) -> requests.Response:
+        query = parse_qs(urlsplit(url).query)
+        page = query.get("page", ["0"])[0]
+        body = (
+            b"20\n"
+            if "showNumPages" in query
+            else (
+                f"com,example)/ 2002012014251{page} https://example.com/ text/html "
+                "200 HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA 1792\n"
+            ).encode()
+        )
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(body)
+        return response
+
+    # The limiter of the transport is the default one, only the session is fake.
+    transport = Transport()
+    monkeypatch.setattr(transport.session, "request", fake_request)
+    cdx = WaybackMachineCDXServerAPI(
+        "https://example.com/",
+        use_pagination=True,
+        max_workers=4,
+        transport=transport,
+    )
+    started = time.monotonic()
+    assert len(list(cdx.snapshots())) == 20
+    # 21 requests, the default burst of 5 at 60 per minute would take 16s.
+    assert time.monotonic() - started < 5
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import requests
+
+from tests.conftest import FakeTransport
+from waybackpy.recent_captures import RecentCaptureCache, probe_recent_capture
+from waybackpy.save_api import WaybackMachineSaveAPI
+
+
+def test_recent_capture_cache() -> None:
+    cache = RecentCaptureCache(max_size=2)
+    now = datetime.utcnow()
+    cache.add("a", now - timedelta(hours=2), "archive-a-old")
+    cache.add("a", now - timedelta(hours=3), "archive-a-older")
+    assert cache.get("a") == (now - timedelta(hours=2), "archive-a-old")
+    assert cache.recent("a", 3600) is None
+    assert cache.recent("a", 3 * 3600) == "archive-a-old"
+
+    cache.add("b", now, "archive-b")
+    cache.add("c", now, "archive-c")
+    assert cache.get("a") is None
+    assert len(cache) == 2
+    cache.clear()
+    assert cache.get("b") is None
+
+
+def test_probe_recent_capture() -> None:
+    now = datetime.utcnow().replace(microsecond=0)
+    line = (
+        f"com,example)/ {now:%Y%m%d%H%M%S} https://example.com/ text/html 200 "
+        "HT2DYGA5UKZCPBSFVCV3JOBXGW2G5UUA 1792\n"
+    )
+    transport = FakeTransport(line.encode())
+    capture = probe_recent_capture("https://example.com/", 600, "ua", transport)
+    assert capture == (
+        now,
+        f"https://web.archive.org/web/{now:%Y%m%d%H%M%S}/https://example.com/",
+    )
+    params = transport.queries[0]
+    assert params["limit"] == "-1"
+    assert params["from"] >= f"{now - timedelta(seconds=601):%Y%m%d%H%M%S}"
+
+    assert (
+        probe_recent_capture("https://example.com/", 600, "ua", FakeTransport(b""))
+        is None
+    )
+
+    # The newest capture is older than min_interval.
+    old = now - timedelta(seconds=900)
+    old_line = line.replace(f"{now:%Y%m%d%H%M%S}", f"{old:%Y%m%d%H%M%S}")
+    transport = FakeTransport(old_line.encode())
+    assert probe_recent_capture("https://example.com/", 600, "ua", transport) is None
+
+    # An unreachable CDX server falls through to a normal save.
+    unreachable = FakeTransport(error=requests.ConnectionError("unreachable"))
+    assert probe_recent_capture("https://example.com/", 600, "ua", unreachable) is None
+
+
+def test_min_interval_skips_save() -> None:
+    cache = RecentCaptureCache()
+    archive_url = "https://web.archive.org/web/20220101000000/https://example.com"
+    cache.add("https://example.com", datetime.utcnow(), archive_url)
+    transport = FakeTransport(b"")
+
+    save_api = WaybackMachineSaveAPI(
+        "https://example.com",
+        transport=transport,
+        min_interval=60,
+        recent_captures=cache,
+    )
+    assert save_api.save() == archive_url
+    assert save_api.skipped_save and save_api.cached_save
+    assert transport.requested == []
+
+    # Not in the cache and not in the CDX server, the probe misses.
+    save_api.url = "https://example.org"
+    assert save_api.recent_archive_url() is None
+    assert len(transport.requested) == 1
@@ -2,12 +2,15 @@ import random
 import string
 import time
 from datetime import datetime
-from typing import cast
+from typing import Any, Dict, cast
 
 import pytest
+import requests
 from requests.structures import CaseInsensitiveDict
 
-from waybackpy.exceptions import MaximumSaveRetriesExceeded
+from tests.conftest import FakeTransport
+from waybackpy.backoff import ExponentialBackoff
+from waybackpy.exceptions import MaximumSaveRetriesExceeded, TooManyRequestsError
 from waybackpy.save_api import WaybackMachineSaveAPI
 
 
@@ -61,12 +64,14 @@ def test_sleep() -> None:
     )
     save_api = WaybackMachineSaveAPI(url, user_agent)
     s_time = int(time.time())
-    save_api.sleep(6)  # multiple of 3 sleep for 10 seconds
+    with pytest.deprecated_call():
+        save_api.sleep(6)  # multiple of 3 sleep for 10 seconds
     e_time = int(time.time())
     assert (e_time - s_time) >= 10
 
     s_time = int(time.time())
-    save_api.sleep(7)  # sleeps for 5 seconds
+    with pytest.deprecated_call():
+        save_api.sleep(7)  # sleeps for 5 seconds
     e_time = int(time.time())
     assert (e_time - s_time) >= 5
 
@@ -221,3 +226,109 @@ def test_archive_url() -> None:
     )
     save_api._archive_url = save_api.saved_archive
     assert save_api.archive_url == save_api.saved_archive
+
+
+def refusing_transport(retry_after: str = "0") -> FakeTransport:
+    """
+    Returns a transport refusing the first save with 429 and a Retry-After
+    header, the next saves are redirected to the archive.
+    """
+
+    def responder(response: requests.Response, kwargs: Dict[str, Any]) -> bytes:
+        assert kwargs["stream"]
+        if len(transport.requested) == 1:
+            response.status_code = 429
+            response.headers["Retry-After"] = retry_after
+        else:
+            response.url = "https://web.archive.org/web/20220101000000/" + (
+                "https://example.com"
+            )
+        return b"<html>archived page</html>"
+
+    transport = FakeTransport(responder=responder)
+    return transport
+
+
+def test_refused_save_is_retried() -> None:
+    transport = refusing_transport()
+    save_api = WaybackMachineSaveAPI(
+        "https://example.com",
+        transport=transport,
+        backoff=ExponentialBackoff(),
+        max_refusals=1,
+    )
+    assert save_api.save() == (
+        "https://web.archive.org/web/20220101000000/https://example.com"
+    )
+    # The refused response is closed, the body of the last one is still read.
+    assert transport.responses[0].raw.closed
+    assert save_api.response is not None
+    assert save_api.response.text == "<html>archived page</html>"
+    assert [attempt.status_code for attempt in save_api.attempts] == [429, 200]
+    assert save_api.attempts[1].tries == 2
+    assert all(attempt.duration >= 0 for attempt in save_api.attempts)
+
+    # The response of a successful save stays open until close().
+    transport = refusing_transport()
+    save_api = WaybackMachineSaveAPI(
+        "https://example.com",
+        transport=transport,
+        backoff=ExponentialBackoff(),
+        max_refusals=1,
+    )
+    save_api.save()
+    assert not transport.responses[1].raw.closed
+    save_api.close()
+    assert transport.responses[1].raw.closed
+
+    transport = refusing_transport()
+    save_api = WaybackMachineSaveAPI(
+        "https://example.com", max_tries=1, transport=transport
+    )
+    with pytest.raises(TooManyRequestsError):
+        save_api.save()
+    # The response of a failed save is closed.
+    assert transport.responses[0].raw.closed
+
+    # The first refusal is raised by default without waiting, but it pauses
+    # the other savers sharing the policy for the Retry-After delay.
+    policy = ExponentialBackoff()
+    save_api = WaybackMachineSaveAPI(
+        "https://example.com",
+        transport=refusing_transport(retry_after="7"),
+        backoff=policy,
+    )
+    with pytest.raises(TooManyRequestsError):
+        save_api.save()
+    assert len(save_api.attempts) == 1
+    assert policy.resume_at - time.monotonic() > 6
+
+
+def test_archive_url_from_headers() -> None:
+    parse = WaybackMachineSaveAPI.archive_url_from_headers
+    archive_url = "https://web.archive.org/web/20220101000000/https://example.com/"
+    assert parse({"content-location": "/web/20220101000000/https://example.com/"}) == (
+        archive_url
+    )
+    assert (
+        parse(
+            {
+                "Link": '<https://example.com/>; rel="original", '
+                "<http://web.archive.org/web/20200101000000/https://example.com/>; "
+                'rel="first memento"; datetime="Wed, 01 Jan 2020 00:00:00 GMT", '
+                "<https://web.archive.org/web/20220101000000/https://example.com/>; "
+                'rel="memento"; datetime="Sat, 01 Jan 2022 00:00:00 GMT"'
+            }
+        )
+        == archive_url
+    )
+    assert (
+        parse(
+            {
+                "X-Cache-Key": "httpsweb.archive.org/web/20220101000000/"
+                "https://example.com/US"
+            }
+        )
+        == archive_url
+    )
+    assert parse({"Content-Location": "/static/page.html"}) is None
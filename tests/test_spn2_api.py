@@ -0,0 +1,163 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Generator, List
+from urllib.parse import parse_qs
+
+import pytest
+
+from waybackpy.exceptions import TooManyRequestsError
+from waybackpy.spn2_api import SPN2Job, WaybackMachineSPN2API
+
+
+class StandInSPN2Handler(BaseHTTPRequestHandler):
+    """
+    Stand-in for the SPN2 API: a job is pending for its first status request
+    and then succeeds, the URLs ending with "invalid" are refused.
+    """
+
+    captures: List[Dict[str, List[str]]] = []
+    status_requests: List[List[str]] = []
+    polls: Dict[str, int] = {}
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def reply(self, code: int, data: Any) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        length = int(self.headers["Content-Length"])
+        form = parse_qs(self.rfile.read(length).decode())
+
+        if self.path == "/save":
+            self.captures.append(form)
+            url = form["url"][0]
+            if url.endswith("limited"):
+                self.reply(429, {})
+            elif url.endswith("invalid"):
+                self.reply(
+                    200,
+                    {
+                        "status": "error",
+                        "status_ext": "error:invalid-url-syntax",
+                        "message": "Cannot resolve host.",
+                    },
+                )
+            else:
+                self.reply(200, {"url": url, "job_id": f"spn2-{url[-1]}"})
+            return
+
+        job_ids = form["job_ids"][0].split(",")
+        self.status_requests.append(job_ids)
+        statuses = []
+        for job_id in job_ids:
+            self.polls[job_id] = self.polls.get(job_id, 0) + 1
+            if self.polls[job_id] == 1:
+                statuses.append({"status": "pending", "job_id": job_id})
+            else:
+                statuses.append(
+                    {
+                        "status": "success",
+                        "job_id": job_id,
+                        "original_url": f"https://example.com/{job_id[-1]}",
+                        "timestamp": "20220101000000",
+                    }
+                )
+        self.reply(200, statuses)
+
+
+@pytest.fixture
+def endpoint() -> Generator[str, None, None]:
+    StandInSPN2Handler.captures = []
+    StandInSPN2Handler.status_requests = []
+    StandInSPN2Handler.polls = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInSPN2Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/save"
+    server.shutdown()
+    server.server_close()
+
+
+def test_submit_options(endpoint: str) -> None:
+    spn2 = WaybackMachineSPN2API("key", "secret", endpoint=endpoint)
+    assert spn2.headers["Authorization"] == "LOW key:secret"
+
+    job = spn2.submit(
+        "https://example.com/1",
+        capture_outlinks=True,
+        skip_first_archive=True,
+        if_not_archived_within="3h",
+        js_behavior_timeout=0,
+    )
+    assert job.job_id == "spn2-1"
+    assert not job.done
+    assert job.archive_url is None
+    assert StandInSPN2Handler.captures[0] == {
+        "url": ["https://example.com/1"],
+        "capture_outlinks": ["1"],
+        "skip_first_archive": ["1"],
+        "if_not_archived_within": ["3h"],
+        "js_behavior_timeout": ["0"],
+    }
+
+    refused = spn2.submit("https://example.com/invalid")
+    assert refused.done and not refused.ok
+    assert refused.status_ext == "error:invalid-url-syntax"
+
+    with pytest.raises(TooManyRequestsError):
+        spn2.submit("https://example.com/limited")
+
+
+def test_status_in_batches(endpoint: str) -> None:
+    spn2 = WaybackMachineSPN2API(endpoint=endpoint, status_batch_size=2)
+    jobs = [SPN2Job(f"https://example.com/{i}", f"spn2-{i}") for i in range(5)]
+    spn2.status(jobs)
+    assert StandInSPN2Handler.status_requests == [
+        ["spn2-0", "spn2-1"],
+        ["spn2-2", "spn2-3"],
+        ["spn2-4"],
+    ]
+    assert all(job.status == "pending" for job in jobs)
+
+    done = list(spn2.wait(jobs, poll_interval=0))
+    assert len(done) == 5
+    assert done[0].archive_url == (
+        "https://web.archive.org/web/20220101000000/https://example.com/0"
+    )
+
+
+def test_spn2_save_many(endpoint: str) -> None:
+    spn2 = WaybackMachineSPN2API(endpoint=endpoint)
+    urls = [f"https://example.com/{i}" for i in range(6)] + [
+        "https://example.com/invalid"
+    ]
+    jobs = list(spn2.save_many(urls, max_in_flight=4, poll_interval=0))
+    assert len(jobs) == 7
+    assert sum(job.ok for job in jobs) == 6
+    assert max(len(ids) for ids in StandInSPN2Handler.status_requests) == 4
+
+    with pytest.raises(ValueError):
+        list(spn2.save_many(urls, max_in_flight=0))
+
+
+def test_spn2_save_many_refused(endpoint: str) -> None:
+    spn2 = WaybackMachineSPN2API(endpoint=endpoint)
+    urls = ["https://example.com/1", "https://example.com/limited"]
+    urls.append("https://example.com/2")
+    jobs = {
+        job.url: job
+        for job in spn2.save_many(urls, poll_interval=0, refusal_delay=0.01)
+    }
+    # The refused capture does not lose the jobs submitted before it.
+    assert sorted(jobs) == sorted(urls)
+    assert jobs["https://example.com/1"].ok and jobs["https://example.com/2"].ok
+    refused = jobs["https://example.com/limited"]
+    assert refused.done and not refused.ok
+    assert refused.message is not None and "too many requests" in refused.message
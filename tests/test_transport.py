@@ -0,0 +1,32 @@
+import pytest
+
+from waybackpy.availability_api import WaybackMachineAvailabilityAPI
+from waybackpy.cdx_api import WaybackMachineCDXServerAPI
+from waybackpy.save_api import WaybackMachineSaveAPI
+from waybackpy.transport import Transport, get_default_transport
+
+
+def test_default_transport_is_shared() -> None:
+    transport = get_default_transport()
+    assert transport is get_default_transport()
+
+    url = "https://example.com"
+    assert WaybackMachineCDXServerAPI(url).transport is transport
+    assert WaybackMachineSaveAPI(url).transport is transport
+    assert WaybackMachineAvailabilityAPI(url).transport is transport
+
+
+def test_custom_transport() -> None:
+    with Transport(pool_connections=2, pool_maxsize=32, retries=2) as transport:
+        assert transport.adapter._pool_maxsize == 32  # type: ignore[attr-defined]
+        assert transport.session.get_adapter("https://web.archive.org") is (
+            transport.adapter
+        )
+        save_api = WaybackMachineSaveAPI("https://example.com", transport=transport)
+        assert save_api.transport is transport
+        assert save_api.total_save_retries == 2
+        assert save_api.backoff_factor == transport.backoff_factor
+        assert save_api.status_forcelist == transport.status_forcelist
+        # The retry settings mirror the transport and can not be set.
+        with pytest.raises(AttributeError):
+            save_api.total_save_retries = 3  # type: ignore[misc]
@@ -1,5 +1,7 @@
+import json
+
 from waybackpy import __version__
-from waybackpy.utils import DEFAULT_USER_AGENT
+from waybackpy.utils import DEFAULT_USER_AGENT, optional_import
 
 
 def test_default_user_agent() -> None:
@@ -7,3 +9,8 @@ def test_default_user_agent() -> None:
         DEFAULT_USER_AGENT
         == f"waybackpy {__version__} - https://github.com/akamhy/waybackpy"
     )
+
+
+def test_optional_import() -> None:
+    assert optional_import("json") is json
+    assert optional_import("waybackpy_missing_module") is None
@@ -2,15 +2,25 @@
 
 __version__ = "3.0.6"
 
+from .async_cdx_api import AsyncWaybackMachineCDXServerAPI
 from .availability_api import WaybackMachineAvailabilityAPI
 from .cdx_api import WaybackMachineCDXServerAPI
+from .cdx_timeline import SnapshotTimeline
+from .rate_limiter import RateLimiter
 from .save_api import WaybackMachineSaveAPI
+from .spn2_api import WaybackMachineSPN2API
+from .transport import Transport
 from .wrapper import Url
 
 __all__ = [
     "__version__",
+    "AsyncWaybackMachineCDXServerAPI",
     "WaybackMachineAvailabilityAPI",
     "WaybackMachineCDXServerAPI",
     "WaybackMachineSaveAPI",
+    "WaybackMachineSPN2API",
+    "RateLimiter",
+    "SnapshotTimeline",
+    "Transport",
     "Url",
 ]
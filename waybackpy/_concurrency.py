@@ -0,0 +1,47 @@
+"""
+The bounded thread pool loop shared by the bulk APIs of waybackpy.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Generator, Iterable, Iterator, Set, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def bounded_map(
+    func: Callable[[T], R], items: Iterable[T], max_workers: int
+) -> Generator[R, None, None]:
+    """
+    Calls func on the items in a pool of max_workers threads and yields the
+    results in the order the calls complete.
+
+    The items are read lazily, at most max_workers calls are pending at
+    once. Closing the generator cancels the calls that did not start.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers should be positive")
+
+    item_iterator: Iterator[T] = iter(items)
+    pending: Set["Future[R]"] = set()
+
+    def submit_next(executor: ThreadPoolExecutor) -> bool:
+        for item in item_iterator:
+            pending.add(executor.submit(func, item))
+            return True
+        return False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            while len(pending) < max_workers and submit_next(executor):
+                pass
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    yield future.result()
+                    submit_next(executor)
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,157 @@
+"""
+This module interfaces the Wayback Machine's CDX server API for asyncio
+applications.
+
+The module has AsyncWaybackMachineCDXServerAPI which takes the same arguments
+as WaybackMachineCDXServerAPI, its snapshots() method is an async generator
+and near(), before(), after(), newest() and oldest() are coroutines.
+
+The HTTP requests are still made by the Transport but in the executor of the
+running event loop, so the event loop is never blocked and all the queries
+running on the loop share the connection pool of the transport.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Executor
+from functools import partial
+from itertools import islice
+from typing import (
+    Any,
+    AsyncGenerator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+
+from .cdx_api import WaybackMachineCDXServerAPI
+from .cdx_snapshot import CDXSnapshot
+
+T = TypeVar("T")
+
+
+class AsyncWaybackMachineCDXServerAPI:
+    """
+    Class that interfaces the CDX server API of the Wayback Machine using
+    asyncio.
+
+    All the arguments except executor are passed to WaybackMachineCDXServerAPI,
+    the attributes of the WaybackMachineCDXServerAPI instance are accessible
+    on this class too.
+
+    executor: The executor used for the blocking HTTP requests, default is the
+              default executor of the event loop. Use a Transport with a
+              pool_maxsize of at least the number of threads of the executor
+              to reuse all the connections.
+
+              Every running query holds a thread of the executor while it
+              waits for the CDX server, so the number of queries in flight
+              is limited by the number of threads. Pass an executor with as
+              many threads as the queries to run at once.
+
+    Like WaybackMachineCDXServerAPI an instance should run one query at a
+    time, create an instance per query to run many queries concurrently.
+    """
+
+    def __init__(
+        self, *args: Any, executor: Optional[Executor] = None, **kwargs: Any
+    ) -> None:
+        self.cdx_api = WaybackMachineCDXServerAPI(*args, **kwargs)
+        self.executor = executor
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.cdx_api, name)
+
+    async def run_in_executor(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Runs the blocking callable in the executor and returns its result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args))
+
+    @staticmethod
+    def next_lines(entries: Iterator[str], size: int = 1000) -> List[str]:
+        """
+        Reads the next size lines of the CDX server response, the lines are
+        read in batches so that the executor is not called for every line.
+        """
+        return list(islice(entries, size))
+
+    async def snapshots(self) -> AsyncGenerator[CDXSnapshot, None]:
+        """
+        Async version of WaybackMachineCDXServerAPI.snapshots(), the pages
+        are fetched in the executor and the snapshots are yielded as instances
+        of CDXSnapshot.
+        """
+        payload: Dict[str, str] = {}
+        headers = {"User-Agent": self.cdx_api.user_agent}
+
+        self.cdx_api.add_payload(payload)
+
+        entries = self.cdx_api.cdx_api_manager(payload, headers)
+        fields = self.cdx_api.fields or None
+
+        # Held by the worker reading the lines, the generator can not be
+        # closed while it is inside next().
+        reading = threading.Lock()
+
+        def read() -> List[str]:
+            with reading:
+                return self.next_lines(entries)
+
+        def close() -> None:
+            with reading:
+                entries.close()
+
+        pending = False
+        try:
+            while True:
+                pending = True
+                lines = await self.run_in_executor(read)
+                pending = False
+                if not lines:
+                    break
+
+                for line in lines:
+                    for snapshot in self.cdx_api.parse_entry(line, fields):
+                        yield snapshot
+        finally:
+            if pending:
+                # Cancelled while a worker may still be reading, the generator
+                # is closed in the executor once the read returns.
+                await asyncio.shield(self.run_in_executor(close))
+            else:
+                entries.close()
+
+    async def before(self, **kwargs: Any) -> CDXSnapshot:
+        """
+        Async version of WaybackMachineCDXServerAPI.before().
+        """
+        return await self.run_in_executor(partial(self.cdx_api.before, **kwargs))
+
+    async def after(self, **kwargs: Any) -> CDXSnapshot:
+        """
+        Async version of WaybackMachineCDXServerAPI.after().
+        """
+        return await self.run_in_executor(partial(self.cdx_api.after, **kwargs))
+
+    async def near(self, **kwargs: Any) -> CDXSnapshot:
+        """
+        Async version of WaybackMachineCDXServerAPI.near().
+        """
+        return await self.run_in_executor(partial(self.cdx_api.near, **kwargs))
+
+    async def newest(self) -> CDXSnapshot:
+        """
+        Async version of WaybackMachineCDXServerAPI.newest().
+        """
+        return await self.run_in_executor(self.cdx_api.newest)
+
+    async def oldest(self) -> CDXSnapshot:
+        """
+        Async version of WaybackMachineCDXServerAPI.oldest().
+        """
+        return await self.run_in_executor(self.cdx_api.oldest)
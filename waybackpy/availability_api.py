@@ -25,13 +25,13 @@ import time
 from datetime import datetime
 from typing import Any, Dict, Optional
 
-import requests
 from requests.models import Response
 
 from .exceptions import (
     ArchiveNotInAvailabilityAPIResponse,
     InvalidJSONInAvailabilityAPIResponse,
 )
+from .transport import Transport, get_default_transport
 from .utils import (
     DEFAULT_USER_AGENT,
     unix_timestamp_to_wayback_timestamp,
@@ -44,10 +44,17 @@ ResponseJSON = Dict[str, Any]
 class WaybackMachineAvailabilityAPI:
     """
     Class that interfaces the Wayback Machine's availability API.
+
+    The API calls are made using the transport, by default the process-wide
+    transport shared by all the API classes.
     """
 
     def __init__(
-        self, url: str, user_agent: str = DEFAULT_USER_AGENT, max_tries: int = 3
+        self,
+        url: str,
+        user_agent: str = DEFAULT_USER_AGENT,
+        max_tries: int = 3,
+        transport: Optional[Transport] = None,
     ) -> None:
 
         self.url = str(url).strip().replace(" ", "%20")
@@ -56,8 +63,11 @@ class WaybackMachineAvailabilityAPI:
         self.payload: Dict[str, str] = {"url": self.url}
         self.endpoint: str = "https://archive.org/wayback/available"
         self.max_tries: int = max_tries
+        self.transport = get_default_transport() if transport is None else transport
         self.tries: int = 0
-        self.last_api_call_unix_time: int = int(time.time())
+        # The first call is not delayed, the rate limiter of the transport
+        # spaces the calls of all the instances.
+        self.last_api_call_unix_time: int = 0
         self.api_call_time_gap: int = 5
         self.json: Optional[ResponseJSON] = None
         self.response: Optional[Response] = None
@@ -88,13 +98,16 @@ class WaybackMachineAvailabilityAPI:
         to the JSON attribute of the instance and also returns the JSON
         attribute.
 
-        time_diff and sleep_time makes sure that you are not making too many
-        requests in a short interval of item, making too many requests is bad
-        as Wayback Machine may reject them above a certain threshold.
+        The availability API budget of the rate limiter of the transport is
+        shared by all the instances, so many instances in many threads do not
+        make too many requests together. Making too many requests is bad as
+        Wayback Machine may reject them above a certain threshold.
 
+        time_diff and sleep_time also space the successive calls of the same
+        instance, the retries of archive_url, by api_call_time_gap seconds.
         The end-user can change the api_call_time_gap attribute of the instance
-        to increase or decrease the default time gap between two successive API
-        calls, but it is not recommended to increase it.
+        to increase or decrease this gap, but it is not recommended to
+        decrease it.
         """
         time_diff = int(time.time()) - self.last_api_call_unix_time
         sleep_time = self.api_call_time_gap - time_diff
@@ -102,7 +115,7 @@ class WaybackMachineAvailabilityAPI:
         if sleep_time > 0:
             time.sleep(sleep_time)
 
-        self.response = requests.get(
+        self.response = self.transport.get(
             self.endpoint, params=self.payload, headers=self.headers
         )
         self.last_api_call_unix_time = int(time.time())
@@ -0,0 +1,166 @@
+"""
+This module contains the backoff policies of the save loop of
+WaybackMachineSaveAPI.
+
+A policy decides how long to wait before the next try of a save and it is
+shared by all the savers using it: when the Wayback Machine refuses a save
+with 429 (too many requests) or 509 (too many active sessions), or asks for
+a delay with a Retry-After header, every saver sharing the policy waits
+before its next request, not only the refused one.
+
+The savers created without a policy share the process-wide policy returned
+by get_default_backoff_policy().
+"""
+
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from requests.models import Response
+
+# Status codes of the Wayback Machine that ask all the savers to slow down.
+REFUSAL_STATUS_CODES = (429, 509)
+
+
+def retry_after_seconds(response: Optional[Response]) -> Optional[float]:
+    """
+    Returns the delay in seconds asked by the Retry-After header of the
+    response, either a number of seconds or an HTTP date. None if the
+    response has no valid Retry-After header.
+    """
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class BackoffPolicy(ABC):
+    """
+    Base class of the backoff policies, subclasses implement delay().
+
+    The policy keeps the time until which all its savers are paused, every
+    saver calls wait() before a request.
+    """
+
+    def __init__(self) -> None:
+        self.resume_at = 0.0
+        self.lock = threading.Lock()
+
+    @abstractmethod
+    def delay(self, tries: int, response: Optional[Response]) -> float:
+        """
+        Returns the seconds to wait before the next try, tries is the number
+        of failed tries and response the response of the last one.
+        """
+
+    def pause(self, seconds: float) -> None:
+        """
+        Delays the next request of every saver by at least seconds.
+        """
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    def backoff(self, tries: int, response: Optional[Response]) -> float:
+        """
+        Returns the delay before the next try. If the server refused the
+        save or asked for a delay, all the savers are paused for the delay.
+        """
+        delay = self.delay(tries, response)
+        if response is not None and (
+            response.status_code in REFUSAL_STATUS_CODES
+            or "Retry-After" in response.headers
+        ):
+            self.pause(delay)
+        return delay
+
+    def wait(self, delay: float = 0) -> float:
+        """
+        Sleeps for delay seconds and until the pause of the savers ends,
+        returns the seconds slept.
+        """
+        with self.lock:
+            now = time.monotonic()
+            seconds = max(delay, self.resume_at - now, 0.0)
+        if seconds > 0:
+            time.sleep(seconds)
+        return seconds
+
+
+class ExponentialBackoff(BackoffPolicy):
+    """
+    Exponential backoff with jitter.
+
+    The delay after the nth failed try is base_delay * factor ** (n - 1),
+    at most max_delay, increased by a random part of up to jitter times the
+    delay so the savers do not retry in lockstep.
+
+    A Retry-After header is always honored as is. Without it a 429 waits
+    rate_limit_delay and a 509 waits session_limit_delay.
+    """
+
+    def __init__(
+        self,
+        base_delay: float = 5,
+        factor: float = 1.5,
+        max_delay: float = 60,
+        jitter: float = 0.25,
+        rate_limit_delay: float = 300,
+        session_limit_delay: float = 60,
+    ) -> None:
+        super().__init__()
+        if base_delay < 0 or factor < 1 or jitter < 0:
+            raise ValueError(
+                "base_delay and jitter should not be negative and factor "
+                "should be at least 1"
+            )
+        self.base_delay = base_delay
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.rate_limit_delay = rate_limit_delay
+        self.session_limit_delay = session_limit_delay
+
+    def delay(self, tries: int, response: Optional[Response]) -> float:
+        retry_after = retry_after_seconds(response)
+        if retry_after is not None:
+            return retry_after
+
+        status_code = None if response is None else response.status_code
+        if status_code == 429:
+            delay = self.rate_limit_delay
+        elif status_code == 509:
+            delay = self.session_limit_delay
+        else:
+            delay = min(self.max_delay, self.base_delay * self.factor ** (tries - 1))
+        return delay * (1 + self.jitter * random.random())
+
+
+_default_backoff_policy: Optional[BackoffPolicy] = None
+_default_backoff_policy_lock = threading.Lock()
+
+
+def get_default_backoff_policy() -> BackoffPolicy:
+    """
+    Returns the process-wide backoff policy shared by the savers created
+    without a policy. It is created on first use.
+    """
+    global _default_backoff_policy  # pylint: disable=global-statement
+    with _default_backoff_policy_lock:
+        if _default_backoff_policy is None:
+            _default_backoff_policy = ExponentialBackoff()
+        return _default_backoff_policy
@@ -0,0 +1,200 @@
+"""
+This module looks up many URLs with the availability API of the Wayback
+Machine.
+
+WaybackMachineAvailabilityAPI asks for a single URL per request. The
+availability endpoint also accepts a POST with many URLs, one query per
+line of the body, and lookup_many() sends the URLs in such batches. The
+batches run concurrently in a pool of threads and every request takes a
+token from the availability budget of the rate limiter of the transport, so
+the concurrent batches together stay under the limit.
+
+>>> for result in lookup_many(urls, timestamp="2015"):
+...     print(result.url, result.archive_url or "not archived")
+"""
+
+from functools import partial
+from itertools import islice
+from typing import Any, Dict, Generator, Iterable, Iterator, List, Optional
+from urllib.parse import urlencode
+
+import requests
+
+from ._concurrency import bounded_map
+from .exceptions import (
+    InvalidJSONInAvailabilityAPIResponse,
+    TooManyRequestsError,
+    WaybackError,
+)
+from .transport import Transport, get_default_transport
+from .utils import DEFAULT_USER_AGENT
+
+DEFAULT_ENDPOINT = "https://archive.org/wayback/available"
+
+# Number of URLs in a single request to the availability API.
+BATCH_SIZE = 50
+
+
+class AvailabilityResult:
+    """
+    The result of the lookup of a URL by lookup_many().
+
+    url: The URL that was looked up.
+
+    archive_url: The archive URL of the closest snapshot, None if the URL is
+                 not archived or if the lookup failed.
+
+    timestamp: The timestamp of the closest snapshot.
+
+    status: The HTTP status code of the closest snapshot, like "200".
+
+    error: The exception that made the lookup fail, None if it succeeded.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        archive_url: Optional[str] = None,
+        timestamp: Optional[str] = None,
+        status: Optional[str] = None,
+        error: Optional[Exception] = None,
+    ) -> None:
+        self.url = url
+        self.archive_url = archive_url
+        self.timestamp = timestamp
+        self.status = status
+        self.error = error
+
+    def __repr__(self) -> str:
+        return (
+            f"AvailabilityResult(url={self.url!r}, archive_url={self.archive_url!r}, "
+            f"error={self.error!r})"
+        )
+
+    @property
+    def archived(self) -> bool:
+        """
+        True if the URL has a snapshot.
+        """
+        return self.archive_url is not None
+
+    @classmethod
+    def from_json(cls, url: str, data: Dict[str, Any]) -> "AvailabilityResult":
+        """
+        Creates the result of the URL from its entry in the results of the
+        availability API.
+        """
+        closest = (data.get("archived_snapshots") or {}).get("closest")
+        if not closest or not closest.get("available", True):
+            return cls(url)
+
+        archive_url = closest.get("url")
+        if archive_url:
+            archive_url = archive_url.replace(
+                "http://web.archive.org/web/", "https://web.archive.org/web/", 1
+            )
+        return cls(url, archive_url, closest.get("timestamp"), closest.get("status"))
+
+
+def lookup_batch(
+    urls: List[str],
+    timestamp: Optional[str] = None,
+    user_agent: str = DEFAULT_USER_AGENT,
+    transport: Optional[Transport] = None,
+    endpoint: str = DEFAULT_ENDPOINT,
+) -> List[AvailabilityResult]:
+    """
+    Looks up the URLs with a single POST request and returns a result per
+    URL in the same order, the errors are returned in the results instead
+    of being raised.
+    """
+    transport = get_default_transport() if transport is None else transport
+    queries = []
+    for url in urls:
+        query = {"url": url}
+        if timestamp is not None:
+            query["timestamp"] = timestamp
+        queries.append(urlencode(query))
+
+    try:
+        response = transport.post(
+            endpoint,
+            data="\n".join(queries),
+            headers={
+                "User-Agent": user_agent,
+                "Content-Type": "application/x-www-form-urlencoded",
+            },
+        )
+        if response.status_code == 429:
+            raise TooManyRequestsError(
+                "Availability API request refused by the server, too many requests."
+            )
+        try:
+            entries = response.json()["results"]
+            if not isinstance(entries, list):
+                raise TypeError("results is not a list")
+        except (ValueError, KeyError, TypeError) as exc:
+            raise InvalidJSONInAvailabilityAPIResponse(
+                f"Response data:\n{response.text}"
+            ) from exc
+    except (requests.RequestException, WaybackError) as exc:
+        return [AvailabilityResult(url, error=exc) for url in urls]
+
+    # The results are in the order of the queries, the url of an entry is
+    # the URL as sent.
+    results = []
+    for index, url in enumerate(urls):
+        entry = entries[index] if index < len(entries) else None
+        if not isinstance(entry, dict) or entry.get("url", url) != url:
+            entry = next(
+                (e for e in entries if isinstance(e, dict) and e.get("url") == url),
+                None,
+            )
+        if entry is None:
+            results.append(
+                AvailabilityResult(
+                    url,
+                    error=InvalidJSONInAvailabilityAPIResponse(
+                        f"No result for '{url}' in the availability API response."
+                    ),
+                )
+            )
+        else:
+            results.append(AvailabilityResult.from_json(url, entry))
+    return results
+
+
+def lookup_many(
+    urls: Iterable[str],
+    timestamp: Optional[str] = None,
+    batch_size: int = BATCH_SIZE,
+    max_workers: int = 4,
+    user_agent: str = DEFAULT_USER_AGENT,
+    transport: Optional[Transport] = None,
+    endpoint: str = DEFAULT_ENDPOINT,
+) -> Generator[AvailabilityResult, None, None]:
+    """
+    Looks up the URLs with the availability API and yields a result per URL,
+    the results of a batch are yielded as soon as the batch completes.
+
+    timestamp: The Wayback Machine timestamp, possibly partial like "2015",
+               near which the closest snapshot is looked up. None for the
+               newest snapshot.
+
+    The URLs are read lazily in batches of batch_size URLs, at most
+    max_workers batches are pending at once.
+    """
+    if batch_size < 1 or max_workers < 1:
+        raise ValueError("batch_size and max_workers should be positive")
+
+    url_iterator: Iterator[str] = iter(urls)
+    batches = iter(lambda: list(islice(url_iterator, batch_size)), [])
+    lookup = partial(
+        lookup_batch,
+        timestamp=timestamp,
+        user_agent=user_agent,
+        transport=transport,
+        endpoint=endpoint,
+    )
+    for results in bounded_map(lookup, batches, max_workers):
+        yield from results
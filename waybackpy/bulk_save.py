@@ -0,0 +1,180 @@
+"""
+This module saves many URLs with the SavePageNow (SPN) API of the Wayback
+Machine.
+
+save_many() runs the saves of WaybackMachineSaveAPI in a pool of threads and
+yields a SaveResult for every URL as soon as its save completes. Every
+request of the saves, the retries included, takes a token from the save
+budget of the rate limiter of the transport, 15 saves per minute by default.
+When the Wayback Machine refuses a save with 429 (too many requests) or 509
+(too many active sessions) the backoff policy pauses all the workers, the
+refused URL is then tried again.
+
+With min_interval the URLs captured less than min_interval seconds ago are
+not saved again, see WaybackMachineSaveAPI.recent_archive_url(). These
+skipped saves do not count against the 15 saves per minute.
+"""
+
+from functools import partial
+from typing import Generator, Iterable, Optional
+
+import requests
+
+from ._concurrency import bounded_map
+from .backoff import BackoffPolicy, get_default_backoff_policy
+from .exceptions import WaybackError
+from .save_api import WaybackMachineSaveAPI
+from .transport import Transport
+from .utils import DEFAULT_USER_AGENT
+
+
+class SaveResult:
+    """
+    The result of the save of a URL by save_many().
+
+    url: The URL that was saved.
+
+    archive_url: The archive URL, None if the save failed.
+
+    cached_save: True if the Wayback Machine returned an archive older than
+                 the save request, None if the save failed.
+
+    error: The exception that made the save fail, None if it succeeded.
+
+    attempts: Number of times the save was started, the saves refused with
+              429 or 509 are started again. 0 if the save was skipped.
+
+    skipped: True if the save was skipped because the URL was captured less
+             than min_interval seconds ago.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        archive_url: Optional[str] = None,
+        cached_save: Optional[bool] = None,
+        error: Optional[Exception] = None,
+        attempts: int = 1,
+        skipped: bool = False,
+    ) -> None:
+        self.url = url
+        self.archive_url = archive_url
+        self.cached_save = cached_save
+        self.error = error
+        self.attempts = attempts
+        self.skipped = skipped
+
+    def __repr__(self) -> str:
+        return (
+            f"SaveResult(url={self.url!r}, archive_url={self.archive_url!r}, "
+            f"cached_save={self.cached_save!r}, error={self.error!r})"
+        )
+
+    @property
+    def ok(self) -> bool:
+        """
+        True if the URL was saved.
+        """
+        return self.error is None
+
+
+def save_url(
+    url: str,
+    backoff: Optional[BackoffPolicy] = None,
+    user_agent: str = DEFAULT_USER_AGENT,
+    max_tries: int = 8,
+    transport: Optional[Transport] = None,
+    max_refusals: int = 3,
+    min_interval: Optional[float] = None,
+) -> SaveResult:
+    """
+    Saves the URL and returns its SaveResult, the errors are returned in
+    the result instead of being raised.
+
+    A save refused with 429 or 509 pauses all the workers sharing the
+    backoff policy and is started again after the pause, at most
+    max_refusals times.
+
+    If the URL was captured less than min_interval seconds ago the save is
+    skipped without waiting for the pause.
+    """
+    backoff = get_default_backoff_policy() if backoff is None else backoff
+    if min_interval is not None:
+        recent_api = WaybackMachineSaveAPI(
+            url, user_agent=user_agent, transport=transport, min_interval=min_interval
+        )
+        try:
+            recent_archive_url = recent_api.recent_archive_url()
+        except (requests.RequestException, ValueError) as exc:
+            return SaveResult(url, error=exc, attempts=0)
+        if recent_archive_url is not None:
+            return SaveResult(url, recent_archive_url, True, None, 0, skipped=True)
+
+    attempts = 0
+    while True:
+        attempts += 1
+        backoff.wait()
+        save_api = WaybackMachineSaveAPI(
+            url,
+            user_agent=user_agent,
+            max_tries=max_tries,
+            transport=transport,
+            backoff=backoff,
+        )
+        try:
+            archive_url = save_api.save()
+            # The body of the archived page is not read.
+            save_api.close()
+            return SaveResult(url, archive_url, save_api.cached_save, None, attempts)
+        except WaybackError as exc:
+            # The refusal paused the backoff policy in save().
+            if save_api.status_code not in (429, 509):
+                return SaveResult(url, error=exc, attempts=attempts)
+            error: Exception = exc
+        except (requests.RequestException, ValueError) as exc:
+            return SaveResult(url, error=exc, attempts=attempts)
+
+        if attempts > max_refusals:
+            return SaveResult(url, error=error, attempts=attempts)
+
+
+def save_many(
+    urls: Iterable[str],
+    max_workers: int = 3,
+    user_agent: str = DEFAULT_USER_AGENT,
+    max_tries: int = 8,
+    transport: Optional[Transport] = None,
+    backoff: Optional[BackoffPolicy] = None,
+    max_refusals: int = 3,
+    min_interval: Optional[float] = None,
+) -> Generator[SaveResult, None, None]:
+    """
+    Saves the URLs with max_workers concurrent saves and yields a SaveResult
+    per URL in the order the saves complete.
+
+    The URLs are read lazily, at most max_workers saves are pending at once.
+    Keep max_workers low, the Wayback Machine limits the number of active
+    save sessions (509) and the requests are paced by the save budget of the
+    rate limiter of the transport anyway.
+
+    A save refused with 429 or 509 pauses all the workers sharing the
+    backoff policy, by default the process-wide policy, for the delay it
+    decides or the Retry-After of the response. The refused save is then
+    started again, at most max_refusals times.
+
+    The URLs captured less than min_interval seconds ago are skipped, their
+    results have the archive URL of the recent capture.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers should be positive")
+
+    save = partial(
+        save_url,
+        backoff=get_default_backoff_policy() if backoff is None else backoff,
+        user_agent=user_agent,
+        max_tries=max_tries,
+        transport=transport,
+        max_refusals=max_refusals,
+        min_interval=min_interval,
+    )
+    yield from bounded_map(save, urls, max_workers)
@@ -8,28 +8,67 @@ WaybackMachineCDXServerAPI has a snapshot method that yields the snapshots, and
 the snapshots are yielded as instances of the CDXSnapshot class.
 """
 
-
+import heapq
 import time
-from datetime import datetime
-from typing import Dict, Generator, List, Optional, Union, cast
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import (
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
 
+from .cdx_batch import CDXSnapshotBatch
+from .cdx_cache import CDXCache
+from .cdx_checkpoint import CDXCheckpoint
+from .cdx_plan import CDXPagePlan
+from .cdx_shard import (
+    ShardReader,
+    datetime_to_timestamp,
+    merge_key,
+    plan_windows,
+    time_range,
+    timestamp_to_datetime,
+)
 from .cdx_snapshot import CDXSnapshot
 from .cdx_utils import (
     check_collapses,
+    check_fields,
     check_filters,
     check_match_type,
+    check_page_status,
     check_sort,
+    count_response_lines,
     full_url,
     get_response,
     get_total_pages,
+    iter_response_lines,
+    non_blank_lines,
+    split_resume_key,
 )
 from .exceptions import NoCDXRecordFound, WaybackError
+from .transport import Transport, get_default_transport
 from .utils import (
     DEFAULT_USER_AGENT,
     unix_timestamp_to_wayback_timestamp,
     wayback_timestamp,
 )
 
+T = TypeVar("T")
+
+# Width of the first window searched by before() and after(), every next
+# window is WINDOW_GROWTH times wider.
+INITIAL_WINDOW = timedelta(days=1)
+WINDOW_GROWTH = 4
+
 
 class WaybackMachineCDXServerAPI:
     """
@@ -39,6 +78,42 @@ class WaybackMachineCDXServerAPI:
     the generator returns the snapshots/entries as instance of CDXSnapshot to
     make the usage easy, just use '.' to get any attribute as the attributes are
     accessible via a dot ".".
+
+    All the requests are made using the transport, pass the same Transport to
+    several instances to reuse its pooled connections, the default is the
+    process-wide transport shared by all the API classes.
+
+    When use_pagination is True, max_workers pages are fetched concurrently,
+    the snapshots are still yielded in the page order. Keep max_workers lower
+    than or equal to the pool_maxsize of the transport.
+
+    fields is a list of the CDX fields that the CDX server should return,
+    for example ["original"] if only the original URLs are needed. The
+    snapshots then only have the requested fields, use raw_lines() to skip
+    creating the snapshots altogether.
+
+    If gzip is True or "true" the CDX server is asked to compress the
+    response, it is decompressed incrementally while the lines are parsed.
+    By default the response is not compressed.
+
+    If a cache (see waybackpy.cdx_cache) is passed the downloaded pages are
+    stored in it and the same query is then answered from the cache.
+
+    resume_from is the path of a checkpoint file (or a CDXCheckpoint), the
+    position of the crawl is saved in it after every page and if the crawl
+    fails, passing the same file again continues the crawl after the last
+    record that was yielded.
+
+    page_size is the number of index blocks in a page of the pagination API,
+    plan_pages() returns the number of pages and the estimated number of
+    records of the query before it is run.
+
+    When shards is more than 1 the queries that do not use the pagination
+    API are split into about shards time windows, the resumeKey pages of the
+    windows are fetched concurrently and merged back into the order of the
+    CDX server. The windows are sized from the number of days with captures
+    in every year. Queries with a sort, collapses or a checkpoint are not
+    sharded.
     """
 
     # start_timestamp: from, can not use from as it's a keyword
@@ -52,12 +127,19 @@ class WaybackMachineCDXServerAPI:
         filters: Optional[List[str]] = None,
         match_type: Optional[str] = None,
         sort: Optional[str] = None,
-        gzip: Optional[str] = None,
+        gzip: Optional[Union[str, bool]] = None,
         collapses: Optional[List[str]] = None,
         limit: Optional[str] = None,
         max_tries: int = 3,
         use_pagination: bool = False,
         closest: Optional[str] = None,
+        transport: Optional[Transport] = None,
+        max_workers: int = 1,
+        fields: Optional[List[str]] = None,
+        cache: Optional[CDXCache] = None,
+        resume_from: Optional[Union[str, CDXCheckpoint]] = None,
+        page_size: Optional[int] = None,
+        shards: int = 1,
     ) -> None:
         self.url = str(url).strip().replace(" ", "%20")
         self.user_agent = user_agent
@@ -75,89 +157,378 @@ class WaybackMachineCDXServerAPI:
         self.limit = 25000 if limit is None else limit
         self.max_tries = max_tries
         self.use_pagination = use_pagination
+        if max_workers < 1:
+            raise ValueError("max_workers should be positive")
+        self.max_workers = max_workers
         self.closest = None if closest is None else str(closest)
+        self.fields = [] if fields is None else fields
+        check_fields(self.fields)
+        self.transport = get_default_transport() if transport is None else transport
+        self.cache = cache
+        self.checkpoint = (
+            CDXCheckpoint.load(resume_from)
+            if isinstance(resume_from, str)
+            else resume_from
+        )
+        if page_size is not None and page_size < 1:
+            raise ValueError("page_size should be positive")
+        self.page_size = page_size
+        if shards < 1:
+            raise ValueError("shards should be positive")
+        self.shards = shards
+        if self.shards > 1:
+            # Fails early if the lines can not be merged.
+            merge_key(self.fields)
         self.last_api_request_url: Optional[str] = None
         self.endpoint = "https://web.archive.org/cdx/search/cdx"
 
-    def cdx_api_manager(
+    def page_lines(
         self, payload: Dict[str, str], headers: Dict[str, str]
     ) -> Generator[str, None, None]:
         """
-        This method uses the pagination API of the CDX server if
-        use_pagination attribute is True else uses the standard
-        CDX server response data.
+        Requests a single page of the CDX server and yields its lines while
+        the response is being streamed, the page is never held in memory.
+
+        Raises TooManyRequestsError if the server answered with 429 and
+        WaybackError for the other error statuses.
+        """
+        url = full_url(self.endpoint, params=payload)
+
+        if self.cache is not None:
+            cached_page = self.cache.get(url)
+            if cached_page is not None:
+                self.last_api_request_url = url
+                yield from cached_page.decode("utf-8").split("\n")
+                return
+
+        res = get_response(url, headers=headers, transport=self.transport, stream=True)
+
+        if isinstance(res, Exception):
+            raise res
+
+        self.last_api_request_url = url
+
+        try:
+            check_page_status(res, url)
+
+            if self.cache is None:
+                yield from iter_response_lines(res)
+                return
+
+            # The page is only stored if it was read completely.
+            lines = []
+            for line in iter_response_lines(res):
+                lines.append(line)
+                yield line
+            self.cache.set(url, "\n".join(lines).encode("utf-8"), self.cache_ttl())
+        finally:
+            res.close()
+
+    def cache_ttl(self) -> Optional[float]:
         """
+        Returns the TTL for the pages of the query stored in the cache.
+
+        The records of a closed time window, an end_timestamp in the past,
+        are not expected to change so they are cached indefinitely.
+        """
+        if self.cache is None:
+            return None
+
+        if self.end_timestamp:
+            # Pad the end of the window to the last second it includes.
+            padding = len(self.end_timestamp)
+            end_timestamp = self.end_timestamp + "99991231235959"[padding:]
+            if end_timestamp < datetime.utcnow().strftime("%Y%m%d%H%M%S"):
+                return None
 
-        # When using the pagination API of the CDX server.
-        if self.use_pagination is True:
+        return self.cache.default_ttl
 
-            total_pages = get_total_pages(self.url, self.user_agent)
-            successive_blank_pages = 0
+    def get_page(self, payload: Dict[str, str], headers: Dict[str, str]) -> List[str]:
+        """
+        Fetches a single page of the pagination API and returns its lines.
+        """
+        return list(self.page_lines(payload, headers))
+
+    def paginated_pages(
+        self,
+        payload: Dict[str, str],
+        headers: Dict[str, str],
+        total_pages: int,
+        start_page: int = 0,
+    ) -> Generator[Iterable[str], None, None]:
+        """
+        Yields the lines of the pages start_page to total_pages - 1 in order.
 
-            for i in range(total_pages):
+        If max_workers is 1 the lines of each page are streamed, else the
+        pages are fetched by a thread pool, at most 2 * max_workers pages are
+        requested ahead of the page that is being consumed so that the memory
+        usage stays bounded.
+        """
+        if self.max_workers == 1:
+            for i in range(start_page, total_pages):
                 payload["page"] = str(i)
+                yield self.page_lines(payload, headers)
+            return
+
+        window = 2 * self.max_workers
+        pending: Deque["Future[List[str]]"] = deque()
+        next_page = start_page
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                while pending or next_page < total_pages:
+                    while next_page < total_pages and len(pending) < window:
+                        page_payload = dict(payload, page=str(next_page))
+                        pending.append(
+                            executor.submit(self.get_page, page_payload, headers)
+                        )
+                        next_page += 1
+
+                    yield pending.popleft().result()
+            finally:
+                # The consumer may stop early, for example on encountering
+                # two successive blank pages, do not wait for pages that are
+                # not yet requested.
+                for future in pending:
+                    future.cancel()
+
+    def checkpointed(self, lines: Generator[str, None, T]) -> Generator[str, None, T]:
+        """
+        Yields the lines of a page and returns the return value of lines.
 
-                url = full_url(self.endpoint, params=payload)
-                res = get_response(url, headers=headers)
+        If the crawl has a checkpoint the records of the page that were
+        yielded before the checkpoint was saved are skipped and the yielded
+        records are counted by the checkpoint.
+        """
+        checkpoint = self.checkpoint
+        if checkpoint is None:
+            return (yield from lines)
+
+        skip = checkpoint.offset
+        while True:
+            try:
+                line = next(lines)
+            except StopIteration as stop:
+                return cast(T, stop.value)
+
+            if skip > 0:
+                skip -= 1
+                continue
 
-                if isinstance(res, Exception):
-                    raise res
+            # Counted before it is yielded, the consumer may stop the crawl
+            # while handling the line and it must not be yielded again.
+            checkpoint.record()
+            yield line
 
-                self.last_api_request_url = url
-                text = res.text
-
-                # Reset the counter if the last page was blank
-                # but the current page is not.
-                if successive_blank_pages == 1:
-                    if len(text) != 0:
-                        successive_blank_pages = 0
-
-                # Increase the succesive page counter on encountering
-                # blank page.
-                if len(text) == 0:
-                    successive_blank_pages += 1
-
-                # If two succesive pages are blank
-                # then we don't have any more pages left to
-                # iterate.
-                if successive_blank_pages >= 2:
-                    break
+    def cdx_api_manager(
+        self, payload: Dict[str, str], headers: Dict[str, str]
+    ) -> Generator[str, None, None]:
+        """
+        This method uses the pagination API of the CDX server if
+        use_pagination attribute is True else uses the standard
+        CDX server response data.
 
-                yield text
+        The CDX lines are yielded one by one as the pages are streamed,
+        blank lines and the resume keys are not yielded.
 
-        # When not using the pagination API of the CDX server
-        else:
-            payload["showResumeKey"] = "true"
-            payload["limit"] = str(self.limit)
-            resume_key = None
-            more = True
-            while more:
-                if resume_key:
-                    payload["resumeKey"] = resume_key
-
-                url = full_url(self.endpoint, params=payload)
-                res = get_response(url, headers=headers)
-                if isinstance(res, Exception):
-                    raise res
+        If the instance has a checkpoint the crawl starts at the position
+        saved in the checkpoint and the checkpoint is saved after every page.
+        """
+        checkpoint = self.checkpoint
+
+        try:
+            # When using the pagination API of the CDX server.
+            if self.use_pagination is True:
+                if checkpoint is not None:
+                    checkpoint.start(full_url(self.endpoint, params=payload))
+                    if checkpoint.complete:
+                        return
+
+                total_pages = get_total_pages(
+                    self.url, self.user_agent, transport=self.transport, payload=payload
+                )
+                start_page = 0 if checkpoint is None else checkpoint.page
+                successive_blank_pages = 0
+
+                pages = self.paginated_pages(payload, headers, total_pages, start_page)
+                for page, lines in enumerate(pages, start_page):
+
+                    total_lines = yield from self.checkpointed(non_blank_lines(lines))
+
+                    if checkpoint is not None:
+                        checkpoint.next_page(page=page + 1)
+
+                    # Increase the succesive page counter on encountering
+                    # blank page and reset it if the current page is not blank.
+                    successive_blank_pages = (
+                        successive_blank_pages + 1 if total_lines == 0 else 0
+                    )
 
-                self.last_api_request_url = url
+                    # If two succesive pages are blank
+                    # then we don't have any more pages left to
+                    # iterate.
+                    if successive_blank_pages >= 2:
+                        break
+
+            # When not using the pagination API of the CDX server
+            elif self.sharded():
+                yield from self.sharded_lines(payload, headers)
+
+            else:
+                payload["showResumeKey"] = "true"
+                payload["limit"] = str(self.limit)
+                if checkpoint is not None:
+                    checkpoint.start(full_url(self.endpoint, params=payload))
+                    if checkpoint.complete:
+                        return
+
+                resume_key = None if checkpoint is None else checkpoint.resume_key
+                more = True
+                while more:
+                    if resume_key:
+                        payload["resumeKey"] = resume_key
+
+                    # split_resume_key yields the lines and returns the
+                    # resume key which is found at the end of the page.
+                    resume_key = yield from self.checkpointed(
+                        split_resume_key(self.page_lines(payload, headers))
+                    )
+                    more = resume_key is not None
+
+                    if checkpoint is not None and more:
+                        checkpoint.next_page(resume_key=resume_key)
 
-                text = res.text.strip()
-                lines = text.splitlines()
+            if checkpoint is not None:
+                checkpoint.finish()
+        finally:
+            # Also save the position if the crawl failed or if the consumer
+            # stopped early, the records already yielded are not repeated.
+            if checkpoint is not None:
+                checkpoint.save()
 
-                more = False
+    def single_url(self) -> bool:
+        """
+        Returns True if the query is for the captures of a single URL, False
+        for the prefix, host and domain queries and the wildcard URLs.
+        """
+        return self.match_type in (None, "exact") and "*" not in self.url
 
-                if len(lines) >= 3:
+    def sharded(self) -> bool:
+        """
+        Returns True if the query is split into time windows, see shards.
+        """
+        return (
+            self.shards > 1
+            and not self.use_pagination
+            and not self.sort
+            and not self.collapses
+            and self.checkpoint is None
+        )
 
-                    second_last_line = lines[-2]
+    def year_counts(
+        self, payload: Dict[str, str], headers: Dict[str, str]
+    ) -> Dict[int, int]:
+        """
+        Returns the number of days with captures of every year of the query,
+        the density used for planning the time windows of a sharded query.
 
-                    if len(second_last_line) == 0:
+        The probe collapses the records to one per URL and day and reads at
+        most 50000 of them, if it fails an empty dictionary is returned and
+        the windows have equal durations.
+        """
+        probe = {
+            key: value
+            for key, value in payload.items()
+            if key in ("url", "from", "to", "matchType", "gzip")
+            or key.startswith("filter")
+        }
+        probe["collapse"] = "timestamp:8"
+        probe["fl"] = "timestamp"
+        probe["limit"] = "50000"
+
+        counts: Dict[int, int] = {}
+        try:
+            for line in self.page_lines(probe, headers):
+                if line[:4].isdigit():
+                    year = int(line[:4])
+                    counts[year] = counts.get(year, 0) + 1
+        except (WaybackError, OSError):
+            return {}
+        return counts
+
+    def window_pages(
+        self, payload: Dict[str, str], headers: Dict[str, str]
+    ) -> Generator[List[str], None, None]:
+        """
+        Yields the pages of the resumeKey chain of a time window as lists of
+        the non-blank lines.
+        """
+        resume_key: Optional[str] = None
+        while True:
+            if resume_key:
+                payload["resumeKey"] = resume_key
+
+            lines: List[str] = []
+            page = split_resume_key(self.page_lines(payload, headers))
+            while True:
+                try:
+                    lines.append(next(page))
+                except StopIteration as stop:
+                    resume_key = stop.value
+                    break
 
-                        resume_key = lines[-1].strip()
-                        text = text.replace(resume_key, "", 1).strip()
-                        more = True
+            if lines:
+                yield lines
+            if resume_key is None:
+                return
 
-                yield text
+    def sharded_lines(
+        self, payload: Dict[str, str], headers: Dict[str, str]
+    ) -> Generator[str, None, None]:
+        """
+        Fetches the time windows of the query concurrently and yields their
+        lines merged in the order of the CDX server, about two pages per
+        window are held in memory.
+        """
+        window = time_range(self.start_timestamp, self.end_timestamp)
+        windows = plan_windows(window, self.shards, self.year_counts(payload, headers))
+
+        # The lines of a query for many URLs are ordered on the urlkey first,
+        # if it is not among the fields it is requested for the merge and
+        # removed from the merged lines.
+        fields = self.fields
+        strip_urlkey = bool(fields) and "urlkey" not in fields and not self.single_url()
+        if strip_urlkey:
+            fields = ["urlkey"] + fields
+            payload = dict(payload)
+            payload["fl"] = ",".join(fields)
+
+        readers = []
+        for start, end in windows:
+            window_payload = dict(payload)
+            window_payload["from"] = datetime_to_timestamp(start)
+            window_payload["to"] = datetime_to_timestamp(end)
+            window_payload["showResumeKey"] = "true"
+            window_payload["limit"] = str(self.limit)
+            readers.append(ShardReader(self.window_pages(window_payload, headers)))
+
+        executor = ThreadPoolExecutor(max_workers=len(readers))
+        try:
+            for reader in readers:
+                executor.submit(reader.run)
+
+            lines = heapq.merge(
+                *(reader.lines() for reader in readers), key=merge_key(fields)
+            )
+            if not strip_urlkey:
+                yield from lines
+                return
+            for line in lines:
+                yield line.partition(" ")[2]
+        finally:
+            for reader in readers:
+                reader.stop()
+            executor.shutdown(wait=False)
 
     def add_payload(self, payload: Dict[str, str]) -> None:
         """
@@ -169,8 +540,9 @@ class WaybackMachineCDXServerAPI:
         if self.end_timestamp:
             payload["to"] = self.end_timestamp
 
-        if self.gzip is None:
-            payload["gzip"] = "false"
+        # The stream is decompressed as it is parsed, compression is opt-in
+        # until it is measured to be faster.
+        payload["gzip"] = "true" if str(self.gzip).lower() == "true" else "false"
 
         if self.closest:
             payload["closest"] = self.closest
@@ -189,8 +561,126 @@ class WaybackMachineCDXServerAPI:
             for i, collapse in enumerate(self.collapses):
                 payload["collapse" + str(i)] = collapse
 
+        if self.fields:
+            payload["fl"] = ",".join(self.fields)
+
+        if self.use_pagination and self.page_size:
+            payload["pageSize"] = str(self.page_size)
+
         payload["url"] = self.url
 
+    def plan_pages(self, show_paged_index: bool = False) -> CDXPagePlan:
+        """
+        Returns the CDXPagePlan of the query, the number of pages is requested
+        with the full payload of the query (matchType, from, to, filters,
+        collapses and pageSize) using the transport of the instance.
+
+        If show_paged_index is True the secondary index blocks of every page
+        are requested too, this is one more request per page.
+        """
+        payload: Dict[str, str] = {}
+        headers = {"User-Agent": self.user_agent}
+        self.add_payload(payload)
+        if self.page_size:
+            payload["pageSize"] = str(self.page_size)
+
+        total_pages = get_total_pages(
+            self.url, self.user_agent, transport=self.transport, payload=payload
+        )
+
+        paged_index = None
+        if show_paged_index:
+            payload.pop("fl", None)
+            payload["showPagedIndex"] = "true"
+            paged_index = []
+            for page in range(total_pages):
+                payload["page"] = str(page)
+                paged_index.append(
+                    list(non_blank_lines(self.page_lines(payload, headers)))
+                )
+
+        return CDXPagePlan(total_pages, self.page_size, paged_index)
+
+    @staticmethod
+    def on_side(snapshot: CDXSnapshot, timestamp: str, before: bool) -> bool:
+        """
+        Returns True if the snapshot is before (or after) the timestamp.
+        """
+        if before:
+            return snapshot.timestamp < timestamp
+        return snapshot.timestamp > timestamp
+
+    def window_search(self, timestamp: str, before: bool) -> Optional[CDXSnapshot]:
+        """
+        Returns the nearest snapshot before (or after) the timestamp, None if
+        there is no such snapshot.
+
+        The time range of the query is searched in windows starting at the
+        timestamp, every window is WINDOW_GROWTH times wider than the previous
+        one and is requested with limit=-1 (or limit=1) so the CDX server
+        returns a single record: the last record of the window for before
+        and the first one for after.
+
+        The records of the other match types and of the wildcard URLs are
+        sorted on the urlkey first, for them the closest sort is scanned
+        instead.
+
+        The snapshots are compared on their timestamp, it is added to the
+        fields if they do not include it.
+        """
+        if self.fields and "timestamp" not in self.fields:
+            self.fields = self.fields + ["timestamp"]
+
+        if not self.single_url():
+            self.closest = timestamp
+            self.sort = "closest"
+            self.limit = 25000
+            for snapshot in self.snapshots():
+                if self.on_side(snapshot, timestamp, before):
+                    return snapshot
+            return None
+
+        payload: Dict[str, str] = {}
+        headers = {"User-Agent": self.user_agent}
+        self.add_payload(payload)
+        for key in ("sort", "closest"):
+            payload.pop(key, None)
+        payload["limit"] = "-1" if before else "1"
+        fields = self.fields or None
+
+        lower, upper = time_range(self.start_timestamp, self.end_timestamp)
+        one_second = timedelta(seconds=1)
+        width = INITIAL_WINDOW
+
+        # The snapshots are compared with the timestamp as strings, a partial
+        # timestamp like 202001011200 is before all the snapshots of its minute.
+        if before:
+            end = min(timestamp_to_datetime(timestamp) - one_second, upper)
+            start = end - width + one_second
+        else:
+            start = timestamp_to_datetime(timestamp)
+            if len(timestamp) >= 14:
+                start += one_second
+            start = max(start, lower)
+            end = start + width - one_second
+
+        while end >= lower if before else start <= upper:
+            payload["from"] = datetime_to_timestamp(max(start, lower))
+            payload["to"] = datetime_to_timestamp(min(end, upper))
+
+            for line in self.page_lines(payload, headers):
+                for snapshot in self.parse_entry(line, fields):
+                    if self.on_side(snapshot, timestamp, before):
+                        return snapshot
+
+            width *= WINDOW_GROWTH
+            if before:
+                end, start = start - one_second, start - width
+            else:
+                start, end = end + one_second, end + width
+
+        return None
+
     def before(
         self,
         year: Optional[int] = None,
@@ -217,12 +707,9 @@ class WaybackMachineCDXServerAPI:
                 hour=now.tm_hour if hour is None else hour,
                 minute=now.tm_min if minute is None else minute,
             )
-        self.closest = timestamp
-        self.sort = "closest"
-        self.limit = 25000
-        for snapshot in self.snapshots():
-            if snapshot.timestamp < timestamp:
-                return snapshot
+        snapshot = self.window_search(timestamp, before=True)
+        if snapshot is not None:
+            return snapshot
 
         # If a snapshot isn't returned, then none were found.
         raise NoCDXRecordFound(
@@ -258,12 +745,9 @@ class WaybackMachineCDXServerAPI:
                 hour=now.tm_hour if hour is None else hour,
                 minute=now.tm_min if minute is None else minute,
             )
-        self.closest = timestamp
-        self.sort = "closest"
-        self.limit = 25000
-        for snapshot in self.snapshots():
-            if snapshot.timestamp > timestamp:
-                return snapshot
+        snapshot = self.window_search(timestamp, before=False)
+        if snapshot is not None:
+            return snapshot
 
         # If a snapshot isn't returned, then none were found.
         raise NoCDXRecordFound(
@@ -319,21 +803,80 @@ class WaybackMachineCDXServerAPI:
 
         return first_snapshot
 
+    def edge_snapshot(self, newest: bool) -> Optional[CDXSnapshot]:
+        """
+        Returns the newest (or the oldest) snapshot of an exact URL query
+        without sorting by closeness.
+
+        The records of an exact URL are in timestamp order, so limit=1 is the
+        oldest record and limit=-1 with fastLatest=true is the newest one.
+        Returns None if the query is not for an exact URL or if the body is
+        not CDX lines because the CDX server did not support the request,
+        the caller then falls back to near(). Raises NoCDXRecordFound if the
+        URL has no records and WaybackError if the CDX server answered with
+        an error status.
+        """
+        if not self.single_url():
+            return None
+
+        payload: Dict[str, str] = {}
+        headers = {"User-Agent": self.user_agent}
+        self.add_payload(payload)
+        for key in ("sort", "closest"):
+            payload.pop(key, None)
+        payload["limit"] = "-1" if newest else "1"
+        if newest:
+            payload["fastLatest"] = "true"
+
+        # The errors of the request are raised, a single record is read.
+        lines = list(self.page_lines(payload, headers))
+        try:
+            for line in lines:
+                for snapshot in self.parse_entry(line, self.fields or None):
+                    return snapshot
+        except WaybackError:
+            # The body is not CDX lines, the server did not support the query.
+            return None
+
+        if newest:
+            return None
+
+        raise NoCDXRecordFound(
+            "Wayback Machine's CDX server did not return any records "
+            + "for the query. The URL may not have any archives "
+            + " on the Wayback Machine or the URL may have been recently "
+            + "archived and is still not available on the CDX server."
+        )
+
     def newest(self) -> CDXSnapshot:
         """
-        Passes the current UNIX time to near() for retrieving the newest archive
-        from the availability API.
+        Returns the newest archive, the last record of the URL is requested
+        with limit=-1 and fastLatest=true.
+
+        If the query is not for an exact URL or the CDX server does not
+        support the request the current UNIX time is passed to near().
 
         Remember UNIX time is UTC and Wayback Machine is also UTC based.
         """
+        snapshot = self.edge_snapshot(newest=True)
+        if snapshot is not None:
+            return snapshot
         return self.near(unix_timestamp=int(time.time()))
 
     def oldest(self) -> CDXSnapshot:
         """
-        Passes the date 1994-01-01 to near which should return the oldest archive
-        because Wayback Machine was started in May, 1996 and it is assumed that
-        there would be no archive older than January 1, 1994.
+        Returns the oldest archive, the first record of the URL is requested
+        with limit=1.
+
+        If the query is not for an exact URL or the CDX server does not
+        support the request the date 1994-01-01 is passed to near() which
+        should return the oldest archive because Wayback Machine was started
+        in May, 1996 and it is assumed that there would be no archive older
+        than January 1, 1994.
         """
+        snapshot = self.edge_snapshot(newest=False)
+        if snapshot is not None:
+            return snapshot
         return self.near(year=1994, month=1, day=1)
 
     def snapshots(self) -> Generator[CDXSnapshot, None, None]:
@@ -362,55 +905,148 @@ class WaybackMachineCDXServerAPI:
 
         entries = self.cdx_api_manager(payload, headers)
 
+        fields = self.fields or None
+
         for entry in entries:
+            yield from self.parse_entry(entry, fields)
+
+    def count_page(
+        self, payload: Dict[str, str], headers: Dict[str, str]
+    ) -> Tuple[int, Optional[str]]:
+        """
+        Requests a page and returns the number of its CDX lines and its resume
+        key, the lines are counted on the streamed bytes without decoding.
+
+        Raises TooManyRequestsError if the server answered with 429 and
+        WaybackError for the other error statuses.
+        """
+        url = full_url(self.endpoint, params=payload)
+        res = get_response(url, headers=headers, transport=self.transport, stream=True)
+
+        if isinstance(res, Exception):
+            raise res
 
-            if entry.isspace() or len(entry) <= 1 or not entry:
+        self.last_api_request_url = url
+        try:
+            check_page_status(res, url)
+            return count_response_lines(res)
+        finally:
+            res.close()
+
+    def count(self) -> int:
+        """
+        Returns the number of records of the query without creating any
+        snapshot, only the timestamp field is requested and the newlines of
+        the response are counted.
+
+        When use_pagination is True max_workers pages are counted
+        concurrently.
+        """
+        payload: Dict[str, str] = {}
+        headers = {"User-Agent": self.user_agent}
+
+        self.add_payload(payload)
+        payload["fl"] = "timestamp"
+
+        if self.use_pagination:
+            total_pages = get_total_pages(
+                self.url, self.user_agent, transport=self.transport, payload=payload
+            )
+
+            def count_page_number(page: int) -> int:
+                return self.count_page(dict(payload, page=str(page)), headers)[0]
+
+            if self.max_workers == 1:
+                return sum(map(count_page_number, range(total_pages)))
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                return sum(executor.map(count_page_number, range(total_pages)))
+
+        payload["showResumeKey"] = "true"
+        payload["limit"] = str(self.limit)
+        total = 0
+        resume_key: Optional[str] = ""
+        while resume_key is not None:
+            if resume_key:
+                payload["resumeKey"] = resume_key
+            page_count, resume_key = self.count_page(payload, headers)
+            total += page_count
+        return total
+
+    def raw_lines(self) -> Generator[str, None, None]:
+        """
+        Yields the CDX data lines as strings without creating a CDXSnapshot
+        for each line, the fastest way to consume a query with a field
+        projection.
+        """
+        payload: Dict[str, str] = {}
+        headers = {"User-Agent": self.user_agent}
+
+        self.add_payload(payload)
+
+        yield from self.cdx_api_manager(payload, headers)
+
+    def snapshot_batches(
+        self, batch_size: int = 10000
+    ) -> Generator[CDXSnapshotBatch, None, None]:
+        """
+        Yields the CDX data lines as column oriented batches of at most
+        batch_size records, the batches are instances of CDXSnapshotBatch.
+
+        Use this method instead of snapshots() for aggregating large queries,
+        no object is created per record.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size should be positive")
+
+        payload: Dict[str, str] = {}
+        headers = {"User-Agent": self.user_agent}
+
+        self.add_payload(payload)
+
+        fields = self.fields or None
+        lines: List[str] = []
+
+        for line in self.cdx_api_manager(payload, headers):
+            # Same as in parse_entry(), ignore the invalid entries.
+            if len(line) < 46 and fields is None:
                 continue
 
-            # each line is a snapshot aka entry of the CDX server API.
-            # We are able to split the page by lines because it only
-            # splits the lines on a sinlge page and not all the entries
-            # at once, thus there should be no issues of too much memory usage.
-            snapshot_list = entry.split("\n")
-
-            for snapshot in snapshot_list:
-
-                # 14 + 32 == 46 ( timestamp + digest ), ignore the invalid entries.
-                # they are invalid if their length is smaller than sum of length
-                # of a standard wayback_timestamp and standard digest of an entry.
-                if len(snapshot) < 46:
-                    continue
-
-                properties: Dict[str, Optional[str]] = {
-                    "urlkey": None,
-                    "timestamp": None,
-                    "original": None,
-                    "mimetype": None,
-                    "statuscode": None,
-                    "digest": None,
-                    "length": None,
-                }
-
-                property_value = snapshot.split(" ")
-
-                total_property_values = len(property_value)
-                warranted_total_property_values = len(properties)
-
-                if total_property_values != warranted_total_property_values:
-                    raise WaybackError(
-                        f"Snapshot returned by CDX API has {total_property_values} prop"
-                        f"erties instead of expected {warranted_total_property_values} "
-                        f"properties.\nProblematic Snapshot: {snapshot}"
-                    )
+            lines.append(line)
+            if len(lines) >= batch_size:
+                yield CDXSnapshotBatch.from_lines(lines, fields)
+                lines = []
+
+        if lines:
+            yield CDXSnapshotBatch.from_lines(lines, fields)
+
+    @staticmethod
+    def parse_entry(
+        entry: str, fields: Optional[List[str]] = None
+    ) -> Generator[CDXSnapshot, None, None]:
+        """
+        Parses an entry yielded by cdx_api_manager and yields the snapshots
+        in it as instances of CDXSnapshot.
+
+        fields are the requested CDX fields, None if all the fields were
+        requested.
+        """
+        if entry.isspace() or len(entry) <= 1 or not entry:
+            return
+
+        # each line is a snapshot aka entry of the CDX server API.
+        # We are able to split the page by lines because it only
+        # splits the lines on a sinlge page and not all the entries
+        # at once, thus there should be no issues of too much memory usage.
+        snapshot_list = entry.split("\n")
+
+        for snapshot in snapshot_list:
+
+            # 14 + 32 == 46 ( timestamp + digest ), ignore the invalid entries.
+            # they are invalid if their length is smaller than sum of length
+            # of a standard wayback_timestamp and standard digest of an entry.
+            # A line of projected fields can be shorter, only skip blank lines.
+            if len(snapshot) < 46 and (fields is None or not snapshot.strip()):
+                continue
 
-                (
-                    properties["urlkey"],
-                    properties["timestamp"],
-                    properties["original"],
-                    properties["mimetype"],
-                    properties["statuscode"],
-                    properties["digest"],
-                    properties["length"],
-                ) = property_value
-
-                yield CDXSnapshot(cast(Dict[str, str], properties))
+            yield CDXSnapshot.from_line(snapshot, fields)
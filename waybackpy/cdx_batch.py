@@ -0,0 +1,202 @@
+"""
+Module that contains the CDXSnapshotBatch class, a column oriented batch of
+CDX records.
+
+WaybackMachineCDXServerAPI.snapshot_batches() yields the CDX records as
+CDXSnapshotBatch objects instead of one CDXSnapshot per record, which makes
+aggregating millions of records cheap as no object is kept per record.
+
+The integer columns are NumPy int64 arrays if NumPy is installed, else they
+are array.array objects of typecode 'q'. NumPy is not a dependency of
+waybackpy.
+"""
+
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .cdx_snapshot import CDX_FIELDS
+from .exceptions import WaybackError
+from .utils import optional_import
+
+numpy: Any = optional_import("numpy")
+
+
+def int_column(values: "array[int]") -> Any:
+    """
+    Returns the array as an int64 NumPy array without copying it if NumPy
+    is installed, else returns the array itself.
+    """
+    if numpy is None:
+        return values
+    return numpy.frombuffer(values, dtype=numpy.int64)
+
+
+def to_int(value: str) -> int:
+    """
+    Converts the CDX field to integer, the CDX server uses '-' for unknown
+    values (for example status code of revisit records) which becomes -1.
+    """
+    try:
+        return int(value)
+    except ValueError:
+        return -1
+
+
+def int_appender(
+    column: "array[int]", convert: Callable[[str], int]
+) -> Callable[[str], None]:
+    """
+    Returns a function that appends the converted value to the column.
+    """
+
+    def append(value: str) -> None:
+        column.append(convert(value))
+
+    return append
+
+
+def code_appender(
+    codes: "array[int]", dictionary: Dict[str, int]
+) -> Callable[[str], None]:
+    """
+    Returns a function that appends the dictionary code of the value to the
+    codes column, new values get the next code.
+    """
+
+    def append(value: str) -> None:
+        codes.append(dictionary.setdefault(value, len(dictionary)))
+
+    return append
+
+
+class CDXSnapshotBatch:
+    """
+    Column oriented batch of CDX records, every column has one value per
+    record in the order returned by the CDX server API.
+
+    timestamp: int64 column, the timestamps as integers yyyyMMddhhmmss.
+
+    statuscode: int64 column, -1 if the status code is unknown ('-').
+
+    length: int64 column, -1 if the length is unknown ('-').
+
+    urlkey_codes and mimetype_codes: int64 columns of the dictionary encoded
+    urlkey and mimetype, the values are indices into urlkey_categories and
+    mimetype_categories. The dictionaries are specific to the batch.
+
+    original and digest: lists of strings.
+
+    If the batch was built from lines with a field projection, the columns
+    of the fields that were not requested are None.
+    """
+
+    def __init__(
+        self,
+        timestamp: Any,
+        statuscode: Any,
+        length: Any,
+        urlkey_codes: Any,
+        urlkey_categories: List[str],
+        mimetype_codes: Any,
+        mimetype_categories: List[str],
+        original: Optional[List[str]],
+        digest: Optional[List[str]],
+        size: int,
+    ) -> None:
+        self.timestamp = timestamp
+        self.statuscode = statuscode
+        self.length = length
+        self.urlkey_codes = urlkey_codes
+        self.urlkey_categories = urlkey_categories
+        self.mimetype_codes = mimetype_codes
+        self.mimetype_categories = mimetype_categories
+        self.original = original
+        self.digest = digest
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"<CDXSnapshotBatch of {len(self)} records>"
+
+    @property
+    def urlkey(self) -> List[str]:
+        """
+        Decodes the urlkey column to a list of strings.
+        """
+        return [self.urlkey_categories[code] for code in self.urlkey_codes]
+
+    @property
+    def mimetype(self) -> List[str]:
+        """
+        Decodes the mimetype column to a list of strings.
+        """
+        return [self.mimetype_categories[code] for code in self.mimetype_codes]
+
+    @classmethod
+    def from_lines(
+        cls, lines: Sequence[str], fields: Optional[Sequence[str]] = None
+    ) -> "CDXSnapshotBatch":
+        """
+        Builds the batch from the lines returned by the CDX server API.
+
+        fields are the names of the fields in the lines if the lines were
+        requested with a field projection, the columns of the other fields
+        are None.
+
+        Raises WaybackError if a line does not have the expected fields.
+        """
+        fields = CDX_FIELDS if fields is None else fields
+        int_columns: Dict[str, "array[int]"] = {}
+        str_columns: Dict[str, List[str]] = {}
+        dictionaries: Dict[str, Dict[str, int]] = {}
+        appenders: List[Callable[[str], None]] = []
+
+        for field in fields:
+            if field in ("timestamp", "statuscode", "length"):
+                int_columns[field] = array("q")
+                appenders.append(
+                    int_appender(
+                        int_columns[field], int if field == "timestamp" else to_int
+                    )
+                )
+            elif field in ("urlkey", "mimetype"):
+                int_columns[field] = array("q")
+                dictionaries[field] = {}
+                appenders.append(code_appender(int_columns[field], dictionaries[field]))
+            else:
+                values: List[str] = []
+                str_columns[field] = values
+                appenders.append(values.append)
+
+        for line in lines:
+            property_value = line.split(" ")
+
+            if len(property_value) != len(fields):
+                raise WaybackError(
+                    f"Snapshot returned by CDX API has {len(property_value)} prop"
+                    f"erties instead of expected {len(fields)} "
+                    f"properties.\nProblematic Snapshot: {line}"
+                )
+
+            for append, value in zip(appenders, property_value):
+                append(value)
+
+        def int_column_or_none(field: str) -> Any:
+            return int_column(int_columns[field]) if field in int_columns else None
+
+        return cls(
+            timestamp=int_column_or_none("timestamp"),
+            statuscode=int_column_or_none("statuscode"),
+            length=int_column_or_none("length"),
+            urlkey_codes=int_column_or_none("urlkey"),
+            # dictionaries preserve the insertion order, so the list index
+            # of each value is its code.
+            urlkey_categories=list(dictionaries.get("urlkey", [])),
+            mimetype_codes=int_column_or_none("mimetype"),
+            mimetype_categories=list(dictionaries.get("mimetype", [])),
+            original=str_columns.get("original"),
+            digest=str_columns.get("digest"),
+            size=len(lines),
+        )
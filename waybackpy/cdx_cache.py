@@ -0,0 +1,366 @@
+"""
+This module contains the caches for the pages returned by the CDX server API.
+
+WaybackMachineCDXServerAPI stores the body of every page it downloads in the
+cache passed to it, keyed on the request URL generated by full_url(), and
+reads the page back from the cache when the same query is made again.
+
+The cache backends are:
+
+MemoryCDXCache, the pages are kept in the memory of the process.
+
+FileSystemCDXCache, a file per page in a directory.
+
+SQLiteCDXCache, a single SQLite database file.
+
+The filesystem and SQLite caches can be shared by many processes.
+
+Each entry has its own time to live (TTL), None means the entry never
+expires. The caches are bounded by max_size, the total size of the stored
+pages in bytes, the least recently used entries are evicted first.
+"""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class CDXCache(ABC):
+    """
+    Base class of the caches, the subclasses implement get(), set(),
+    delete() and clear().
+
+    max_size: Maximum total size of the stored pages in bytes.
+
+    default_ttl: TTL in seconds used for the pages of queries that can still
+                 get new records, default is one day.
+    """
+
+    def __init__(
+        self, max_size: int = 256 * 1024 * 1024, default_ttl: Optional[float] = 86400
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size should be positive")
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+
+    @staticmethod
+    def expires_at(ttl: Optional[float]) -> Optional[float]:
+        """
+        Converts the TTL to the UNIX time at which the entry expires.
+        """
+        return None if ttl is None else time.time() + ttl
+
+    @staticmethod
+    def expired(expires_at: Optional[float]) -> bool:
+        """
+        Returns True if an entry expiring at expires_at is expired.
+        """
+        return expires_at is not None and expires_at <= time.time()
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Returns the value stored for key, None if there is no value or if
+        the value is expired.
+        """
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """
+        Stores the value for key, the value expires after ttl seconds. If ttl
+        is None the value never expires.
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """
+        Removes the value stored for key if any.
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Removes all the values.
+        """
+
+
+class MemoryCDXCache(CDXCache):
+    """
+    Cache that keeps the pages in the memory of the process, it is thread
+    safe but it can not be shared by processes.
+    """
+
+    def __init__(
+        self, max_size: int = 256 * 1024 * 1024, default_ttl: Optional[float] = 86400
+    ) -> None:
+        super().__init__(max_size=max_size, default_ttl=default_ttl)
+        self.entries: "OrderedDict[str, Tuple[Optional[float], bytes]]" = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if self.expired(expires_at):
+                self.remove(key)
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self.lock:
+            self.remove(key)
+            if len(value) > self.max_size:
+                return
+
+            self.entries[key] = (self.expires_at(ttl), value)
+            self.size += len(value)
+
+            while self.size > self.max_size:
+                self.remove(next(iter(self.entries)))
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            self.remove(key)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the entry, the lock must be held by the caller.
+        """
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+class FileSystemCDXCache(CDXCache):
+    """
+    Cache that stores every page in its own file inside directory.
+
+    The files are written to a temporary file first and then renamed, so
+    the processes sharing the directory never read a partially written page.
+    The modification time of a file is its last access time, it is used for
+    evicting the least recently used pages.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_size: int = 1024 * 1024 * 1024,
+        default_ttl: Optional[float] = 86400,
+    ) -> None:
+        super().__init__(max_size=max_size, default_ttl=default_ttl)
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        """
+        Returns the path of the file of the key.
+        """
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + ".cdx")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                header = file.readline()
+                value = file.read()
+        except FileNotFoundError:
+            return None
+
+        expires_at = None if header.strip() == b"-" else float(header)
+        if self.expired(expires_at):
+            self.delete(key)
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        if len(value) > self.max_size:
+            return
+
+        expires_at = self.expires_at(ttl)
+        header = b"-" if expires_at is None else repr(expires_at).encode("ascii")
+
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.directory, suffix=".tmp"
+        )
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.write(header + b"\n")
+                file.write(value)
+            os.replace(temporary_path, self.path(key))
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+        self.evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        for name in os.listdir(self.directory):
+            if name.endswith(".cdx"):
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used pages until the total size is at
+        most max_size. Files removed by another process are ignored.
+        """
+        files = []
+        total_size = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".cdx"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+            total_size += stat.st_size
+
+        files.sort()
+        for _, size, name in files:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+
+class SQLiteCDXCache(CDXCache):
+    """
+    Cache that stores the pages in a SQLite database at path.
+
+    Every operation is a transaction on its own connection, so the cache can
+    be used by many threads and processes at once.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int = 1024 * 1024 * 1024,
+        default_ttl: Optional[float] = 86400,
+        timeout: float = 30,
+    ) -> None:
+        super().__init__(max_size=max_size, default_ttl=default_ttl)
+        self.path = path
+        self.timeout = timeout
+        with self.connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, "
+                "accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)"
+            )
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Opens a new connection to the database.
+        """
+        return sqlite3.connect(self.path, timeout=self.timeout)
+
+    def get(self, key: str) -> Optional[bytes]:
+        connection = self.connect()
+        try:
+            with connection:
+                row = connection.execute(
+                    "SELECT value, expires_at FROM pages WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                value, expires_at = row
+                if self.expired(expires_at):
+                    connection.execute("DELETE FROM pages WHERE key = ?", (key,))
+                    return None
+
+                connection.execute(
+                    "UPDATE pages SET accessed_at = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+                return bytes(value)
+        finally:
+            connection.close()
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        if len(value) > self.max_size:
+            return
+
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO pages "
+                    "(key, value, expires_at, accessed_at, size) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, value, self.expires_at(ttl), time.time(), len(value)),
+                )
+                (total_size,) = connection.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM pages"
+                ).fetchone()
+                if total_size <= self.max_size:
+                    return
+
+                rows = connection.execute(
+                    "SELECT key, size FROM pages ORDER BY accessed_at"
+                ).fetchall()
+                evicted = []
+                for evicted_key, size in rows:
+                    if total_size <= self.max_size:
+                        break
+                    evicted.append((evicted_key,))
+                    total_size -= size
+
+                connection.executemany("DELETE FROM pages WHERE key = ?", evicted)
+        finally:
+            connection.close()
+
+    def delete(self, key: str) -> None:
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute("DELETE FROM pages WHERE key = ?", (key,))
+        finally:
+            connection.close()
+
+    def clear(self) -> None:
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute("DELETE FROM pages")
+        finally:
+            connection.close()
@@ -0,0 +1,149 @@
+"""
+Module that contains the CDXCheckpoint class, the on-disk checkpoint of a
+CDX server API crawl.
+
+WaybackMachineCDXServerAPI updates the checkpoint file passed as resume_from
+after every page, and if the crawl fails the same file is used to continue
+the crawl from the record after the last record that was yielded.
+"""
+
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+from .exceptions import WaybackError
+
+
+class CDXCheckpoint:
+    """
+    The position of a CDX server API crawl.
+
+    path: The path of the checkpoint file.
+
+    query: The request URL of the query without the page and resume key
+           parameters, a checkpoint can only resume the same query.
+
+    page: The page of the pagination API that is being read.
+
+    resume_key: The resume key used for requesting the page that is being
+                read, None for the first page.
+
+    offset: Number of records of the page being read that were already
+            yielded, these are skipped when the crawl is resumed.
+
+    emitted: Total number of records yielded by the crawl.
+
+    complete: True if the crawl read all the pages.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        query: Optional[str] = None,
+        page: int = 0,
+        resume_key: Optional[str] = None,
+        offset: int = 0,
+        emitted: int = 0,
+        complete: bool = False,
+    ) -> None:
+        self.path = path
+        self.query = query
+        self.page = page
+        self.resume_key = resume_key
+        self.offset = offset
+        self.emitted = emitted
+        self.complete = complete
+
+    def __repr__(self) -> str:
+        return (
+            f"CDXCheckpoint(path={self.path!r}, page={self.page}, "
+            f"resume_key={self.resume_key!r}, offset={self.offset}, "
+            f"emitted={self.emitted}, complete={self.complete})"
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "CDXCheckpoint":
+        """
+        Reads the checkpoint file, if the file does not exist a new
+        checkpoint for the path is returned.
+        """
+        if not os.path.isfile(path):
+            return cls(path)
+
+        with open(path, encoding="utf-8") as file:
+            try:
+                data: Dict[str, Any] = json.load(file)
+            except json.decoder.JSONDecodeError as json_decode_error:
+                raise WaybackError(
+                    f"Checkpoint file '{path}' is not valid JSON."
+                ) from json_decode_error
+
+        return cls(
+            path,
+            query=data.get("query"),
+            page=int(data.get("page", 0)),
+            resume_key=data.get("resume_key"),
+            offset=int(data.get("offset", 0)),
+            emitted=int(data.get("emitted", 0)),
+            complete=bool(data.get("complete", False)),
+        )
+
+    def save(self) -> None:
+        """
+        Writes the checkpoint file, the file is replaced atomically so a
+        crash while saving never leaves a corrupted checkpoint.
+        """
+        data = {
+            "query": self.query,
+            "page": self.page,
+            "resume_key": self.resume_key,
+            "offset": self.offset,
+            "emitted": self.emitted,
+            "complete": self.complete,
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def start(self, query: str) -> None:
+        """
+        Binds the checkpoint to the query, raises WaybackError if the
+        checkpoint was saved by a different query.
+        """
+        if self.query is not None and self.query != query:
+            raise WaybackError(
+                f"Checkpoint '{self.path}' was saved by a different query.\n"
+                f"Checkpoint query: {self.query}\nQuery: {query}"
+            )
+        self.query = query
+
+    def record(self) -> None:
+        """
+        Counts a record yielded by the crawl.
+        """
+        self.offset += 1
+        self.emitted += 1
+
+    def next_page(self, page: int = 0, resume_key: Optional[str] = None) -> None:
+        """
+        Moves the checkpoint to the start of the next page and saves it.
+        """
+        self.page = page
+        self.resume_key = resume_key
+        self.offset = 0
+        self.save()
+
+    def finish(self) -> None:
+        """
+        Marks the crawl as complete and saves the checkpoint.
+        """
+        self.complete = True
+        self.offset = 0
+        self.save()
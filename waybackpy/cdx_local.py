@@ -0,0 +1,154 @@
+"""
+Module that contains CDXLocalQuery, a local engine for the filter and the
+collapse parameters of the CDX server API.
+
+The CDX server applies the filters and the collapses itself, so every
+variation of a query is a new download. CDXLocalQuery compiles the same
+syntax into predicates and applies them to CDX lines or snapshots that were
+already downloaded, for example the snapshots of a broad query read back
+from a cache:
+
+>>> broad = WaybackMachineCDXServerAPI("example.com", cache=cache)
+>>> ok_pages = CDXLocalQuery(filters=["statuscode:200"], collapses=["timestamp:8"])
+>>> for snapshot in ok_pages.snapshots(broad.snapshots()):
+...     print(snapshot.archive_url)
+
+The semantics follow the CDX server: a filter regex must match the whole
+field, a '!' before the field negates the filter, the filters are applied
+before the collapses and a collapse drops a record if the first N characters
+of the field (the whole field if N is not given) are the same as in the
+previous record kept by the collapse.
+"""
+
+import re
+from typing import Callable, Generator, Iterable, List, Optional, Sequence, Tuple
+
+from .cdx_snapshot import CDX_FIELDS, CDXSnapshot
+from .cdx_utils import check_collapses, check_filters
+from .exceptions import WaybackError
+
+FILTER_REGEX = re.compile(r"(!?)([a-z]+):(.*)", re.DOTALL)
+COLLAPSE_REGEX = re.compile(r"([a-z]+)(?::([0-9]+))?")
+
+
+def field_index(field: str, fields: Sequence[str]) -> int:
+    """
+    Returns the index of the field in the records, raises WaybackError if
+    the records do not have the field.
+    """
+    if field not in fields:
+        raise WaybackError(
+            f"The field '{field}' is not in the fields of the records {list(fields)}."
+        )
+    return fields.index(field)
+
+
+def compile_filter(
+    _filter: str, fields: Sequence[str] = CDX_FIELDS
+) -> Callable[[Sequence[str]], bool]:
+    """
+    Compiles a '[!]field:regex' filter to a predicate on the records.
+    """
+    check_filters([_filter])
+    match = FILTER_REGEX.fullmatch(_filter)
+    if match is None:
+        raise WaybackError(
+            f"Filter '{_filter}' is not following the cdx filter syntax."
+        )
+
+    negate, field, regex = match.groups()
+    index = field_index(field, fields)
+    fullmatch = re.compile(regex).fullmatch
+
+    if negate:
+        return lambda record: fullmatch(record[index]) is None
+    return lambda record: fullmatch(record[index]) is not None
+
+
+def compile_collapse(
+    collapse: str, fields: Sequence[str] = CDX_FIELDS
+) -> Tuple[int, Optional[int]]:
+    """
+    Compiles a 'field[:N]' collapse to the index of the field and the number
+    of compared characters, None for the whole field.
+    """
+    check_collapses([collapse])
+    match = COLLAPSE_REGEX.fullmatch(collapse)
+    if match is None:
+        raise WaybackError(
+            f"collapse argument '{collapse}' is not following the cdx collapse syntax."
+        )
+
+    field, length = match.groups()
+    return field_index(field, fields), None if length is None else int(length)
+
+
+class CDXLocalQuery:
+    """
+    Applies filters and collapses locally to CDX records.
+
+    filters and collapses use the syntax of WaybackMachineCDXServerAPI.
+
+    fields are the fields of the lines passed to lines(), set it to the
+    fields of the query if the lines were requested with a field projection.
+    """
+
+    def __init__(
+        self,
+        filters: Optional[List[str]] = None,
+        collapses: Optional[List[str]] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> None:
+        self.filters = [] if filters is None else filters
+        self.collapses = [] if collapses is None else collapses
+        self.fields = tuple(fields or CDX_FIELDS)
+        self.predicates = [compile_filter(f, self.fields) for f in self.filters]
+        self.collapse_keys = [compile_collapse(c, self.fields) for c in self.collapses]
+
+    def matcher(self) -> Callable[[Sequence[str]], bool]:
+        """
+        Returns the predicate that is True for the records, lists of field
+        values, that pass the filters and the collapses. The collapses
+        remember the previous record, use a new matcher for every stream.
+        """
+        predicates = self.predicates
+        collapse_keys = self.collapse_keys
+        previous: List[Optional[str]] = [None] * len(collapse_keys)
+
+        def keep(record: Sequence[str]) -> bool:
+            for predicate in predicates:
+                if not predicate(record):
+                    return False
+
+            # Like the CDX server every collapse only sees the records that
+            # passed the filters and the collapses before it.
+            for i, (index, length) in enumerate(collapse_keys):
+                key = record[index] if length is None else record[index][:length]
+                if key == previous[i]:
+                    return False
+                previous[i] = key
+            return True
+
+        return keep
+
+    def lines(self, lines: Iterable[str]) -> Generator[str, None, None]:
+        """
+        Yields the CDX lines that pass the filters and the collapses, the
+        blank lines are skipped.
+        """
+        keep = self.matcher()
+        for line in lines:
+            if line and keep(line.split(" ")):
+                yield line
+
+    def snapshots(
+        self, snapshots: Iterable[CDXSnapshot]
+    ) -> Generator[CDXSnapshot, None, None]:
+        """
+        Yields the snapshots that pass the filters and the collapses.
+        """
+        keep = self.matcher()
+        fields = self.fields
+        for snapshot in snapshots:
+            if keep([getattr(snapshot, field) for field in fields]):
+                yield snapshot
@@ -0,0 +1,83 @@
+"""
+Module that contains the CDXPagePlan class, the plan of the pages of a
+paginated CDX server API query.
+
+The CDX server splits its index into compressed blocks of about 3000 lines
+and a page of the pagination API is pageSize blocks (50 by default).
+WaybackMachineCDXServerAPI.plan_pages() asks the CDX server how many pages
+the query has and optionally which index blocks each page covers, so the
+size of a crawl is known before any page is fetched.
+"""
+
+from typing import List, Optional
+
+# Default number of index blocks in a page of the CDX server.
+DEFAULT_PAGE_SIZE = 50
+
+# Approximate number of CDX lines in an index block of the CDX server.
+LINES_PER_BLOCK = 3000
+
+
+class CDXPagePlan:
+    """
+    The pages of a paginated query.
+
+    total_pages: Number of pages returned by showNumPages for the query.
+
+    page_size: The pageSize of the query in index blocks, None if the CDX
+               server default is used.
+
+    paged_index: The secondary index lines returned by showPagedIndex for
+                 every page, one list per page. None if the paged index was
+                 not requested. Each line starts with the urlkey and the
+                 timestamp of the first record of its block.
+    """
+
+    def __init__(
+        self,
+        total_pages: int,
+        page_size: Optional[int] = None,
+        paged_index: Optional[List[List[str]]] = None,
+    ) -> None:
+        self.total_pages = total_pages
+        self.page_size = page_size
+        self.paged_index = paged_index
+
+    def __repr__(self) -> str:
+        return (
+            f"CDXPagePlan(total_pages={self.total_pages}, "
+            f"page_size={self.page_size}, "
+            f"estimated_records={self.estimated_records})"
+        )
+
+    @property
+    def boundaries(self) -> Optional[List[str]]:
+        """
+        The urlkey and timestamp of the first record of every page, the
+        shard boundaries of the query. None if the paged index was not
+        requested.
+        """
+        if self.paged_index is None:
+            return None
+        return [
+            " ".join(blocks[0].split()[:2]) for blocks in self.paged_index if blocks
+        ]
+
+    @property
+    def estimated_blocks(self) -> int:
+        """
+        Number of index blocks read by the query, exact if the paged index
+        was requested else the upper bound total_pages * page_size.
+        """
+        if self.paged_index is not None:
+            return sum(len(blocks) for blocks in self.paged_index)
+        page_size = DEFAULT_PAGE_SIZE if self.page_size is None else self.page_size
+        return self.total_pages * page_size
+
+    @property
+    def estimated_records(self) -> int:
+        """
+        Approximate number of CDX records of the query before the filters
+        and the collapses are applied.
+        """
+        return self.estimated_blocks * LINES_PER_BLOCK
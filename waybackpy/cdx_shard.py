@@ -0,0 +1,215 @@
+"""
+Utilities for the time-window sharded queries of the CDX server API.
+
+WaybackMachineCDXServerAPI with shards > 1 splits the time range of a query
+into windows, every window is fetched with its own resumeKey chain in a
+thread and the lines of the windows are merged back into the order of the
+CDX server (urlkey then timestamp).
+
+The windows are planned from the number of days with captures in every year,
+so the dense years are split into more windows than the sparse years.
+"""
+
+import calendar
+import math
+import queue
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .cdx_snapshot import CDX_FIELDS
+
+# First timestamp of the Wayback Machine, used when the query has no start.
+WAYBACK_START = "1996"
+
+TimeWindow = Tuple[datetime, datetime]
+
+
+def timestamp_to_datetime(timestamp: str, end: bool = False) -> datetime:
+    """
+    Converts a possibly partial Wayback Machine timestamp to a datetime.
+
+    If end is True the timestamp is the end of a range and the missing parts
+    are the last second it covers, for example 200202 is 2002-02-28 23:59:59.
+    """
+    timestamp = timestamp[:14]
+    if not end:
+        padding = len(timestamp)
+        return datetime.strptime(timestamp + "00000101000000"[padding:], "%Y%m%d%H%M%S")
+
+    year = int(timestamp[:4])
+    month = int(timestamp[4:6] or 12)
+    last_day = calendar.monthrange(year, month)[1]
+    day = int(timestamp[6:8] or last_day)
+    hour = int(timestamp[8:10] or 23)
+    minute = int(timestamp[10:12] or 59)
+    second = int(timestamp[12:14] or 59)
+    return datetime(year, month, day, hour, minute, second)
+
+
+def datetime_to_timestamp(date: datetime) -> str:
+    """
+    Converts the datetime to a 14 digits Wayback Machine timestamp.
+    """
+    return date.strftime("%Y%m%d%H%M%S")
+
+
+def time_range(
+    start_timestamp: Optional[str], end_timestamp: Optional[str]
+) -> TimeWindow:
+    """
+    Returns the first and the last second of the time range of a query, an
+    open range ends now.
+    """
+    start = timestamp_to_datetime(start_timestamp or WAYBACK_START)
+    if end_timestamp:
+        end = timestamp_to_datetime(end_timestamp, end=True)
+    else:
+        end = datetime.utcnow().replace(microsecond=0)
+    return start, end
+
+
+def split_window(window: TimeWindow, count: int) -> List[TimeWindow]:
+    """
+    Splits the window into count windows of equal duration, the windows do
+    not overlap and cover every second of the window.
+    """
+    start, end = window
+    seconds = int((end - start).total_seconds()) + 1
+    count = max(1, min(count, seconds))
+    bounds = [start + timedelta(seconds=seconds * i // count) for i in range(count)]
+    return [
+        (bound, bounds[i + 1] - timedelta(seconds=1) if i + 1 < count else end)
+        for i, bound in enumerate(bounds)
+    ]
+
+
+def plan_windows(
+    window: TimeWindow, shards: int, year_counts: Optional[Dict[int, int]] = None
+) -> List[TimeWindow]:
+    """
+    Splits the window into about shards windows with the same number of
+    records each.
+
+    year_counts is the density of every year of the window, the years that
+    are denser than the average shard are split into several windows and
+    the consecutive sparse years are joined in one window. Without
+    year_counts the windows have equal durations.
+    """
+    total = sum(year_counts.values()) if year_counts else 0
+    if not year_counts or total == 0:
+        return split_window(window, shards)
+
+    target = total / shards
+    start, end = window
+
+    # Units are the parts of the years, every unit has at most target records.
+    units: List[Tuple[TimeWindow, float]] = []
+    for year in range(start.year, end.year + 1):
+        year_window = (
+            max(start, datetime(year, 1, 1)),
+            min(end, datetime(year, 12, 31, 23, 59, 59)),
+        )
+        count = year_counts.get(year, 0)
+        parts = split_window(year_window, math.ceil(count / target) or 1)
+        units.extend((part, count / len(parts)) for part in parts)
+
+    windows: List[TimeWindow] = []
+    window_start: Optional[datetime] = None
+    weight = 0.0
+    for (unit_start, unit_end), unit_weight in units:
+        if window_start is None:
+            window_start = unit_start
+        weight += unit_weight
+        if weight >= target:
+            windows.append((window_start, unit_end))
+            window_start = None
+            weight = 0.0
+
+    if window_start is not None:
+        if windows and weight == 0:
+            # Empty tail, extend the last window to the end.
+            windows[-1] = (windows[-1][0], end)
+        else:
+            windows.append((window_start, end))
+
+    return windows
+
+
+def merge_key(fields: Sequence[str]) -> Callable[[str], Tuple[str, ...]]:
+    """
+    Returns the function that extracts the (urlkey, timestamp) sort key of
+    the CDX lines of a query with the given fields, the lines are sorted on
+    this key by the CDX server. Without urlkey in the fields the key is
+    only the timestamp, which is the order of the lines of a single URL.
+
+    Raises ValueError if fields does not include the timestamp.
+    """
+    fields = fields or CDX_FIELDS
+    if "timestamp" not in fields:
+        raise ValueError("Sharded queries need the timestamp field.")
+
+    indices = [
+        fields.index(field) for field in ("urlkey", "timestamp") if field in fields
+    ]
+
+    def key(line: str) -> Tuple[str, ...]:
+        values = line.split(" ")
+        return tuple(values[index] for index in indices)
+
+    return key
+
+
+class ShardReader:
+    """
+    Reads the pages of a shard in a worker thread.
+
+    The next page is only fetched when the previous page is taken by the
+    consumer, so at most two pages of the shard are held in memory: the one
+    being merged and the one being fetched.
+    """
+
+    def __init__(self, pages: Iterator[List[str]]) -> None:
+        self.pages = pages
+        self.queue: "queue.Queue[Union[List[str], BaseException, None]]" = queue.Queue()
+        self.tokens = threading.Semaphore(1)
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        """
+        Fetches the pages, runs in the worker thread.
+        """
+        try:
+            while True:
+                self.tokens.acquire()
+                if self.stopped.is_set():
+                    return
+
+                page = next(self.pages, None)
+                self.queue.put(page)
+                if page is None:
+                    return
+        except BaseException as exc:  # pylint: disable=broad-except
+            self.queue.put(exc)
+
+    def lines(self) -> Iterator[str]:
+        """
+        Yields the lines of the pages of the shard.
+        """
+        while True:
+            page = self.queue.get()
+            if page is None:
+                return
+            if isinstance(page, BaseException):
+                raise page
+
+            # Let the worker fetch the next page while this one is merged.
+            self.tokens.release()
+            yield from page
+
+    def stop(self) -> None:
+        """
+        Stops the worker after the page it is fetching.
+        """
+        self.stopped.set()
+        self.tokens.release()
@@ -8,7 +8,20 @@ crawled document. And these lines are casted to CDXSnapshot.
 
 
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional, Sequence, Tuple
+
+from .exceptions import WaybackError
+
+# The fields of a CDX line in the order returned by the CDX server API.
+CDX_FIELDS: Tuple[str, ...] = (
+    "urlkey",
+    "timestamp",
+    "original",
+    "mimetype",
+    "statuscode",
+    "digest",
+    "length",
+)
 
 
 class CDXSnapshot:
@@ -55,23 +68,120 @@ class CDXSnapshot:
     length: Document’s volume of bytes in the WARC file
 
     archive_url: The archive url of the snapshot, this is not returned by the
-                 CDX server API but created by this class on init.
+                 CDX server API but created by this class.
+
+    datetime_timestamp and archive_url are computed only when accessed, the
+    class uses __slots__ to keep the memory usage low for large queries.
+
+    If the snapshot was created from a line with only some of the fields
+    (the fields parameter of the CDX server API class) the other fields are
+    not set and accessing them raises AttributeError.
     """
 
+    __slots__ = (
+        "urlkey",
+        "timestamp",
+        "original",
+        "mimetype",
+        "statuscode",
+        "digest",
+        "length",
+        "_datetime_timestamp",
+        "_archive_url",
+        "_fields",
+    )
+
     def __init__(self, properties: Dict[str, str]) -> None:
         self.urlkey: str = properties["urlkey"]
         self.timestamp: str = properties["timestamp"]
-        self.datetime_timestamp: datetime = datetime.strptime(
-            self.timestamp, "%Y%m%d%H%M%S"
-        )
         self.original: str = properties["original"]
         self.mimetype: str = properties["mimetype"]
         self.statuscode: str = properties["statuscode"]
         self.digest: str = properties["digest"]
         self.length: str = properties["length"]
-        self.archive_url: str = (
-            f"https://web.archive.org/web/{self.timestamp}/{self.original}"
-        )
+        self._datetime_timestamp: Optional[datetime] = None
+        self._archive_url: Optional[str] = None
+        self._fields: Optional[Sequence[str]] = None
+
+    @classmethod
+    def from_line(
+        cls, line: str, fields: Optional[Sequence[str]] = None
+    ) -> "CDXSnapshot":
+        """
+        Creates the snapshot from a line returned by the CDX server API, the
+        line is split only once and no dictionary is created.
+
+        fields are the names of the fields in the line if the line was
+        requested with a field projection, default is all the CDX fields.
+
+        Raises WaybackError if the line does not have the expected fields.
+        """
+        property_value = line.split(" ")
+        warranted_total_property_values = 7 if fields is None else len(fields)
+
+        if len(property_value) != warranted_total_property_values:
+            raise WaybackError(
+                f"Snapshot returned by CDX API has {len(property_value)} prop"
+                f"erties instead of expected {warranted_total_property_values} "
+                f"properties.\nProblematic Snapshot: {line}"
+            )
+
+        snapshot = cls.__new__(cls)
+        if fields is None:
+            (
+                snapshot.urlkey,
+                snapshot.timestamp,
+                snapshot.original,
+                snapshot.mimetype,
+                snapshot.statuscode,
+                snapshot.digest,
+                snapshot.length,
+            ) = property_value
+        else:
+            for field, value in zip(fields, property_value):
+                setattr(snapshot, field, value)
+        snapshot._datetime_timestamp = None
+        snapshot._archive_url = None
+        snapshot._fields = fields
+        return snapshot
+
+    @property
+    def datetime_timestamp(self) -> datetime:
+        """
+        The timestamp as a datetime object, it is computed on first access.
+        """
+        if self._datetime_timestamp is None:
+            timestamp = self.timestamp
+            # Slicing is a lot faster than datetime.strptime(), the timestamp
+            # format is always yyyyMMddhhmmss.
+            self._datetime_timestamp = datetime(
+                int(timestamp[0:4]),
+                int(timestamp[4:6]),
+                int(timestamp[6:8]),
+                int(timestamp[8:10]),
+                int(timestamp[10:12]),
+                int(timestamp[12:14]),
+            )
+        return self._datetime_timestamp
+
+    @datetime_timestamp.setter
+    def datetime_timestamp(self, value: datetime) -> None:
+        self._datetime_timestamp = value
+
+    @property
+    def archive_url(self) -> str:
+        """
+        The archive URL of the snapshot, it is computed on first access.
+        """
+        if self._archive_url is None:
+            self._archive_url = (
+                f"https://web.archive.org/web/{self.timestamp}/{self.original}"
+            )
+        return self._archive_url
+
+    @archive_url.setter
+    def archive_url(self, value: str) -> None:
+        self._archive_url = value
 
     def __repr__(self) -> str:
         """
@@ -84,6 +194,9 @@ class CDXSnapshot:
         The string representation is same as the line returned by the
         CDX server API for the snapshot.
         """
+        if self._fields is not None:
+            return " ".join(getattr(self, field) for field in self._fields)
+
         return (
             f"{self.urlkey} {self.timestamp} {self.original} "
             f"{self.mimetype} {self.statuscode} {self.digest} {self.length}"
@@ -0,0 +1,245 @@
+"""
+Module that contains the SnapshotTimeline class, an in-memory index of the
+snapshots of a CDX server API query.
+
+The timeline is built once from the snapshots of a query and then answers
+near(), before(), after() and between() lookups by bisection, without any
+request to the CDX server. near_many() answers thousands of lookups at once,
+with NumPy if it is installed.
+"""
+
+import copy
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from .cdx_shard import datetime_to_timestamp, timestamp_to_datetime
+from .cdx_snapshot import CDX_FIELDS, CDXSnapshot
+from .exceptions import NoCDXRecordFound
+from .utils import optional_import
+
+if TYPE_CHECKING:
+    from .cdx_api import WaybackMachineCDXServerAPI
+
+numpy: Any = optional_import("numpy")
+
+EPOCH = datetime(1970, 1, 1)
+
+TimelineTimestamp = Union[str, int, datetime]
+
+
+def to_seconds(timestamp: TimelineTimestamp, end: bool = False) -> int:
+    """
+    Converts a Wayback Machine timestamp, possibly partial, or a datetime to
+    the number of seconds since the UNIX epoch.
+
+    If end is True a partial timestamp is the last second it covers, see
+    timestamp_to_datetime().
+    """
+    if isinstance(timestamp, datetime):
+        date = timestamp
+    else:
+        timestamp = str(timestamp)
+        if len(timestamp) == 14:
+            # Fast path for the timestamps of the CDX lines.
+            date = datetime(
+                int(timestamp[:4]),
+                int(timestamp[4:6]),
+                int(timestamp[6:8]),
+                int(timestamp[8:10]),
+                int(timestamp[10:12]),
+                int(timestamp[12:]),
+            )
+        else:
+            date = timestamp_to_datetime(timestamp, end=end)
+    return (date - EPOCH) // timedelta(seconds=1)
+
+
+class SnapshotTimeline:
+    """
+    Sorted in-memory index of snapshots.
+
+    The times of the snapshots are kept in a sorted array of integers (the
+    seconds since the UNIX epoch) and the CDX fields in parallel lists, one
+    per field. The lookups return CDXSnapshot objects created on demand.
+
+    Build it with from_cdx() to be able to refresh() it, only the captures
+    newer than the last snapshot of the timeline are then requested.
+    """
+
+    def __init__(
+        self,
+        snapshots: Iterable[CDXSnapshot] = (),
+        fields: Optional[Sequence[str]] = None,
+        cdx_api: Optional["WaybackMachineCDXServerAPI"] = None,
+    ) -> None:
+        self.fields = tuple(fields or CDX_FIELDS)
+        if "timestamp" not in self.fields:
+            raise ValueError("SnapshotTimeline needs the timestamp field.")
+
+        self.cdx_api = cdx_api
+        self.seconds: "array[int]" = array("q")
+        self.columns: Dict[str, List[str]] = {field: [] for field in self.fields}
+        self.extend(snapshots)
+
+    def __len__(self) -> int:
+        return len(self.seconds)
+
+    def __repr__(self) -> str:
+        return f"<SnapshotTimeline of {len(self)} snapshots>"
+
+    @classmethod
+    def from_cdx(cls, cdx_api: "WaybackMachineCDXServerAPI") -> "SnapshotTimeline":
+        """
+        Builds the timeline from the snapshots of the CDX server API query.
+        """
+        return cls(cdx_api.snapshots(), fields=cdx_api.fields, cdx_api=cdx_api)
+
+    def extend(self, snapshots: Iterable[CDXSnapshot]) -> None:
+        """
+        Adds the snapshots to the timeline, the timeline stays sorted. Adding
+        snapshots newer than the last one is the cheap case.
+        """
+        new_seconds: "array[int]" = array("q")
+        new_columns: Dict[str, List[str]] = {field: [] for field in self.fields}
+        for snapshot in snapshots:
+            new_seconds.append(to_seconds(snapshot.timestamp))
+            for field in self.fields:
+                new_columns[field].append(getattr(snapshot, field))
+
+        if not new_seconds:
+            return
+
+        size = len(self.seconds)
+        order = sorted(range(len(new_seconds)), key=new_seconds.__getitem__)
+        self.seconds.extend(new_seconds[i] for i in order)
+        for field in self.fields:
+            column = new_columns[field]
+            self.columns[field].extend(column[i] for i in order)
+
+        if size and new_seconds[order[0]] < self.seconds[size - 1]:
+            # Some of the snapshots are older than the timeline, sort again.
+            order = sorted(range(len(self.seconds)), key=self.seconds.__getitem__)
+            self.seconds = array("q", (self.seconds[i] for i in order))
+            for field in self.fields:
+                column = self.columns[field]
+                self.columns[field] = [column[i] for i in order]
+
+    def refresh(self) -> int:
+        """
+        Requests the captures newer than the last snapshot of the timeline
+        and adds them, returns the number of added snapshots.
+
+        Only timelines built with from_cdx() can be refreshed.
+        """
+        if self.cdx_api is None:
+            raise ValueError("Only timelines built with from_cdx() can be refreshed.")
+
+        cdx_api = copy.copy(self.cdx_api)
+        cdx_api.checkpoint = None
+        if self.seconds:
+            newest = EPOCH + timedelta(seconds=self.seconds[-1] + 1)
+            cdx_api.start_timestamp = datetime_to_timestamp(newest)
+
+        size = len(self)
+        self.extend(cdx_api.snapshots())
+        return len(self) - size
+
+    def snapshot(self, index: int) -> CDXSnapshot:
+        """
+        Returns the snapshot at the index of the timeline.
+        """
+        line = " ".join(self.columns[field][index] for field in self.fields)
+        return CDXSnapshot.from_line(line, self.fields)
+
+    def check_not_empty(self) -> None:
+        """
+        Raises NoCDXRecordFound if the timeline is empty.
+        """
+        if not self.seconds:
+            raise NoCDXRecordFound("The timeline does not have any snapshots.")
+
+    def near_index(self, seconds: int) -> int:
+        """
+        Returns the index of the snapshot closest to the time in seconds,
+        the older snapshot wins a tie.
+        """
+        index = bisect_left(self.seconds, seconds)
+        if index == len(self.seconds):
+            return index - 1
+        if index > 0 and seconds - self.seconds[index - 1] <= (
+            self.seconds[index] - seconds
+        ):
+            return index - 1
+        return index
+
+    def near(self, timestamp: TimelineTimestamp) -> CDXSnapshot:
+        """
+        Returns the snapshot closest to the timestamp.
+        """
+        self.check_not_empty()
+        return self.snapshot(self.near_index(to_seconds(timestamp)))
+
+    def before(self, timestamp: TimelineTimestamp) -> CDXSnapshot:
+        """
+        Returns the newest snapshot older than the timestamp.
+        """
+        index = bisect_left(self.seconds, to_seconds(timestamp)) - 1
+        if index < 0:
+            raise NoCDXRecordFound("No snapshot before the timestamp in the timeline.")
+        return self.snapshot(index)
+
+    def after(self, timestamp: TimelineTimestamp) -> CDXSnapshot:
+        """
+        Returns the oldest snapshot newer than the timestamp.
+        """
+        index = bisect_right(self.seconds, to_seconds(timestamp))
+        if index == len(self.seconds):
+            raise NoCDXRecordFound("No snapshot after the timestamp in the timeline.")
+        return self.snapshot(index)
+
+    def between(
+        self, start: TimelineTimestamp, end: TimelineTimestamp
+    ) -> Generator[CDXSnapshot, None, None]:
+        """
+        Yields the snapshots from start to end, both included, oldest first.
+        A partial end timestamp includes all of its period, 2010 is up to
+        2010-12-31 23:59:59.
+        """
+        first = bisect_left(self.seconds, to_seconds(start))
+        last = bisect_right(self.seconds, to_seconds(end, end=True))
+        for index in range(first, last):
+            yield self.snapshot(index)
+
+    def near_many(self, timestamps: Iterable[TimelineTimestamp]) -> List[CDXSnapshot]:
+        """
+        Returns the snapshot closest to each of the timestamps, the lookups
+        are vectorised with NumPy if it is installed.
+        """
+        self.check_not_empty()
+        targets = [to_seconds(timestamp) for timestamp in timestamps]
+
+        if numpy is None:
+            indices: Iterable[int] = [self.near_index(target) for target in targets]
+        else:
+            seconds = numpy.frombuffer(self.seconds, dtype=numpy.int64)
+            wanted = numpy.array(targets, dtype=numpy.int64)
+            right = numpy.searchsorted(seconds, wanted).clip(0, len(seconds) - 1)
+            left = (right - 1).clip(0, len(seconds) - 1)
+            use_left = numpy.abs(wanted - seconds[left]) <= numpy.abs(
+                seconds[right] - wanted
+            )
+            indices = numpy.where(use_left, left, right).tolist()
+
+        return [self.snapshot(index) for index in indices]
@@ -6,28 +6,57 @@ long.
 """
 
 import re
-from typing import Any, Dict, List, Optional, Union
+import zlib
+from typing import Any, Dict, Generator, Iterable, List, Optional, Tuple, Union
 from urllib.parse import quote
 
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
-from .exceptions import BlockedSiteError, WaybackError
+from .cdx_snapshot import CDX_FIELDS
+from .exceptions import BlockedSiteError, TooManyRequestsError, WaybackError
+from .transport import Transport, get_default_transport
 from .utils import DEFAULT_USER_AGENT
 
+BLOCKED_SITE_ERROR = (
+    "org.archive.util.io.RuntimeIOException: "
+    + "org.archive.wayback.exception.AdministrativeAccessControlException: "
+    + "Blocked Site Error"
+)
 
-def get_total_pages(url: str, user_agent: str = DEFAULT_USER_AGENT) -> int:
+GZIP_MAGIC_NUMBER = b"\x1f\x8b"
+# zlib wbits for decompressing gzip streams (header and trailer included).
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+# Bytes at the end of a page kept by count_response_lines() for finding the
+# resume key, far longer than any resume key.
+RESUME_KEY_MAX_SIZE = 65536
+
+
+def get_total_pages(
+    url: str,
+    user_agent: str = DEFAULT_USER_AGENT,
+    transport: Optional[Transport] = None,
+    payload: Optional[Dict[str, str]] = None,
+) -> int:
     """
     When using the pagination use adding showNumPages=true to the request
     URL makes the CDX server return an integer which is the number of pages
     of CDX pages available for us to query using the pagination API.
+
+    payload is the payload of the query, the number of pages depends on
+    matchType, from, to and pageSize so the full payload should be passed.
     """
     endpoint = "https://web.archive.org/cdx/search/cdx?"
-    payload = {"showNumPages": "true", "url": str(url)}
+    payload = {} if payload is None else dict(payload)
+    # The page count is a single integer, compressing it is a waste and the
+    # page parameter must not be sent with showNumPages.
+    for key in ("gzip", "page", "showPagedIndex"):
+        payload.pop(key, None)
+    payload["showNumPages"] = "true"
+    payload["url"] = str(url)
     headers = {"User-Agent": user_agent}
     request_url = full_url(endpoint, params=payload)
-    response = get_response(request_url, headers=headers)
+    response = get_response(request_url, headers=headers, transport=transport)
     check_for_blocked_site(response, url)
     if isinstance(response, requests.Response):
         return int(response.text.strip())
@@ -49,17 +78,30 @@ def check_for_blocked_site(
 
     if not url:
         url = "The requested content"
-    if (
-        "org.archive.util.io.RuntimeIOException: "
-        + "org.archive.wayback.exception.AdministrativeAccessControlException: "
-        + "Blocked Site Error"
-        in response.text.strip()
-    ):
+    if BLOCKED_SITE_ERROR in response.text.strip():
         raise BlockedSiteError(
             f"{url} is excluded from Wayback Machine by the site's robots.txt policy."
         )
 
 
+def check_page_status(response: requests.Response, url: str) -> None:
+    """
+    Checks the status of a CDX server page before its lines are read.
+
+    Raises TooManyRequestsError if the server answered with 429 and
+    WaybackError for the other error statuses.
+    """
+    if response.status_code == 429:
+        raise TooManyRequestsError(
+            "CDX server request refused, too many requests.\n" f"Request URL:\n{url}"
+        )
+    if not response.ok:
+        raise WaybackError(
+            f"CDX server returned the status {response.status_code}.\n"
+            f"Request URL:\n{url}"
+        )
+
+
 def full_url(endpoint: str, params: Dict[str, Any]) -> str:
     """
     As the function's name already implies that it returns
@@ -85,27 +127,205 @@ def full_url(endpoint: str, params: Dict[str, Any]) -> str:
 def get_response(
     url: str,
     headers: Optional[Dict[str, str]] = None,
-    retries: int = 5,
-    backoff_factor: float = 0.5,
+    retries: Optional[int] = None,
+    backoff_factor: Optional[float] = None,
+    transport: Optional[Transport] = None,
+    stream: bool = False,
 ) -> Union[requests.Response, Exception]:
     """
     Makes get request to the CDX server and returns the response.
-    """
-    session = requests.Session()
 
-    retries_ = Retry(
-        total=retries,
-        backoff_factor=backoff_factor,
-        status_forcelist=[500, 502, 503, 504],
-    )
+    The request is sent using the transport, if no transport is passed the
+    shared default transport is used. Passing retries or backoff_factor
+    without a transport makes a short-lived transport with those settings
+    for this request only.
 
-    session.mount("https://", HTTPAdapter(max_retries=retries_))
-    response = session.get(url, headers=headers)
-    session.close()
-    check_for_blocked_site(response)
+    If stream is True the body is not downloaded, read it with
+    iter_response_lines(). The blocked site check then only reads the body
+    of error responses, iter_response_lines() checks the successful ones.
+    """
+    if transport is None and retries is None and backoff_factor is None:
+        transport = get_default_transport()
+
+    if transport is None:
+        with Transport(
+            retries=5 if retries is None else retries,
+            backoff_factor=0.5 if backoff_factor is None else backoff_factor,
+        ) as one_off_transport:
+            response = one_off_transport.get(url, headers=headers, stream=stream)
+    else:
+        response = transport.get(url, headers=headers, stream=stream)
+
+    if not stream or not response.ok:
+        check_for_blocked_site(response)
     return response
 
 
+def iter_response_chunks(
+    response: requests.Response, chunk_size: int = 65536
+) -> Generator[bytes, None, None]:
+    """
+    Yields the decompressed body of a streamed response chunk by chunk.
+
+    A body sent with Content-Encoding: gzip is decompressed by urllib3, but
+    the CDX server may also send the gzip stream as the body itself, such a
+    body is recognized by the gzip magic number and decompressed here as it
+    is read. Concatenated gzip members are supported.
+    """
+    chunks = response.iter_content(chunk_size=chunk_size)
+    decompressor = None
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+
+        if decompressor is None:
+            if not chunk.startswith(GZIP_MAGIC_NUMBER):
+                yield chunk
+                yield from chunks
+                return
+            decompressor = zlib.decompressobj(GZIP_WBITS)
+
+        while chunk:
+            yield decompressor.decompress(chunk)
+            chunk = decompressor.unused_data
+            if decompressor.eof:
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+
+    if decompressor is not None:
+        yield decompressor.flush()
+
+
+def iter_response_lines(
+    response: requests.Response, chunk_size: int = 65536
+) -> Generator[str, None, None]:
+    """
+    Yields the lines of a streamed response one by one without the line
+    endings, at most one chunk and one line of the body are kept in memory.
+    Compressed bodies are decompressed incrementally.
+
+    Raises BlockedSiteError if the body is the blocked site error of the
+    Wayback Machine.
+    """
+    pending = b""
+    first_line = True
+
+    for chunk in iter_response_chunks(response, chunk_size=chunk_size):
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+
+        for line in lines:
+            text = line.decode("utf-8", errors="replace").rstrip("\r")
+
+            if first_line and BLOCKED_SITE_ERROR in text:
+                raise BlockedSiteError(
+                    "The requested content is excluded from Wayback Machine "
+                    "by the site's robots.txt policy."
+                )
+            first_line = False
+
+            yield text
+
+    if pending:
+        yield pending.decode("utf-8", errors="replace").rstrip("\r")
+
+
+def count_response_lines(
+    response: requests.Response, chunk_size: int = 65536
+) -> Tuple[int, Optional[str]]:
+    """
+    Counts the CDX lines of a streamed response without decoding them and
+    returns the count and the resume key of the page, None if the page has
+    no resume key (see split_resume_key()).
+
+    Only the newlines of the body are counted, the end of the body is kept
+    for finding the resume key.
+
+    Raises BlockedSiteError if the body is the blocked site error of the
+    Wayback Machine.
+    """
+    newlines = 0
+    tail = b""
+    first_chunk = True
+
+    for chunk in iter_response_chunks(response, chunk_size=chunk_size):
+        if not chunk:
+            continue
+
+        if first_chunk and BLOCKED_SITE_ERROR.encode() in chunk:
+            raise BlockedSiteError(
+                "The requested content is excluded from Wayback Machine "
+                "by the site's robots.txt policy."
+            )
+        first_chunk = False
+
+        newlines += chunk.count(b"\n")
+        tail = (tail + chunk)[-RESUME_KEY_MAX_SIZE:]
+
+    if not tail.strip():
+        return 0, None
+
+    # Every line before the last non-blank line ends with a newline, the
+    # newlines after it are the end of the body.
+    body_end = tail.rstrip(b"\r\n")
+    total_lines = newlines - tail.count(b"\n", len(body_end)) + 1
+
+    lines = body_end.rsplit(b"\n", 2)
+    if len(lines) >= 3 and not lines[-2].strip():
+        # A blank line and the resume key, the last two lines of the page.
+        return total_lines - 2, lines[-1].decode("utf-8", errors="replace").strip()
+
+    return total_lines, None
+
+
+def non_blank_lines(lines: Iterable[str]) -> Generator[str, None, int]:
+    """
+    Yields the non-blank lines and returns the number of non-blank lines.
+    """
+    total_lines = 0
+    for line in lines:
+        if line:
+            total_lines += 1
+            yield line
+    return total_lines
+
+
+def split_resume_key(lines: Iterable[str]) -> Generator[str, None, Optional[str]]:
+    """
+    Yields the non-blank CDX lines of a page and returns the resume key of
+    the page, None if the page has no resume key.
+
+    With showResumeKey=true the CDX server appends a blank line and then the
+    resume key to the page if more records are available, as the page is
+    streamed the line after a blank line is held back until we know if it is
+    the last line of the page.
+    """
+    total_lines = 0
+    after_blank_line = False
+    resume_key: Optional[str] = None
+
+    for line in lines:
+        if not line.strip():
+            after_blank_line = True
+            continue
+
+        # The held back line was not the last line, so not a resume key.
+        if resume_key is not None:
+            yield resume_key
+            total_lines += 1
+            resume_key = None
+
+        if after_blank_line and total_lines > 0:
+            resume_key = line.strip()
+        else:
+            yield line
+            total_lines += 1
+
+        after_blank_line = False
+
+    return resume_key
+
+
 def check_filters(filters: List[str]) -> None:
     """
     Check that the filter arguments passed by the end-user are valid.
@@ -155,6 +375,26 @@ def check_collapses(collapses: List[str]) -> bool:
     return True
 
 
+def check_fields(fields: List[str]) -> bool:
+    """
+    Check that the fields argument passed by the end-user is valid.
+    If not valid then raise WaybackError.
+    """
+    if not isinstance(fields, list):
+        raise WaybackError("fields must be a list.")
+
+    for field in fields:
+        if field not in CDX_FIELDS:
+            exc_message = (
+                f"{field} is not a CDX field.\n"
+                "Use one from 'urlkey', 'timestamp', 'original', 'mimetype', "
+                "'statuscode', 'digest' or 'length'"
+            )
+            raise WaybackError(exc_message)
+
+    return True
+
+
 def check_match_type(match_type: Optional[str], url: str) -> bool:
     """
     Check that the match_type argument passed by the end-user is valid.
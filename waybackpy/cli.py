@@ -2,18 +2,40 @@
 Module responsible for enabling waybackpy to function as a CLI tool.
 """
 
+import csv
+import gzip
+import io
+import json
 import os
 import random
 import re
 import string
-from typing import Any, Dict, Generator, List, Optional
+import sys
+from contextlib import contextmanager
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
 
 import click
 import requests
 
 from . import __version__
+from .bulk_availability import lookup_many
+from .bulk_save import save_many
 from .cdx_api import WaybackMachineCDXServerAPI
-from .exceptions import BlockedSiteError, NoCDXRecordFound
+from .cdx_snapshot import CDX_FIELDS
+from .exceptions import BlockedSiteError, NoCDXRecordFound, WaybackError
 from .save_api import WaybackMachineSaveAPI
 from .utils import DEFAULT_USER_AGENT
 from .wrapper import Url
@@ -29,8 +51,10 @@ def handle_cdx_closest_derivative_methods(
     """
     Handles the closest parameter derivative methods.
 
-    near, newest and oldest use the closest parameter with active
-    closest based sorting.
+    near uses the closest parameter with active closest based sorting,
+    newest and oldest request the last and the first record of the URL and
+    only fall back to the closest based sorting if the CDX server does not
+    support those requests.
     """
     try:
         if near:
@@ -50,9 +74,186 @@ def handle_cdx_closest_derivative_methods(
         click.echo(click.style("BlockedSiteError: ", fg="red") + str(exc), err=True)
 
 
+# Names accepted by --cdx-print and the CDX field or column they print.
+CDX_PRINT_ALIASES: Dict[str, str] = {
+    "urlkey": "urlkey",
+    "url-key": "urlkey",
+    "url_key": "urlkey",
+    "timestamp": "timestamp",
+    "time-stamp": "timestamp",
+    "time_stamp": "timestamp",
+    "original": "original",
+    "mimetype": "mimetype",
+    "mime-type": "mimetype",
+    "mime_type": "mimetype",
+    "statuscode": "statuscode",
+    "status-code": "statuscode",
+    "status_code": "statuscode",
+    "digest": "digest",
+    "length": "length",
+    "archiveurl": "archive_url",
+    "archive-url": "archive_url",
+    "archive_url": "archive_url",
+}
+
+# Order of the printed columns, independent of the order of --cdx-print.
+CDX_PRINT_ORDER = CDX_FIELDS + ("archive_url",)
+
+OUTPUT_FORMATS = ["text", "jsonl", "csv", "tsv"]
+
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+
+
+def compile_cdx_print(
+    cdx_print: List[str],
+) -> Tuple[List[str], List[str], Callable[[str], Optional[List[str]]]]:
+    """
+    Compiles the --cdx-print names once for the whole output.
+
+    Returns the printed columns, the fields requested from the CDX server
+    (empty for all the fields) and the function that converts a CDX line to
+    the list of column values. Like parse_entry() of the CDX API the
+    function returns None for the lines to skip and raises WaybackError for
+    the lines that do not have the requested fields.
+    """
+    selected = {
+        CDX_PRINT_ALIASES[name] for name in cdx_print if name in CDX_PRINT_ALIASES
+    }
+    if not selected:
+        columns = list(CDX_FIELDS)
+        fields: List[str] = []
+    else:
+        columns = [column for column in CDX_PRINT_ORDER if column in selected]
+        needed = set(columns)
+        if "archive_url" in needed:
+            needed.update(("timestamp", "original"))
+        fields = [field for field in CDX_FIELDS if field in needed]
+
+    line_fields = fields or list(CDX_FIELDS)
+    total_fields = len(line_fields)
+    indices = [
+        line_fields.index(column) for column in columns if column != "archive_url"
+    ]
+    archive_url_position = (
+        columns.index("archive_url") if "archive_url" in columns else None
+    )
+    timestamp_index = (
+        line_fields.index("timestamp") if "timestamp" in line_fields else 0
+    )
+    original_index = line_fields.index("original") if "original" in line_fields else 0
+
+    def to_row(line: str) -> Optional[List[str]]:
+        if not line.strip() or (not fields and len(line) < 46):
+            return None
+
+        values = line.split(" ")
+        if len(values) != total_fields:
+            raise WaybackError(
+                f"Snapshot returned by CDX API has {len(values)} properties "
+                f"instead of expected {total_fields} properties.\n"
+                f"Problematic Snapshot: {line}"
+            )
+
+        row = [values[index] for index in indices]
+        if archive_url_position is not None:
+            row.insert(
+                archive_url_position,
+                f"https://web.archive.org/web/{values[timestamp_index]}"
+                f"/{values[original_index]}",
+            )
+        return row
+
+    return columns, fields, to_row
+
+
+@contextmanager
+def open_output(
+    output_file: Optional[str] = None, compress: bool = False
+) -> Iterator[TextIO]:
+    """
+    Opens the block-buffered text stream the CLI writes its output to,
+    output_file or the standard output. The output is gzip compressed if
+    compress is True or if output_file ends with '.gz'.
+    """
+    if output_file:
+        if compress or output_file.endswith(".gz"):
+            with gzip.open(output_file, "wt", encoding="utf-8", newline="") as file:
+                yield file
+        else:
+            with open(
+                output_file,
+                "w",
+                encoding="utf-8",
+                newline="",
+                buffering=OUTPUT_BUFFER_SIZE,
+            ) as file:
+                yield file
+        return
+
+    try:
+        stdout = sys.stdout.buffer
+    except AttributeError:
+        # A text-only standard output, like the console of some IDEs, is
+        # written to as is, it can not take the compressed output.
+        if compress:
+            raise click.ClickException(
+                "The standard output does not accept binary data, use "
+                "--output-file to write the compressed output."
+            ) from None
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+
+    binary: Union[BinaryIO, gzip.GzipFile] = (
+        gzip.GzipFile(fileobj=stdout, mode="wb") if compress else stdout
+    )
+    text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+    try:
+        yield text
+    finally:
+        text.flush()
+        # Detach so that closing the wrapper does not close the stdout.
+        text.detach()
+        if compress:
+            binary.close()
+        stdout.flush()
+
+
+def write_rows(
+    out: TextIO,
+    rows: Iterable[List[str]],
+    columns: List[str],
+    output_format: str = "text",
+) -> None:
+    """
+    Writes the rows in the output format: text (space separated columns),
+    jsonl (a JSON object per row), csv or tsv (both with a header row).
+    """
+    if output_format == "jsonl":
+        for row in rows:
+            out.write(json.dumps(dict(zip(columns, row))))
+            out.write("\n")
+    elif output_format in ("csv", "tsv"):
+        writer = csv.writer(
+            out,
+            delimiter="," if output_format == "csv" else "\t",
+            lineterminator="\n",
+        )
+        writer.writerow(columns)
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            out.write(" ".join(row))
+            out.write("\n")
+
+
 def handle_cdx(data: List[Any]) -> None:
     """
     Handles the CDX CLI options and output format.
+
+    The fields selected with --cdx-print are requested from the CDX server
+    as a field projection and the lines are written without creating the
+    snapshots.
     """
     url = data[0]
     user_agent = data[1]
@@ -62,16 +263,21 @@ def handle_cdx(data: List[Any]) -> None:
     collapse = data[5]
     cdx_print = data[6]
     limit = data[7]
-    gzip = data[8]
+    cdx_gzip = data[8]
     match_type = data[9]
     sort = data[10]
     use_pagination = data[11]
     closest = data[12]
+    output_format = data[13] if len(data) > 13 else "text"
+    output_file = data[14] if len(data) > 14 else None
+    output_gzip = data[15] if len(data) > 15 else False
 
     filters = list(cdx_filter)
     collapses = list(collapse)
     cdx_print = list(cdx_print)
 
+    columns, fields, to_row = compile_cdx_print(cdx_print)
+
     cdx_api = WaybackMachineCDXServerAPI(
         url,
         user_agent=user_agent,
@@ -82,48 +288,34 @@ def handle_cdx(data: List[Any]) -> None:
         match_type=match_type,
         sort=sort,
         use_pagination=use_pagination,
-        gzip=gzip,
+        gzip=cdx_gzip,
         collapses=collapses,
         limit=limit,
+        fields=fields,
     )
 
-    snapshots = cdx_api.snapshots()
-
-    for snapshot in snapshots:
-        if len(cdx_print) == 0:
-            click.echo(snapshot)
-        else:
-            output_string = []
-            if any(val in cdx_print for val in ["urlkey", "url-key", "url_key"]):
-                output_string.append(snapshot.urlkey)
-            if any(
-                val in cdx_print for val in ["timestamp", "time-stamp", "time_stamp"]
-            ):
-                output_string.append(snapshot.timestamp)
-            if "original" in cdx_print:
-                output_string.append(snapshot.original)
-            if any(val in cdx_print for val in ["mimetype", "mime-type", "mime_type"]):
-                output_string.append(snapshot.mimetype)
-            if any(
-                val in cdx_print for val in ["statuscode", "status-code", "status_code"]
-            ):
-                output_string.append(snapshot.statuscode)
-            if "digest" in cdx_print:
-                output_string.append(snapshot.digest)
-            if "length" in cdx_print:
-                output_string.append(snapshot.length)
-            if any(
-                val in cdx_print for val in ["archiveurl", "archive-url", "archive_url"]
-            ):
-                output_string.append(snapshot.archive_url)
-
-            click.echo(" ".join(output_string))
+    with open_output(output_file, output_gzip) as out:
+        if output_format == "text" and not cdx_print:
+            # The plain text response of the CDX server.
+            for line in cdx_api.raw_lines():
+                if len(line) >= 46:
+                    out.write(line)
+                    out.write("\n")
+            return
+
+        rows = (to_row(line) for line in cdx_api.raw_lines())
+        write_rows(
+            out, (row for row in rows if row is not None), columns, output_format
+        )
 
 
 def save_urls_on_file(url_gen: Generator[str, None, None]) -> None:
     """
     Save output of CDX API on file.
     Mainly here because of backwards compatibility.
+
+    The file is opened once and the file and the standard output are block
+    buffered.
     """
     domain = None
     sys_random = random.SystemRandom()
@@ -132,27 +324,31 @@ def save_urls_on_file(url_gen: Generator[str, None, None]) -> None:
     )
     url_count = 0
     file_name = None
+    file: Optional[TextIO] = None
 
-    for url in url_gen:
-        url_count += 1
-        if not domain:
-            match = re.search("https?://([A-Za-z_0-9.-]+).*", url)
-
-            domain = "domain-unknown"
+    try:
+        with open_output() as out:
+            for url in url_gen:
+                url_count += 1
+                if file is None:
+                    match = re.search("https?://([A-Za-z_0-9.-]+).*", url)
 
-            if match:
-                domain = match.group(1)
+                    domain = "domain-unknown"
 
-            file_name = f"{domain}-urls-{uid}.txt"
-            file_path = os.path.join(os.getcwd(), file_name)
-            if not os.path.isfile(file_path):
-                with open(file_path, "w+", encoding="utf-8") as file:
-                    file.close()
+                    if match:
+                        domain = match.group(1)
 
-        with open(file_path, "a", encoding="utf-8") as file:
-            file.write(f"{url}\n")
+                    file_name = f"{domain}-urls-{uid}.txt"
+                    file_path = os.path.join(os.getcwd(), file_name)
+                    file = open(  # pylint: disable=consider-using-with
+                        file_path, "a", encoding="utf-8", buffering=OUTPUT_BUFFER_SIZE
+                    )
 
-        click.echo(url)
+                file.write(f"{url}\n")
+                out.write(f"{url}\n")
+    finally:
+        if file is not None:
+            file.close()
 
     if url_count > 0:
         click.echo(
@@ -163,6 +359,93 @@ def save_urls_on_file(url_gen: Generator[str, None, None]) -> None:
         click.echo("No known URLs found. Please try a diffrent input!")
 
 
+def read_urls(input_file: str) -> Generator[str, None, None]:
+    """
+    Yields the URLs of the input file, one URL per line. The blank lines and
+    the lines starting with '#' are skipped.
+    """
+    with open(input_file, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def handle_save_many(
+    input_file: str,
+    user_agent: str,
+    max_workers: int,
+    min_interval: Optional[float] = None,
+) -> None:
+    """
+    Saves the URLs of the input file concurrently and prints the URL, the
+    archive URL and the cached save flag of every URL as its save completes.
+    The errors are printed on the standard error.
+    """
+    saved = 0
+    failed = 0
+    for result in save_many(
+        read_urls(input_file),
+        max_workers=max_workers,
+        user_agent=user_agent,
+        min_interval=min_interval,
+    ):
+        if result.ok:
+            saved += 1
+            click.echo(f"{result.url}\t{result.archive_url}\t{result.cached_save}")
+        else:
+            failed += 1
+            click.echo(
+                click.style(f"{type(result.error).__name__}: ", fg="red")
+                + f"{result.url}: {result.error}",
+                err=True,
+            )
+
+    click.echo(f"\n{saved} URLs saved, {failed} failed.", err=True)
+
+
+def handle_lookup_many(
+    input_file: str,
+    user_agent: str,
+    max_workers: int,
+    timestamp: Optional[str] = None,
+) -> None:
+    """
+    Looks up the URLs of the input file with the availability API and prints
+    the URL, the archive URL and the timestamp of the closest snapshot of
+    every URL, or "not archived". The errors are printed on the standard
+    error.
+    """
+    archived = 0
+    not_archived = 0
+    failed = 0
+    with open_output() as out:
+        for result in lookup_many(
+            read_urls(input_file),
+            timestamp=timestamp,
+            max_workers=max_workers,
+            user_agent=user_agent,
+        ):
+            if result.error is not None:
+                failed += 1
+                click.echo(
+                    click.style(f"{type(result.error).__name__}: ", fg="red")
+                    + f"{result.url}: {result.error}",
+                    err=True,
+                )
+            elif result.archived:
+                archived += 1
+                out.write(f"{result.url}\t{result.archive_url}\t{result.timestamp}\n")
+            else:
+                not_archived += 1
+                out.write(f"{result.url}\tnot archived\n")
+
+    click.echo(
+        f"\n{archived} URLs archived, {not_archived} not archived, {failed} failed.",
+        err=True,
+    )
+
+
 @click.command()
 @click.option(
     "-u", "--url", help="URL on which Wayback machine operations are to be performed."
@@ -308,8 +591,9 @@ def save_urls_on_file(url_gen: Generator[str, None, None]) -> None:
 @click.option(
     "-gz",
     "--gzip",
-    help="To disable gzip compression pass false as argument to this parameter. "
-    + "The default behavior is gzip compression enabled.",
+    help="Gzip compression of the CDX server responses is opt-in, pass true as "
+    + "argument to this parameter to enable it. Any value other than 'true' "
+    + "disables it, compression is disabled by default.",
 )
 @click.option(
     "-c",
@@ -332,6 +616,62 @@ def save_urls_on_file(url_gen: Generator[str, None, None]) -> None:
     + "if this parameter is not used then the plain text response of the CDX API "
     + "will be printed.",
 )
+@click.option(
+    "-of",
+    "--output-format",
+    "--output_format",
+    type=click.Choice(OUTPUT_FORMATS),
+    default="text",
+    help="Output format of '--cdx', text (default), jsonl, csv or tsv.",
+)
+@click.option(
+    "-O",
+    "--output-file",
+    "--output_file",
+    help="Write the output of '--cdx' to this file instead of the standard "
+    + "output, the file is gzip compressed if its name ends with '.gz'.",
+)
+@click.option(
+    "-zo",
+    "--output-gzip",
+    "--output_gzip",
+    default=False,
+    is_flag=True,
+    help="Gzip compress the output of '--cdx'.",
+)
+@click.option(
+    "-if",
+    "--input-file",
+    "--input_file",
+    help="Use with '--save' to save the URLs of this file, one URL per line, "
+    + "or with '--availability' to look them up.",
+)
+@click.option(
+    "-w",
+    "--max-workers",
+    "--max_workers",
+    type=click.IntRange(1, 20),
+    default=3,
+    help="Use with '--input-file', number of concurrent saves or availability "
+    + "requests, default is 3.",
+)
+@click.option(
+    "-mi",
+    "--min-interval",
+    "--min_interval",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Use with '--save', do not save the URLs captured less than this "
+    + "number of seconds ago, print their recent archive URL instead.",
+)
+@click.option(
+    "-av",
+    "--availability",
+    default=False,
+    is_flag=True,
+    help="Use with '--input-file' to look up the URLs of the file with the "
+    + "availability API, the closest snapshots to the date given with '--year', "
+    + "'--month', '--day', '--hour' and '--minute' or else the newest.",
+)
 def main(  # pylint: disable=no-value-for-parameter
     user_agent: str,
     version: bool,
@@ -362,6 +702,13 @@ def main(  # pylint: disable=no-value-for-parameter
     sort: Optional[str] = None,
     gzip: Optional[str] = None,
     limit: Optional[str] = None,
+    output_format: str = "text",
+    output_file: Optional[str] = None,
+    output_gzip: bool = False,
+    input_file: Optional[str] = None,
+    max_workers: int = 3,
+    min_interval: Optional[float] = None,
+    availability: bool = False,
 ) -> None:
     """\b
                          _                _
@@ -393,6 +740,18 @@ def main(  # pylint: disable=no-value-for-parameter
                 url="https://raw.githubusercontent.com/akamhy/waybackpy/master/LICENSE"
             ).text
         )
+    elif save and input_file:
+        handle_save_many(input_file, user_agent, max_workers, min_interval)
+
+    elif availability and input_file:
+        # A partial timestamp, up to the first unset part of the date.
+        timestamp = ""
+        for part in [year, month, day, hour, minute]:
+            if part is None:
+                break
+            timestamp += str(part).zfill(2)
+        handle_lookup_many(input_file, user_agent, max_workers, timestamp or None)
+
     elif url is None:
         click.echo(
             click.style("NoURLDetected: ", fg="red")
@@ -422,8 +781,11 @@ def main(  # pylint: disable=no-value-for-parameter
         )
 
     elif save:
-        save_api = WaybackMachineSaveAPI(url, user_agent=user_agent)
+        save_api = WaybackMachineSaveAPI(
+            url, user_agent=user_agent, min_interval=min_interval
+        )
         save_api.save()
+        save_api.close()
         click.echo("Archive URL:")
         click.echo(save_api.archive_url)
         click.echo("Cached save:")
@@ -439,8 +801,9 @@ def main(  # pylint: disable=no-value-for-parameter
         if file:
             save_urls_on_file(url_gen)
         else:
-            for url_ in url_gen:
-                click.echo(url_)
+            with open_output() as out:
+                for url_ in url_gen:
+                    out.write(f"{url_}\n")
 
     elif cdx:
         data = [
@@ -457,6 +820,9 @@ def main(  # pylint: disable=no-value-for-parameter
             sort,
             use_pagination,
             closest,
+            output_format,
+            output_file,
+            output_gzip,
         ]
         handle_cdx(data)
 
@@ -0,0 +1,260 @@
+"""
+This module contains the token-bucket rate limiter shared by the API classes
+of waybackpy.
+
+Every Transport consults a RateLimiter before sending a request to the
+Wayback Machine. The limiter has one token bucket per endpoint (the
+SavePageNow API, the availability API and the CDX server API) and a request
+takes a token from the bucket of its endpoint, waiting for the bucket to
+refill if it is empty. All the threads of a process share the buckets of
+the process-wide limiter returned by get_default_rate_limiter().
+
+Worker processes on the same host share a budget with file buckets, the
+state of every bucket is kept in a file locked while a token is taken:
+
+>>> limiter = RateLimiter(directory="/tmp/waybackpy-buckets")
+>>> transport = Transport(rate_limiter=limiter)
+
+The CDX server API is not limited by default, the concurrent pages and
+shards of WaybackMachineCDXServerAPI would else be throttled to the budget.
+Pass a "cdx" budget to limit it.
+
+Only the requests sent by Transport.request() take a token, the retries made
+by the urllib3 Retry of the transport after a failed request do not.
+"""
+
+import json
+import os
+import threading
+import time
+import warnings
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .utils import optional_import
+
+fcntl: Any = optional_import("fcntl")
+
+# Requests per minute and burst size of the endpoints of the Wayback Machine,
+# None for the endpoints that are not limited.
+DEFAULT_BUDGETS: Dict[str, Optional[Tuple[float, float]]] = {
+    "save": (15, 1),
+    "save_status": (60, 5),
+    "availability": (60, 5),
+    "cdx": None,
+}
+
+
+def endpoint_of(url: str) -> Optional[str]:
+    """
+    Returns the endpoint of the Wayback Machine URL, "save", "save_status"
+    (the job status of the SPN2 API), "availability" or "cdx". None if the
+    URL is not an API endpoint of the Wayback Machine, such requests are not
+    limited.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    if host != "archive.org" and not host.endswith(".archive.org"):
+        return None
+    if parts.path.startswith("/save/status"):
+        return "save_status"
+    if parts.path.startswith("/save"):
+        return "save"
+    if parts.path.startswith("/wayback/available"):
+        return "availability"
+    if parts.path.startswith("/cdx/"):
+        return "cdx"
+    return None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket of a process.
+
+    rate: Tokens added to the bucket per second.
+
+    capacity: Maximum number of tokens in the bucket, the size of the bursts
+              allowed after the bucket was idle.
+
+    A token taken from an empty bucket is reserved: the balance goes below
+    zero and the caller waits until its token is refilled, so the waiting
+    callers are served in order and never exceed the rate together.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1) -> None:
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate should be positive and capacity at least 1")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def reserve(
+        tokens: float,
+        updated_at: float,
+        now: float,
+        rate: float,
+        capacity: float,
+        count: float,
+    ) -> Tuple[float, float]:
+        """
+        Refills the balance tokens last updated at updated_at to now and
+        takes count tokens, returns the new balance and the seconds to wait
+        for the taken tokens.
+        """
+        tokens = min(capacity, tokens + (now - updated_at) * rate) - count
+        return tokens, max(0.0, -tokens / rate)
+
+    def take(self, count: float = 1) -> float:
+        """
+        Takes count tokens and returns the seconds the caller must wait
+        before using them.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens, wait = self.reserve(
+                self.tokens, self.updated_at, now, self.rate, self.capacity, count
+            )
+            self.updated_at = now
+        return wait
+
+    def acquire(self, count: float = 1) -> None:
+        """
+        Blocks until count tokens are available and takes them.
+        """
+        wait = self.take(count)
+        if wait > 0:
+            time.sleep(wait)
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Token bucket shared by the processes of a host.
+
+    The balance of the bucket is stored as JSON in the file at path and the
+    file is locked with fcntl while a token is taken. The time is the wall
+    clock, the processes sharing the file must run on the same host.
+
+    Raises RuntimeError on the systems without fcntl, like Windows.
+    """
+
+    def __init__(self, path: str, rate: float, capacity: float = 1) -> None:
+        if fcntl is None:
+            raise RuntimeError(
+                "FileTokenBucket locks its file with fcntl which is not available "
+                "on this system, use TokenBucket instead."
+            )
+        super().__init__(rate, capacity)
+        self.path = path
+
+    def take(self, count: float = 1) -> float:
+        with self.lock, open(self.path, "a+", encoding="utf-8") as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                try:
+                    state = json.loads(state_file.read())
+                    tokens, updated_at = float(state["tokens"]), state["updated_at"]
+                except (ValueError, KeyError, TypeError):
+                    # New or corrupt state, start with a full bucket.
+                    tokens, updated_at = self.capacity, time.time()
+
+                now = time.time()
+                tokens, wait = self.reserve(
+                    tokens, updated_at, now, self.rate, self.capacity, count
+                )
+                state_file.seek(0)
+                state_file.truncate()
+                state_file.write(json.dumps({"tokens": tokens, "updated_at": now}))
+                state_file.flush()
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+        return wait
+
+
+class RateLimiter:
+    """
+    Per-endpoint token buckets of the Wayback Machine.
+
+    budgets: Maps the endpoints (see endpoint_of()) to their
+             requests per minute and burst size, the endpoints not in
+             budgets use DEFAULT_BUDGETS. A budget of None disables the
+             limiting of the endpoint.
+
+    directory: If set the buckets are FileTokenBucket files in the directory
+               and the budget is shared with the other processes using the
+               same directory. On the systems without fcntl a warning is
+               issued and the buckets are only shared by the process.
+    """
+
+    def __init__(
+        self,
+        budgets: Optional[Dict[str, Optional[Tuple[float, float]]]] = None,
+        directory: Optional[str] = None,
+    ) -> None:
+        self.budgets: Dict[str, Optional[Tuple[float, float]]] = dict(DEFAULT_BUDGETS)
+        self.budgets.update(budgets or {})
+        self.directory = directory
+        self.buckets: Dict[str, TokenBucket] = {}
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            if fcntl is None:
+                warnings.warn(
+                    "fcntl is not available, the rate limiter buckets can not be "
+                    "shared by processes and are only shared by the threads.",
+                    RuntimeWarning,
+                )
+
+        for endpoint, budget in self.budgets.items():
+            if budget is None:
+                continue
+            requests_per_minute, burst = budget
+            rate = requests_per_minute / 60
+            if directory is None or fcntl is None:
+                self.buckets[endpoint] = TokenBucket(rate, burst)
+            else:
+                path = os.path.join(directory, f"waybackpy-{endpoint}.bucket")
+                self.buckets[endpoint] = FileTokenBucket(path, rate, burst)
+
+    def __repr__(self) -> str:
+        return f"RateLimiter(budgets={self.budgets!r}, directory={self.directory!r})"
+
+    @classmethod
+    def unlimited(cls) -> "RateLimiter":
+        """
+        Returns a limiter that does not limit any endpoint.
+        """
+        return cls({endpoint: None for endpoint in DEFAULT_BUDGETS})
+
+    def acquire(self, endpoint: Optional[str]) -> None:
+        """
+        Blocks until a request to the endpoint is allowed.
+        """
+        bucket = self.buckets.get(endpoint or "")
+        if bucket is not None:
+            bucket.acquire()
+
+    def acquire_for_url(self, url: str) -> None:
+        """
+        Blocks until a request to the URL is allowed, see endpoint_of().
+        """
+        self.acquire(endpoint_of(url))
+
+
+_default_rate_limiter: Optional[RateLimiter] = None
+_default_rate_limiter_lock = threading.Lock()
+
+
+def get_default_rate_limiter() -> RateLimiter:
+    """
+    Returns the process-wide RateLimiter used by the transports created
+    without a rate_limiter. It is created on first use.
+    """
+    global _default_rate_limiter  # pylint: disable=global-statement
+    with _default_rate_limiter_lock:
+        if _default_rate_limiter is None:
+            _default_rate_limiter = RateLimiter()
+        return _default_rate_limiter
@@ -0,0 +1,135 @@
+"""
+This module contains RecentCaptureCache, the cache of the recent captures
+used by the min_interval save mode.
+
+WaybackMachineSaveAPI with min_interval does not save a URL that was
+captured less than min_interval seconds ago, it returns the archive URL of
+the recent capture instead. The recent capture is looked up first in the
+cache, which remembers the captures of the saves made by the process, and
+on a miss the CDX server is asked for the newest capture of the URL inside
+the interval with a single limit=-1 request.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+import requests
+
+from .cdx_api import WaybackMachineCDXServerAPI
+from .cdx_shard import datetime_to_timestamp
+from .exceptions import WaybackError
+from .transport import Transport
+
+Capture = Tuple[datetime, str]
+
+
+class RecentCaptureCache:
+    """
+    Thread-safe cache of the newest known capture of every URL, the time of
+    the capture and its archive URL.
+
+    max_size: Maximum number of URLs, the least recently used are evicted
+              first.
+    """
+
+    def __init__(self, max_size: int = 100000) -> None:
+        if max_size < 1:
+            raise ValueError("max_size should be positive")
+        self.max_size = max_size
+        self.captures: "OrderedDict[str, Capture]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.captures)
+
+    def get(self, url: str) -> Optional[Capture]:
+        """
+        Returns the newest known capture of the URL, None if there is none.
+        """
+        with self.lock:
+            capture = self.captures.get(url)
+            if capture is not None:
+                self.captures.move_to_end(url)
+            return capture
+
+    def add(self, url: str, timestamp: datetime, archive_url: str) -> None:
+        """
+        Remembers the capture of the URL unless a newer one is known.
+        """
+        with self.lock:
+            known = self.captures.get(url)
+            if known is None or known[0] < timestamp:
+                self.captures[url] = (timestamp, archive_url)
+            self.captures.move_to_end(url)
+            while len(self.captures) > self.max_size:
+                self.captures.popitem(last=False)
+
+    def recent(self, url: str, min_interval: float) -> Optional[str]:
+        """
+        Returns the archive URL of the known capture of the URL if it is
+        less than min_interval seconds old, else None.
+        """
+        capture = self.get(url)
+        if capture is None:
+            return None
+        timestamp, archive_url = capture
+        if datetime.utcnow() - timestamp < timedelta(seconds=min_interval):
+            return archive_url
+        return None
+
+    def clear(self) -> None:
+        """
+        Forgets all the captures.
+        """
+        with self.lock:
+            self.captures.clear()
+
+
+def probe_recent_capture(
+    url: str,
+    min_interval: float,
+    user_agent: str,
+    transport: Optional[Transport] = None,
+) -> Optional[Capture]:
+    """
+    Asks the CDX server for the newest capture of the URL less than
+    min_interval seconds old, returns None if there is none or if the CDX
+    server could not be reached or answered with an error.
+
+    The CDX server can miss the captures of the last minutes, they are only
+    known from the cache.
+    """
+    start = datetime.utcnow() - timedelta(seconds=min_interval)
+    cdx_api = WaybackMachineCDXServerAPI(
+        url,
+        user_agent=user_agent,
+        start_timestamp=datetime_to_timestamp(start),
+        transport=transport,
+    )
+    try:
+        snapshot = cdx_api.edge_snapshot(newest=True)
+    except (WaybackError, requests.RequestException):
+        return None
+    # The server can ignore the from parameter of the query, an older
+    # capture is not recent.
+    if snapshot is None or snapshot.datetime_timestamp < start:
+        return None
+    return snapshot.datetime_timestamp, snapshot.archive_url
+
+
+_default_recent_capture_cache: Optional[RecentCaptureCache] = None
+_default_recent_capture_cache_lock = threading.Lock()
+
+
+def get_default_recent_capture_cache() -> RecentCaptureCache:
+    """
+    Returns the process-wide RecentCaptureCache shared by the savers created
+    without a cache. It is created on first use.
+    """
+    global _default_recent_capture_cache  # pylint: disable=global-statement
+    with _default_recent_capture_cache_lock:
+        if _default_recent_capture_cache is None:
+            _default_recent_capture_cache = RecentCaptureCache()
+        return _default_recent_capture_cache
@@ -7,23 +7,79 @@ this module to use the SavePageNow API.
 
 import re
 import time
+import warnings
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Mapping, Optional
 
-import requests
-from requests.adapters import HTTPAdapter
 from requests.models import Response
 from requests.structures import CaseInsensitiveDict
-from urllib3.util.retry import Retry
 
+from .backoff import BackoffPolicy, get_default_backoff_policy
 from .exceptions import MaximumSaveRetriesExceeded, TooManyRequestsError, WaybackError
+from .recent_captures import (
+    RecentCaptureCache,
+    get_default_recent_capture_cache,
+    probe_recent_capture,
+)
+from .transport import Transport, get_default_transport
 from .utils import DEFAULT_USER_AGENT
 
+ARCHIVE_PATH_REGEX = re.compile(r"web\.archive\.org(/web/[0-9]{14}/.*)")
+MEMENTO_LINK_REGEX = re.compile(r'<([^>]*)>\s*;\s*rel="memento"')
+
+
+class SaveAttempt:
+    """
+    The timings of a try of WaybackMachineSaveAPI.save().
+
+    tries: The number of the try, starting at 1.
+
+    waited: Seconds waited before the request of the try.
+
+    duration: Seconds taken by the request of the try.
+
+    status_code: The status code of the response, None if the request failed.
+    """
+
+    def __init__(
+        self, tries: int, waited: float, duration: float, status_code: Optional[int]
+    ) -> None:
+        self.tries = tries
+        self.waited = waited
+        self.duration = duration
+        self.status_code = status_code
+
+    def __repr__(self) -> str:
+        return (
+            f"SaveAttempt(tries={self.tries}, waited={self.waited:.2f}, "
+            f"duration={self.duration:.2f}, status_code={self.status_code})"
+        )
+
 
 class WaybackMachineSaveAPI:
     """
     WaybackMachineSaveAPI class provides an interface for saving URLs on the
     Wayback Machine.
+
+    The save requests are made using the transport, by default the
+    process-wide transport shared by all the API classes. The retries of a
+    single save request are configured on the transport.
+
+    The waits between the tries of save() are decided by the backoff policy,
+    by default the process-wide ExponentialBackoff shared by all the savers,
+    and the timings of the tries are kept in the attempts attribute.
+
+    min_interval: If set, save() does not save a URL captured less than
+                  min_interval seconds ago and returns the archive URL of
+                  that capture, see recent_archive_url().
+
+    recent_captures: The RecentCaptureCache of the captures of the saves,
+                     by default the process-wide cache.
+
+    max_refusals: Number of saves refused with 429 or 509 that save() tries
+                  again after the backoff, the next refusal is raised. By
+                  default the first refusal is raised and the caller decides
+                  when to save again, like save_many() of bulk_save.
     """
 
     def __init__(
@@ -31,6 +87,11 @@ class WaybackMachineSaveAPI:
         url: str,
         user_agent: str = DEFAULT_USER_AGENT,
         max_tries: int = 8,
+        transport: Optional[Transport] = None,
+        backoff: Optional[BackoffPolicy] = None,
+        min_interval: Optional[float] = None,
+        recent_captures: Optional[RecentCaptureCache] = None,
+        max_refusals: int = 0,
     ) -> None:
         self.url = str(url).strip().replace(" ", "%20")
         self.request_url = "https://web.archive.org/save/" + self.url
@@ -39,9 +100,20 @@ class WaybackMachineSaveAPI:
         if max_tries < 1:
             raise ValueError("max_tries should be positive")
         self.max_tries = max_tries
-        self.total_save_retries = 5
-        self.backoff_factor = 0.5
-        self.status_forcelist = [500, 502, 503, 504]
+        if max_refusals < 0:
+            raise ValueError("max_refusals should not be negative")
+        self.max_refusals = max_refusals
+        self.transport = get_default_transport() if transport is None else transport
+        self.backoff = get_default_backoff_policy() if backoff is None else backoff
+        self.attempts: List[SaveAttempt] = []
+        if min_interval is not None and min_interval <= 0:
+            raise ValueError("min_interval should be positive")
+        self.min_interval = min_interval
+        self.recent_captures = (
+            get_default_recent_capture_cache()
+            if recent_captures is None
+            else recent_captures
+        )
         self._archive_url: Optional[str] = None
         self.instance_birth_time = datetime.utcnow()
         self.response: Optional[Response] = None
@@ -50,6 +122,29 @@ class WaybackMachineSaveAPI:
         self.response_url: Optional[str] = None
         self.cached_save: Optional[bool] = None
         self.saved_archive: Optional[str] = None
+        self.skipped_save: Optional[bool] = None
+
+    @property
+    def total_save_retries(self) -> int:
+        """
+        The retries of the transport, read-only. Pass a Transport to change
+        the retry settings.
+        """
+        return self.transport.retries
+
+    @property
+    def backoff_factor(self) -> float:
+        """
+        The backoff factor of the retries of the transport, read-only.
+        """
+        return self.transport.backoff_factor
+
+    @property
+    def status_forcelist(self) -> List[int]:
+        """
+        The statuses retried by the transport, read-only.
+        """
+        return self.transport.status_forcelist
 
     @property
     def archive_url(self) -> str:
@@ -65,7 +160,7 @@ class WaybackMachineSaveAPI:
 
     def get_save_request_headers(self) -> None:
         """
-        Creates a session and tries 'retries' number of times to
+        Uses the transport which tries 'retries' number of times to
         retrieve the archive.
 
         If successful in getting the response, sets the headers, status_code
@@ -78,20 +173,21 @@ class WaybackMachineSaveAPI:
         Wayback Machine's save API is known
         to be very unreliable thus if it fails first check opening
         the response URL yourself in the browser.
+
+        The response is streamed, the body of the archived page is only
+        downloaded if response.text or response.content is read. The response
+        of the previous try is closed first to release its connection, the
+        response of a successful save stays open until close() is called.
         """
-        session = requests.Session()
-        retries = Retry(
-            total=self.total_save_retries,
-            backoff_factor=self.backoff_factor,
-            status_forcelist=self.status_forcelist,
+        if self.response is not None:
+            self.response.close()
+        self.response = self.transport.get(
+            self.request_url, headers=self.request_headers, stream=True
         )
-        session.mount("https://", HTTPAdapter(max_retries=retries))
-        self.response = session.get(self.request_url, headers=self.request_headers)
         # requests.response.headers is requests.structures.CaseInsensitiveDict
         self.headers = self.response.headers
         self.status_code = self.response.status_code
         self.response_url = self.response.url
-        session.close()
 
         if self.status_code == 429:
             # why wait 5 minutes and 429?
@@ -112,26 +208,71 @@ class WaybackMachineSaveAPI:
                 f"limit of active sessions."
             )
 
+    def close(self) -> None:
+        """
+        Closes the response of the last save request and releases its
+        connection to the pool of the transport.
+
+        Call it once the body of the archived page is not needed anymore,
+        response.text and response.content can not be read after it. The
+        headers, status_code and response_url attributes are kept.
+        """
+        if self.response is not None:
+            self.response.close()
+
+    @staticmethod
+    def archive_url_from_headers(headers: Mapping[str, str]) -> Optional[str]:
+        """
+        Looks for the archive URL in the Content-Location header, then in the
+        memento of the Link header and finally in the X-Cache-Key header.
+        """
+        if not isinstance(headers, CaseInsensitiveDict):
+            headers = CaseInsensitiveDict(headers)
+
+        content_location = str(headers.get("Content-Location", ""))
+        if re.match(r"/web/[0-9]{14}/", content_location):
+            return "https://web.archive.org" + content_location.strip()
+
+        for archive_url in MEMENTO_LINK_REGEX.findall(str(headers.get("Link", ""))):
+            match = ARCHIVE_PATH_REGEX.search(archive_url)
+            if match is not None:
+                return "https://web.archive.org" + match.group(1)
+
+        # The cache key is the archive URL followed by a country code, with or
+        # without the "://" after the scheme.
+        match = ARCHIVE_PATH_REGEX.search(str(headers.get("X-Cache-Key", "")))
+        if match is not None:
+            return "https://web.archive.org" + re.sub(r"[A-Z]{2}$", "", match.group(1))
+
+        return None
+
     def archive_url_parser(self) -> Optional[str]:
         """
-        Three regexen (like oxen?) are used to search for the
-        archive URL in the headers and finally look in the response URL
-        for the archive URL.
+        Looks for the archive URL in the headers, see
+        archive_url_from_headers(), and finally in the response URL.
+
+        Three regexen (like oxen?) are used instead if the headers are a
+        string and not a mapping.
         """
-        regex1 = r"Content-Location: (/web/[0-9]{14}/.*)"
-        match = re.search(regex1, str(self.headers))
-        if match:
-            return "https://web.archive.org" + match.group(1)
+        if isinstance(self.headers, Mapping):
+            archive_url = self.archive_url_from_headers(self.headers)
+            if archive_url is not None:
+                return archive_url
+        else:
+            regex1 = r"Content-Location: (/web/[0-9]{14}/.*)"
+            match = re.search(regex1, str(self.headers))
+            if match:
+                return "https://web.archive.org" + match.group(1)
 
-        regex2 = r"rel=\"memento.*?(web\.archive\.org/web/[0-9]{14}/.*?)>"
-        match = re.search(regex2, str(self.headers))
-        if match is not None and len(match.groups()) == 1:
-            return "https://" + match.group(1)
+            regex2 = r"rel=\"memento.*?(web\.archive\.org/web/[0-9]{14}/.*?)>"
+            match = re.search(regex2, str(self.headers))
+            if match is not None and len(match.groups()) == 1:
+                return "https://" + match.group(1)
 
-        regex3 = r"X-Cache-Key:\shttps(.*)[A-Z]{2}"
-        match = re.search(regex3, str(self.headers))
-        if match is not None and len(match.groups()) == 1:
-            return "https" + match.group(1)
+            regex3 = r"X-Cache-Key:\shttps(.*)[A-Z]{2}"
+            match = re.search(regex3, str(self.headers))
+            if match is not None and len(match.groups()) == 1:
+                return "https" + match.group(1)
 
         self.response_url = (
             "" if self.response_url is None else self.response_url.strip()
@@ -146,6 +287,9 @@ class WaybackMachineSaveAPI:
     @staticmethod
     def sleep(tries: int) -> None:
         """
+        Deprecated, save() waits according to the backoff attribute and this
+        method is not used anymore. It will be removed in a future version.
+
         Ensure that the we wait some time before succesive retries so that we
         don't waste the retries before the page is even captured by the Wayback
         Machine crawlers also ensures that we are not putting too much load on
@@ -153,6 +297,12 @@ class WaybackMachineSaveAPI:
 
         If tries are multiple of 3 sleep 10 seconds else sleep 5 seconds.
         """
+        warnings.warn(
+            "WaybackMachineSaveAPI.sleep() is deprecated, save() waits "
+            "according to the backoff policy.",
+            DeprecationWarning,
+            stacklevel=2,
+        )
         sleep_seconds = 5
         if tries % 3 == 0:
             sleep_seconds = 10
@@ -192,31 +342,97 @@ class WaybackMachineSaveAPI:
 
         return timestamp
 
+    def recent_archive_url(self) -> Optional[str]:
+        """
+        Returns the archive URL of a capture of the URL less than
+        min_interval seconds old, None if there is none or if min_interval
+        is not set.
+
+        The capture is looked up in the recent_captures cache and on a miss
+        the CDX server is asked for the newest capture in the interval.
+        """
+        if self.min_interval is None:
+            return None
+
+        archive_url = self.recent_captures.recent(self.url, self.min_interval)
+        if archive_url is None:
+            capture = probe_recent_capture(
+                self.url, self.min_interval, self.user_agent, self.transport
+            )
+            if capture is not None:
+                self.recent_captures.add(self.url, *capture)
+                archive_url = capture[1]
+        return archive_url
+
     def save(self) -> str:
         """
         Calls the SavePageNow API of the Wayback Machine with required parameters
         and headers to save the URL.
 
         Raises MaximumSaveRetriesExceeded is maximum retries are exhausted but still
-        we were unable to retrieve the archive from the Wayback Machine.
+        we were unable to retrieve the archive from the Wayback Machine. A try
+        refused with 429 or 509 raises its error once max_refusals refusals
+        were tried again, or if it is the last try.
+
+        If the URL was captured less than min_interval seconds ago the save is
+        skipped, skipped_save and cached_save are set to True and the archive
+        URL of the recent capture is returned.
+
+        The response of a successful save is kept open for reading the body
+        of the archived page, call close() to release its connection. The
+        response is closed when the save fails.
         """
         self.saved_archive = None
+        self.attempts = []
+
+        recent_archive_url = self.recent_archive_url()
+        self.skipped_save = recent_archive_url is not None
+        if recent_archive_url is not None:
+            self.saved_archive = self._archive_url = recent_archive_url
+            self.cached_save = True
+            return recent_archive_url
+
         tries = 0
+        refusals = 0
+        delay = 0.0
 
         while True:
-            if tries >= 1:
-                self.sleep(tries)
-
-            self.get_save_request_headers()
-            self.saved_archive = self.archive_url_parser()
+            waited = self.backoff.wait(delay)
+            started = time.monotonic()
+            self.status_code = None
+            refusal: Optional[WaybackError] = None
+            try:
+                self.get_save_request_headers()
+            except WaybackError as exc:
+                # 429 and 509, the next try waits for the backoff policy.
+                refusal = exc
+            finally:
+                self.attempts.append(
+                    SaveAttempt(
+                        tries + 1, waited, time.monotonic() - started, self.status_code
+                    )
+                )
 
-            if isinstance(self.saved_archive, str):
-                self._archive_url = self.saved_archive
-                self.timestamp()
-                return self.saved_archive
+            if refusal is None:
+                self.saved_archive = self.archive_url_parser()
+                if isinstance(self.saved_archive, str):
+                    self._archive_url = self.saved_archive
+                    self.recent_captures.add(
+                        self.url, self.timestamp(), self.saved_archive
+                    )
+                    return self.saved_archive
 
             tries += 1
+            # A refusal pauses all the savers sharing the backoff policy, also
+            # when it is raised.
+            delay = self.backoff.backoff(tries, self.response)
+            if refusal is not None:
+                refusals += 1
+                if refusals > self.max_refusals or tries >= self.max_tries:
+                    self.close()
+                    raise refusal
             if tries >= self.max_tries:
+                self.close()
                 raise MaximumSaveRetriesExceeded(
                     f"Tried {tries} times but failed to save "
                     f"and retrieve the archive for {self.url}.\n"
@@ -0,0 +1,338 @@
+"""
+This module interfaces the version 2 of the SavePageNow (SPN2) API of the
+Wayback Machine.
+
+Unlike WaybackMachineSaveAPI, which blocks for the whole capture, SPN2
+answers a capture request at once with a job id. The captures are submitted
+by POST with their options and the status of many jobs is then polled in
+batches, so a single thread can keep hundreds of captures in flight:
+
+>>> spn2 = WaybackMachineSPN2API(access_key="...", secret_key="...")
+>>> for job in spn2.save_many(urls, if_not_archived_within="1d"):
+...     print(job.original_url, job.archive_url if job.ok else job.message)
+
+The endpoint is configurable, the status of the jobs is requested from the
+"status" path under the endpoint.
+"""
+
+import time
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from requests.models import Response
+
+from .exceptions import TooManyRequestsError, WaybackError
+from .transport import Transport, get_default_transport
+from .utils import DEFAULT_USER_AGENT
+
+DEFAULT_ENDPOINT = "https://web.archive.org/save"
+
+# Maximum number of job ids in a single status request.
+STATUS_BATCH_SIZE = 100
+
+
+class SPN2Job:
+    """
+    A capture job of the SPN2 API.
+
+    job_id: The id of the job, None if the capture request was refused.
+
+    url: The URL submitted for the capture.
+
+    status: "pending", "success" or "error".
+
+    The other attributes are set from the status of the job: original_url
+    and timestamp of the capture, status_ext (the error code like
+    "error:invalid-url-syntax") and message.
+    """
+
+    def __init__(
+        self, url: str, job_id: Optional[str] = None, status: str = "pending"
+    ) -> None:
+        self.url = url
+        self.job_id = job_id
+        self.status = status
+        self.original_url: Optional[str] = None
+        self.timestamp: Optional[str] = None
+        self.status_ext: Optional[str] = None
+        self.message: Optional[str] = None
+        self.json: Dict[str, Any] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"SPN2Job(url={self.url!r}, job_id={self.job_id!r}, "
+            f"status={self.status!r})"
+        )
+
+    def update(self, data: Dict[str, Any]) -> None:
+        """
+        Updates the job from the JSON of a capture or a status response.
+        """
+        self.json.update(data)
+        self.job_id = data.get("job_id", self.job_id)
+        self.status = data.get("status", self.status)
+        self.original_url = data.get("original_url", self.original_url)
+        self.timestamp = data.get("timestamp", self.timestamp)
+        self.status_ext = data.get("status_ext", self.status_ext)
+        self.message = data.get("message", self.message)
+
+    @property
+    def done(self) -> bool:
+        """
+        True if the capture succeeded or failed.
+        """
+        return self.status != "pending"
+
+    @property
+    def ok(self) -> bool:
+        """
+        True if the capture succeeded.
+        """
+        return self.status == "success"
+
+    @property
+    def archive_url(self) -> Optional[str]:
+        """
+        The archive URL of the capture, None until the capture succeeded.
+        """
+        if not self.ok or self.timestamp is None:
+            return None
+        return (
+            f"https://web.archive.org/web/{self.timestamp}/"
+            f"{self.original_url or self.url}"
+        )
+
+
+class WaybackMachineSPN2API:
+    """
+    Class that interfaces the SPN2 API of the Wayback Machine.
+
+    access_key and secret_key: The S3-like keys of an archive.org account,
+                               see https://archive.org/account/s3.php. The
+                               anonymous captures have lower limits.
+
+    endpoint: The capture endpoint, change it to use a stand-in server.
+
+    The requests are made using the transport, by default the process-wide
+    transport shared by all the API classes, so the captures are spaced by
+    its rate limiter.
+    """
+
+    def __init__(
+        self,
+        access_key: Optional[str] = None,
+        secret_key: Optional[str] = None,
+        user_agent: str = DEFAULT_USER_AGENT,
+        endpoint: str = DEFAULT_ENDPOINT,
+        transport: Optional[Transport] = None,
+        status_batch_size: int = STATUS_BATCH_SIZE,
+    ) -> None:
+        if status_batch_size < 1:
+            raise ValueError("status_batch_size should be positive")
+        self.endpoint = endpoint.rstrip("/")
+        self.status_endpoint = self.endpoint + "/status"
+        self.user_agent = user_agent
+        self.headers: Dict[str, str] = {
+            "User-Agent": self.user_agent,
+            "Accept": "application/json",
+        }
+        if access_key is not None and secret_key is not None:
+            self.headers["Authorization"] = f"LOW {access_key}:{secret_key}"
+        self.transport = get_default_transport() if transport is None else transport
+        self.status_batch_size = status_batch_size
+
+    def post(self, url: str, data: Dict[str, str]) -> Any:
+        """
+        Posts the form data to the URL and returns the decoded JSON response.
+        """
+        response: Response = self.transport.post(url, data=data, headers=self.headers)
+        if response.status_code == 429:
+            raise TooManyRequestsError(
+                "SPN2 request refused by the server, too many requests. "
+                "Try waiting for 5 minutes and then try again."
+            )
+        try:
+            return response.json()
+        except ValueError as exc:
+            raise WaybackError(
+                f"The SPN2 API returned {response.status_code} and not JSON:\n"
+                f"{response.text}"
+            ) from exc
+
+    def submit(
+        self,
+        url: str,
+        capture_all: bool = False,
+        capture_outlinks: bool = False,
+        capture_screenshot: bool = False,
+        skip_first_archive: bool = False,
+        if_not_archived_within: Optional[str] = None,
+        **options: Union[str, int, bool],
+    ) -> SPN2Job:
+        """
+        Submits the capture of the URL and returns its job without waiting
+        for the capture.
+
+        if_not_archived_within: Only capture the URL if it has no capture
+                                newer than this duration, like "3h" or "5d".
+
+        The other options of the SPN2 API, like delay_wb_availability or
+        js_behavior_timeout, are passed as keyword arguments.
+
+        If the capture is refused, for example an invalid URL or a daily
+        limit reached, the job is returned with the status "error".
+        """
+        options.update(
+            capture_all=capture_all,
+            capture_outlinks=capture_outlinks,
+            capture_screenshot=capture_screenshot,
+            skip_first_archive=skip_first_archive,
+        )
+        if if_not_archived_within is not None:
+            options["if_not_archived_within"] = if_not_archived_within
+
+        # The flags are sent as 1 and left out when they are False.
+        data = {"url": url}
+        for key, value in options.items():
+            if isinstance(value, bool):
+                if value:
+                    data[key] = "1"
+            else:
+                data[key] = str(value)
+
+        job = SPN2Job(url)
+        response_json = self.post(self.endpoint, data)
+        if not isinstance(response_json, dict):
+            raise WaybackError(f"Unexpected SPN2 capture response: {response_json}")
+        job.update(response_json)
+        if job.job_id is None and not job.done:
+            job.status = "error"
+        return job
+
+    def status(self, jobs: Sequence[SPN2Job]) -> List[SPN2Job]:
+        """
+        Updates the status of the jobs with batched status requests and
+        returns the jobs.
+        """
+        by_id: Dict[str, SPN2Job] = {}
+        for job in jobs:
+            if job.job_id is not None:
+                by_id[job.job_id] = job
+        job_ids = list(by_id)
+        for start in range(0, len(job_ids), self.status_batch_size):
+            end = start + self.status_batch_size
+            batch = job_ids[start:end]
+            response_json = self.post(
+                self.status_endpoint, {"job_ids": ",".join(batch)}
+            )
+            statuses = (
+                response_json if isinstance(response_json, list) else [response_json]
+            )
+            for data in statuses:
+                if isinstance(data, dict) and data.get("job_id") in by_id:
+                    by_id[data["job_id"]].update(data)
+        return list(jobs)
+
+    def poll(self, pending: List[SPN2Job]) -> List[SPN2Job]:
+        """
+        Updates the status of the pending jobs, removes the jobs that are
+        done from pending and returns them.
+        """
+        self.status(pending)
+        done = [job for job in pending if job.done]
+        pending[:] = [job for job in pending if not job.done]
+        return done
+
+    def wait(
+        self,
+        jobs: Iterable[SPN2Job],
+        poll_interval: float = 5,
+        timeout: Optional[float] = None,
+    ) -> Generator[SPN2Job, None, None]:
+        """
+        Polls the status of the jobs and yields every job when it is done,
+        in the order the jobs complete.
+
+        If timeout seconds pass the generator stops, the jobs that were not
+        yielded are still pending.
+        """
+        pending: List[SPN2Job] = []
+        for job in jobs:
+            if job.done:
+                yield job
+            else:
+                pending.append(job)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while pending:
+            time.sleep(poll_interval)
+            yield from self.poll(pending)
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+
+    def save_many(
+        self,
+        urls: Iterable[str],
+        max_in_flight: int = 100,
+        poll_interval: float = 5,
+        refusal_delay: float = 300,
+        **options: Any,
+    ) -> Generator[SPN2Job, None, None]:
+        """
+        Submits the captures of the URLs and yields their jobs as they are
+        done, keeping at most max_in_flight captures pending at once.
+
+        A capture refused with 429 is yielded as a job with the status
+        "error" and the next captures are submitted after refusal_delay
+        seconds, the submitted jobs are polled meanwhile. A status request
+        refused with 429 is made again after poll_interval seconds.
+
+        The keyword arguments are the capture options of submit().
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight should be positive")
+
+        url_iterator: Iterator[str] = iter(urls)
+        pending: List[SPN2Job] = []
+        exhausted = False
+        resume_at = 0.0
+
+        while pending or not exhausted:
+            while (
+                not exhausted
+                and len(pending) < max_in_flight
+                and time.monotonic() >= resume_at
+            ):
+                url = next(url_iterator, None)
+                if url is None:
+                    exhausted = True
+                    break
+                try:
+                    job = self.submit(url, **options)
+                except TooManyRequestsError as exc:
+                    job = SPN2Job(url, status="error")
+                    job.message = str(exc)
+                    resume_at = time.monotonic() + refusal_delay
+                if job.done:
+                    yield job
+                else:
+                    pending.append(job)
+
+            if pending:
+                time.sleep(poll_interval)
+                try:
+                    done = self.poll(pending)
+                except TooManyRequestsError:
+                    continue
+                yield from done
+            elif not exhausted:
+                time.sleep(max(0.0, resume_at - time.monotonic()))
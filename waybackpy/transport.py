@@ -0,0 +1,153 @@
+"""
+This module contains the Transport class, the HTTP layer shared by the API
+classes of waybackpy.
+
+Transport wraps a single requests.Session with a keep-alive connection pool so
+that the CDX server API, the SavePageNow API and the availability API can all
+reuse warm connections to the Wayback Machine instead of paying a new TCP and
+TLS handshake for every request.
+
+If no Transport is passed to the API classes they share the process-wide
+transport returned by get_default_transport().
+
+Every request to an API endpoint of the Wayback Machine first takes a token
+from the RateLimiter of the transport, see the rate_limiter module.
+"""
+
+import threading
+from types import TracebackType
+from typing import Any, List, Optional, Type
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .rate_limiter import RateLimiter, get_default_rate_limiter
+
+DEFAULT_STATUS_FORCELIST: List[int] = [500, 502, 503, 504]
+
+
+class Transport:
+    """
+    Pooled HTTP transport used for all the requests made by waybackpy.
+
+    pool_connections: Number of per-host connection pools to keep, the
+                      Wayback Machine APIs live on web.archive.org and
+                      archive.org so the default is more than enough.
+
+    pool_maxsize: Maximum number of connections kept alive for a single host,
+                  should be at least the number of threads sharing the
+                  transport.
+
+    pool_block: If True never open more than pool_maxsize connections to a
+                host, threads wait for a free connection instead.
+
+    retries, backoff_factor and status_forcelist are passed to the urllib3
+    Retry object mounted on the transport.
+
+    timeout: Default timeout in seconds for every request, None means wait
+             forever which was the behavior of waybackpy before Transport.
+
+    rate_limiter: The RateLimiter consulted before every request, by default
+                  the process-wide limiter shared by all the transports.
+                  Pass RateLimiter.unlimited() to disable the limiting.
+                  The retries of the urllib3 Retry are not counted by the
+                  rate limiter, a request takes a single token whatever the
+                  number of its retries.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        retries: int = 5,
+        backoff_factor: float = 0.5,
+        status_forcelist: Optional[List[int]] = None,
+        timeout: Optional[float] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        if pool_connections < 1 or pool_maxsize < 1:
+            raise ValueError("pool_connections and pool_maxsize should be positive")
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = (
+            DEFAULT_STATUS_FORCELIST if status_forcelist is None else status_forcelist
+        )
+        self.timeout = timeout
+        self.rate_limiter = (
+            get_default_rate_limiter() if rate_limiter is None else rate_limiter
+        )
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+            max_retries=Retry(
+                total=self.retries,
+                backoff_factor=self.backoff_factor,
+                status_forcelist=self.status_forcelist,
+            ),
+        )
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    def __enter__(self) -> "Transport":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Sends the request using the pooled session, all the keyword arguments
+        are passed to requests.Session.request().
+
+        Blocks first until the rate limiter allows a request to the endpoint.
+        """
+        self.rate_limiter.acquire_for_url(url)
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Sends a GET request, see request().
+        """
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Sends a POST request, see request().
+        """
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        """
+        Closes all the pooled connections, the transport can still be used
+        after closing it but the connections are established again.
+        """
+        self.session.close()
+
+
+_default_transport: Optional[Transport] = None
+_default_transport_lock = threading.Lock()
+
+
+def get_default_transport() -> Transport:
+    """
+    Returns the process-wide Transport shared by the API classes when the
+    end-user does not pass their own transport. It is created on first use.
+    """
+    global _default_transport  # pylint: disable=global-statement
+    with _default_transport_lock:
+        if _default_transport is None:
+            _default_transport = Transport()
+        return _default_transport
@@ -2,7 +2,9 @@
 Utility functions and shared variables like DEFAULT_USER_AGENT are here.
 """
 
+import importlib
 from datetime import datetime
+from typing import Any
 
 from . import __version__
 
@@ -27,3 +29,15 @@ def wayback_timestamp(**kwargs: int) -> str:
     return "".join(
         str(kwargs[key]).zfill(2) for key in ["year", "month", "day", "hour", "minute"]
     )
+
+
+def optional_import(name: str) -> Any:
+    """
+    Returns the module if it is installed, else None. Used for the optional
+    dependencies like NumPy and for the modules missing on some platforms,
+    like fcntl on Windows.
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
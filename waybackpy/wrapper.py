@@ -74,6 +74,7 @@ class Url:
         self.archive_url = self.wayback_machine_save_api.archive_url
         self.timestamp = self.wayback_machine_save_api.timestamp()
         self.headers = self.wayback_machine_save_api.headers
+        self.wayback_machine_save_api.close()
         return self
 
     def near(
@@ -130,10 +131,7 @@ class Url:
             end_timestamp=end_timestamp,
         )
 
-        count = 0
-        for _ in cdx.snapshots():
-            count = count + 1
-        return count
+        return cdx.count()
 
     def known_urls(
         self,
@@ -156,7 +154,7 @@ class Url:
             end_timestamp=end_timestamp,
             match_type=match_type,
             collapses=["urlkey"],
+            fields=["original"],
         )
 
-        for snapshot in cdx.snapshots():
-            yield snapshot.original
+        yield from cdx.raw_lines()